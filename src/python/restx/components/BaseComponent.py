@@ -29,7 +29,7 @@ from copy import deepcopy
 #RESTx imports
 import restx.settings as settings
 
-from restx.languages                       import __javaStructToPython
+from restx.languages                       import __javaStructToPython as _javaStructToPython
 from restx.core.parameter                  import *
 from restx.storageabstraction.file_storage import FileStorage
 from restx.render                          import DEFAULT_OUTPUT_TYPES, DEFAULT_INPUT_TYPES
@@ -38,7 +38,8 @@ from org.mulesoft.restx.component.api      import HttpResult, HTTP
 from org.json                              import JSONException
 from org.mulesoft.restx.util               import Url, JsonProcessor
 
-ALLOWABLE_SERVICE_KEYS = [ "desc", "params", "positional_params", "allow_params_in_body", "output_types", "input_types" ]
+ALLOWABLE_SERVICE_KEYS = [ "desc", "params", "positional_params", "allow_params_in_body", "output_types", "input_types",
+                           "stream_input", "cache_ttl", "pushdown" ]
 
 #
 # Utility method.
@@ -107,8 +108,11 @@ class BaseComponent(object):
         self._instance_conf      = None
 
         #
-        # Fill in some default values in various places
+        # Fill in some default values in various places. This modifies the
+        # class' service definitions, so it only needs to be done once per class.
         #
+        if self.__class__.__dict__.get("_services_prepared"):
+            return
 
         # The output types of services, which don't specify their own output types
         # should be set to the default types. Same with the input types.
@@ -126,6 +130,7 @@ class BaseComponent(object):
                 # In that case, we transcribe it into a single-element list, so that
                 # code using the API always can deal with it in the same way.
                 sdef['input_types'] = [ sdef['input_types'] ]
+        self.__class__._services_prepared = True
         
     def setInstanceConf(self, instance_conf):
         self._instance_conf = instance_conf;
@@ -176,7 +181,7 @@ class BaseComponent(object):
             obj = JsonProcessor.loads(str)
         except JSONException, e:
             raise RestxException("Could not de-serialize data: " + e.getMessage());
-        return __javaStructToPython(obj)
+        return _javaStructToPython(obj)
 
     def toJson(self, obj):
         try:
@@ -270,6 +275,64 @@ class BaseComponent(object):
         """
         return self.__base_capabilities.accessResource(resource_uri, input, params, method)
 
+    def accessResources(self, resource_requests, timeout=None):
+        """
+        Access several resources in parallel.
+
+        The time this takes is that of the slowest access, rather than the
+        sum of all of them. See accessResources() in resource_runner.
+
+        @param resource_requests:   List of resource URIs or of dictionaries with the
+                                    arguments for accessResource() ('resource_uri',
+                                    'input', 'params', 'method'), each optionally
+                                    with a 'timeout'.
+        @type resource_requests:    list
+
+        @param timeout:             Number of seconds to wait for each access, or None.
+                                    Accesses that take longer return a 408 status.
+        @type timeout:              float
+
+        @return:                    List of (status, data) tuples, in the order of the requests.
+        @rtype:                     list
+
+        """
+        return self.__base_capabilities.accessResources(resource_requests, timeout)
+
+    def getServiceDefinition(self, resource_uri):
+        """
+        Return the definition of the service a resource URI refers to.
+
+        This can be used to find out what a service supports before
+        accessing it, for example a 'pushdown' of predicates.
+
+        @param resource_uri:        The uri of the resource, starting with "/resource/".
+        @type resource_uri:         string
+
+        @return:                    The public service definition, or None if the URI
+                                    does not refer to a service of a known resource.
+        @rtype:                     dict
+
+        """
+        return self.__base_capabilities.getServiceDefinition(resource_uri)
+
+    def getResourceFingerprint(self, resource_uri):
+        """
+        Return a digest of the stored definition of the resource a URI refers to.
+
+        The digest changes when the resource is re-defined. Components that
+        store results of another resource can use it to recognize results
+        that are out of date.
+
+        @param resource_uri:        The uri of the resource, starting with "/resource/".
+        @type resource_uri:         string
+
+        @return:                    The digest, or None if the URI does not refer
+                                    to a known resource.
+        @rtype:                     string
+
+        """
+        return self.__base_capabilities.getResourceFingerprint(resource_uri)
+
     def makeResource(self, component_name, params, specialized=False):
         """
         Create a new resource representation from the
@@ -414,7 +477,9 @@ class BaseComponent(object):
                                    URI of the resource passed in.
         @type resource_base_uri:   string
         
-        @return:                   Dictionary with sub-service info.
+        @return:                   Dictionary with sub-service info. The same
+                                   dictionary is returned to all callers and
+                                   must not be modified.
         @rtype:                    dict
         
         """
@@ -424,6 +489,43 @@ class BaseComponent(object):
             # No base URI specified? Then we can get the service URIs relative to
             # the code's URI.
             base_uri = self.getCodeUri()
+        # The service description only depends on the class and the base URI,
+        # so we compute it only once for each.
+        services_cache = self.__class__.__dict__.get("_services_cache")
+        if services_cache is None:
+            services_cache = dict()
+            self.__class__._services_cache = services_cache
+        if base_uri not in services_cache:
+            services_cache[base_uri] = self.__make_services(base_uri)
+        return services_cache[base_uri]
+
+    @classmethod
+    def _forgetServices(cls, resource_base_uri):
+        """
+        Remove the cached service description for a base URI.
+
+        Called when the resource with that URI is deleted, so that the
+        cache doesn't keep growing as resources come and go.
+
+        @param resource_base_uri:  The base URI of the deleted resource.
+        @type resource_base_uri:   string
+
+        """
+        services_cache = cls.__dict__.get("_services_cache")
+        if services_cache:
+            services_cache.pop(resource_base_uri, None)
+
+    def __make_services(self, base_uri):
+        """
+        Create the dictionary with the exposed services.
+
+        @param base_uri:           The base URI for the service URIs.
+        @type base_uri:            string
+
+        @return:                   Dictionary with sub-service info.
+        @rtype:                    dict
+
+        """
         if self.SERVICES:
             ret = dict()
             for name in self.SERVICES.keys():
@@ -22,10 +22,58 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 A database access component, using JDBC
 
 """
+import urllib
+
+import restx.settings as settings
+
 # Imports all aspects of the API
-from restx.components.api import *
-from java.sql             import *
-from java.lang            import Class
+from restx.components.api       import *
+from restx.components.jdbc_pool import get_pool
+from java.sql                   import *
+
+class _RowStream(object):
+    """
+    Iterates over the rows of a JDBC result set.
+
+    The connection is handed back to the pool once all rows have been
+    read or when the stream is closed.
+
+    """
+    def __init__(self, pool, pc, results, make_row):
+        self.__pool     = pool
+        self.__pc       = pc
+        self.__results  = results
+        self.__make_row = make_row
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        if self.__results is None:
+            raise StopIteration()
+        try:
+            if self.__results.next():
+                return self.__make_row()
+        except:
+            self.close()
+            raise
+        self.close()
+        raise StopIteration()
+
+    def close(self):
+        results = self.__results
+        if results is None:
+            return
+        self.__results = None
+        try:
+            results.close()
+        finally:
+            self.__pool.release(self.__pc)
+
+    def __del__(self):
+        # In case the consumer gave up on the stream without closing it
+        self.close()
+
 
 class DatabaseAccess(BaseComponent):
     NAME             = "DatabaseAccess"
@@ -47,11 +95,11 @@ CURRENT LIMITATIONS:
  * The table has to have an auto-incrementing, numeric unique ID column. The
  name of this column needs to be specified during resource creation time.
 
- * Currently does not use bound variables and only does a very superficial
- way of checking for injection. This will be updated soon! In the meantime,
- since parameters are provided in-house during resource creation (done by a
+ * The where clauses are used as they are, only the values of the request
+ (IDs and the values of entries) are passed as bound variables. Since the
+ where clauses are provided in-house during resource creation (done by a
  trusted resource) and not via the request URI when accessing elements, this
- is slightly less critical. However, we will get around to change that.
+ is slightly less critical.
 
 
 USAGE NOTES:
@@ -108,6 +156,79 @@ name_value_pairs : If set then we return each table row as a dictionary with the
                    volume of the returned data. If it's set to 'No' then we return the
                    individual elements of each row just as a plain list.
 
+
+PUSHDOWN:
+
+
+Other components, such as the Filter, can hand their selection to the database
+instead of retrieving the entire table. When getting entries, these runtime
+parameters are accepted:
+
+
+pushdown_where :   A predicate as JSON list, which is added to the WHERE clause. Values
+                   are passed to the database as bound variables. For example:
+
+                       [ "and", [ "=", "city", "Berlin" ], [ ">", "amount", 100 ] ]
+
+                   Comparisons use the operators '=', '!=', '<', '>', '<=' and '>='
+                   on a column of the table. They can be combined with 'and', 'or'
+                   and 'not'. Like in the Filter component, a column without a
+                   value (NULL) is smaller than and different from any value.
+
+
+pushdown_columns : Comma separated list of columns, which restricts the columns of
+                   the result further.
+
+
+pushdown_limit :   The maximum number of entries that are returned. When paging,
+                   this is the maximum for all pages together.
+
+
+PAGING:
+
+
+Large tables can be read one page at a time. When getting entries, these
+runtime parameters are accepted:
+
+
+limit :            The number of entries per page. Entries are ordered by their ID.
+                   If there are more entries, a link to the next page is returned in
+                   the 'Link' header of the response.
+
+
+after_id :         Only return entries with an ID greater than this. The link to the
+                   next page uses this, since the database can find the start of the
+                   page through the ID, rather than skipping all previous entries.
+
+
+offset :           The number of entries to skip.
+
+
+Without a limit, entries are sent to the client while they are read from the
+database.
+
+
+BULK UPDATES:
+
+
+A JSON list of entries may be sent with POST or PUT to the 'entries' service,
+instead of a single entry. All of them are created or updated in a single
+transaction: If one of them fails, none of the entries are changed. For PUT,
+each entry needs to contain its ID. For POST, the response contains the URIs
+of the new entries, in the order in which they were sent. Some JDBC drivers
+don't return the IDs of all new entries of a batch, in which case the URIs
+are null. The number of statements that are sent to the database at once is
+configured with DB_BATCH_SIZE in the server's settings.
+
+
+CONNECTIONS:
+
+
+All resources for the same database share a pool of connections. The
+statements are prepared once per connection and then re-used. The 'pool'
+service shows statistics about the pool. The size of the pool and other
+limits are configured in the server's settings.
+
 """
 
 
@@ -131,38 +252,39 @@ name_value_pairs : If set then we return each table row as a dictionary with the
                            "entries" : {
                                "desc" : "The stored entries. You can POST a new entry, PUT an update, GET or DELETE an existing one. For PUT, GET and DELETE the ID of the entry needs to be specified as the 'id' parameter.",
                                "params" : {
-                                   "id"  : ParameterDef(PARAM_NUMBER, "The ID of the entry, needed for PUT and (optionally) GET", required=False, default=-1),
+                                   "id"               : ParameterDef(PARAM_NUMBER, "The ID of the entry, needed for PUT and (optionally) GET", required=False, default=-1),
+                                   "pushdown_where"   : ParameterDef(PARAM_STRING, "Structured predicate (JSON) for GET, which is added to the WHERE clause", required=False, default=""),
+                                   "pushdown_columns" : ParameterDef(PARAM_STRING, "Comma separated list of columns to return for GET", required=False, default=""),
+                                   "pushdown_limit"   : ParameterDef(PARAM_NUMBER, "Maximum number of entries to return for GET", required=False, default=-1),
+                                   "limit"            : ParameterDef(PARAM_NUMBER, "Number of entries per page for GET. A link to the next page is returned in the 'Link' header", required=False, default=-1),
+                                   "offset"           : ParameterDef(PARAM_NUMBER, "Number of entries to skip for GET", required=False, default=0),
+                                   "after_id"         : ParameterDef(PARAM_NUMBER, "Only GET entries with an ID greater than this", required=False, default=-1),
                                },
                                "positional_params": [ "id" ],
+                               "pushdown" : [ "where", "columns", "limit" ],
                                "output_types" : [ "application/json", "application/xml", "text/html", "text/csv", "application/ext+json" ],
                                "input_types" : [ "application/json", "application/x-www-form-urlencoded", "application/ext+json" ],
                                #"input_types" : None,
+                           },
+                           "pool" : {
+                               "desc" : "Statistics about the pool of connections to the database.",
+                               "input_types" : None,
                            }
                        }
 
-    CONNECTION_CACHE = dict()
-
     def __get_connection(self):
-        if self.db_connection_string in DatabaseAccess.CONNECTION_CACHE:
-            connection, table_columns = DatabaseAccess.CONNECTION_CACHE[self.db_connection_string]
-        else:
-            # Establish the connection
-            Class.forName(self.jdbc_driver_class)
-            connection = DriverManager.getConnection(self.db_connection_string)
-
-            # Get the column names
-            meta = connection.getMetaData()
-            res  = meta.getColumns(None, None, self.table_name, None);
-            table_columns = []
-            while (res.next()):
-                table_columns.append(res.getString("COLUMN_NAME"))
-
-            res.close()
-
-            # Store the connection and column info in the cache
-            DatabaseAccess.CONNECTION_CACHE[self.db_connection_string] = (connection, table_columns)
-
-        return connection, table_columns
+        #
+        # Borrow a connection from the pool for this database. It has
+        # to be handed back with self.__pool.release() when done.
+        #
+        self.__pool   = get_pool(self.jdbc_driver_class, self.db_connection_string)
+        pc            = self.__pool.borrow()
+        try:
+            table_columns = self.__pool.getTableColumns(pc, self.table_name)
+        except:
+            self.__pool.release(pc, broken=True)
+            raise
+        return pc, table_columns
 
     def __column_sanity_check(self, columns):
         elems = columns.split(",")
@@ -174,108 +296,390 @@ name_value_pairs : If set then we return each table row as a dictionary with the
             cols.append(e)
         return cols
 
-    def __get_where_str(self, id=None):
+    def __get_where_str(self, id, binds):
+        #
+        # The WHERE clause from the resource's where clauses and the ID.
+        # The ID is appended to 'binds'.
+        #
         if self.where2 != "-" and (self.where1 == "-"  or  not self.where1):
             # Making sure that where1 is set
             self.where1 = self.where2
             self.where2 = None
         if self.where1  and  self.where1 != "-":
             if id and id > -1:
-                where_str = " WHERE %s AND %s=%s" % (self.where1, self.id_column, id)
+                where_str = " WHERE %s AND %s=?" % (self.where1, self.id_column)
+                binds.append(id)
             else:
                 where_str = " WHERE %s" % self.where1
             if self.where2  and  self.where2 != "-":
                 where_str += " AND %s" % self.where2
         else:
             if id and id > -1:
-                where_str = " WHERE %s=%s" % (self.id_column, id)
+                where_str = " WHERE %s=?" % self.id_column
+                binds.append(id)
             else:
                 where_str = ""
         return where_str
 
-
-    def __get_entry(self, connection, table_columns, resource_columns, id):
+    def __bind(self, stmt, values):
+        #
+        # Set the parameters of a prepared statement.
+        #
+        for i, value in enumerate(values):
+            if value is not None  and  type(value) not in [ str, unicode, int, long, float, bool ]:
+                value = unicode(value)
+            stmt.setObject(i+1, value)
+
+    __PUSHDOWN_OPS = {
+        "="  : "=",
+        "!=" : "<>",
+        "<"  : "<",
+        ">"  : ">",
+        "<=" : "<=",
+        ">=" : ">=",
+    }
+
+    # Comparisons that are true for None in Python, but not for NULL in SQL.
+    __PUSHDOWN_NULL_OPS = [ "!=", "<", "<=" ]
+
+    def __pushdown_where_str(self, predicate, table_columns, binds):
+        #
+        # Translate a structured predicate into SQL with '?' placeholders.
+        # The values for the placeholders are appended to 'binds'. For
+        # example:
+        #
+        #     [ "and", [ "=", "city", "Berlin" ], [ ">", "amount", 100 ] ]
+        #
+        # becomes "((city = ?) AND (amount > ?))" with the binds
+        # [ "Berlin", 100 ].
+        #
+        # The predicate has to match the same rows as the Filter would. In
+        # Python, None is different from and smaller than anything else, so
+        # NULL columns match '!=', '<' and '<='.
+        #
+        if type(predicate) is not list  or  not predicate:
+            raise RestxBadRequestException("Malformed pushdown predicate")
+        op = predicate[0]
+        if op in [ "and", "or" ]:
+            if len(predicate) < 2:
+                raise RestxBadRequestException("Malformed pushdown predicate: '%s' without operands" % op)
+            parts = [ self.__pushdown_where_str(p, table_columns, binds) for p in predicate[1:] ]
+            return "(%s)" % (" %s " % op.upper()).join(parts)
+        if op == "not":
+            if len(predicate) != 2:
+                raise RestxBadRequestException("Malformed pushdown predicate: 'not' needs one operand")
+            return "(NOT %s)" % self.__pushdown_where_str(predicate[1], table_columns, binds)
+        if op in self.__PUSHDOWN_OPS:
+            if len(predicate) != 3:
+                raise RestxBadRequestException("Malformed pushdown predicate: '%s' needs a column and a value" % op)
+            column, value = predicate[1:]
+            if column not in table_columns:
+                raise RestxBadRequestException("Unknown column '%s' in pushdown predicate" % column)
+            if type(value) not in [ str, unicode, int, long, float, bool ]:
+                raise RestxBadRequestException("Unsupported value for column '%s' in pushdown predicate" % column)
+            binds.append(value)
+            if op in self.__PUSHDOWN_NULL_OPS:
+                return "(%s %s ? OR %s IS NULL)" % (column, self.__PUSHDOWN_OPS[op], column)
+            return "(%s %s ?)" % (column, self.__PUSHDOWN_OPS[op])
+        raise RestxBadRequestException("Unknown operator '%s' in pushdown predicate" % op)
+
+    def __next_link(self, last_id, limit, pushdown_params, remaining):
+        #
+        # The 'Link' header for the page after the one that ends with
+        # the entry 'last_id'.
+        #
+        # The pushdown limit is a limit for all pages together. The
+        # link carries the number of rows that 'remain' of it, if any.
+        #
+        params = [ (name, value) for name, value in pushdown_params if value not in [ "", -1 ]  and  name != "pushdown_limit" ]
+        if remaining > 0:
+            params.append(("pushdown_limit", remaining))
+        params.append(("after_id", last_id))
+        params.append(("limit", limit))
+        return '<%s/entries?%s>; rel="next"' % (self.getMyResourceUri(), urllib.urlencode(params))
+
+    def __get_entry(self, pc, table_columns, resource_columns, id, predicate, max_rows, limit, offset, after_id, pushdown_params):
         #
         # Getting data
         #
         # 'resource_columns' is a list of the column names, which are defined as comma-separated
         # string in self.columns
         #
-        where_str   = self.__get_where_str(id)
-        stmt        = connection.createStatement()
-        cmd_str     = str("SELECT %s FROM %s%s" % (self.columns, self.table_name, where_str))
-        results     = stmt.executeQuery(cmd_str)
-        data        = []
-        while (results.next()):
-            col_results = [ results.getObject(resource_columns.index(col_name)+1) for col_name in resource_columns ]
-            if self.name_value_pairs:
-                row_data = dict(zip(resource_columns, col_results))
+        # The optional 'predicate' is a structured predicate, which is added to the
+        # WHERE clause. With 'max_rows' greater than 0 no more than that many rows
+        # are returned.
+        #
+        # With a 'limit' greater than 0 only a page of that many rows is returned,
+        # together with a link to the next page. Pages are ordered by ID. The next
+        # page starts after the last ID of this page ('after_id'), which the database
+        # can find with the index on the ID, rather than having to skip 'offset' rows.
+        #
+        # Many rows are streamed to the client, rather than being read into a list
+        # first. In that case, the returned stream hands the connection back to the
+        # pool when it's done.
+        #
+        single         = id and id > -1
+        limit          = int(limit)
+        max_rows       = int(max_rows)
+        offset         = max(int(offset), 0)
+        if single:
+            limit      = -1
+            offset     = 0
+            after_id   = -1
+        binds          = []
+        where_str      = self.__get_where_str(id, binds)
+        clauses        = []
+        if predicate:
+            clauses.append(self.__pushdown_where_str(predicate, table_columns, binds))
+        if after_id > -1:
+            clauses.append("%s > ?" % self.id_column)
+            binds.append(after_id)
+        for clause in clauses:
+            if where_str:
+                where_str += " AND %s" % clause
             else:
-                row_data = col_results
-            data.append(row_data)
-
-        if id and id > -1:
+                where_str  = " WHERE %s" % clause
+
+        select_columns = list(resource_columns)
+        order_str      = ""
+        if limit > 0  or  offset > 0  or  after_id > -1:
+            order_str  = " ORDER BY %s" % self.id_column
+            if self.id_column not in select_columns:
+                # Needed for the link to the next page
+                select_columns.append(self.id_column)
+
+        if limit > 0  and  max_rows > 0:
+            count      = min(limit, max_rows)
+        else:
+            count      = max(limit, max_rows)
+        cmd_str        = str("SELECT %s FROM %s%s%s" % (", ".join(select_columns), self.table_name, where_str, order_str))
+        stmt           = pc.prepare(cmd_str)
+        self.__bind(stmt, binds)
+        if count > 0:
+            # One more row for a page, to see whether there is a next page
+            stmt.setMaxRows(offset + count + (limit > 0 and 1 or 0))
+        stmt.setFetchSize(settings.DB_FETCH_SIZE)
+        results        = stmt.executeQuery()
+
+        # The positions of the columns in the result are the same for all rows
+        positions      = range(1, len(resource_columns)+1)
+        get            = results.getObject
+        make_values    = lambda: [ get(i) for i in positions ]
+        if self.name_value_pairs:
+            make_row   = lambda: dict(zip(resource_columns, make_values()))
+        else:
+            make_row   = make_values
+
+        try:
+            for i in xrange(offset):
+                if not results.next():
+                    break
+            if not single  and  limit <= 0:
+                result = Result.ok(_RowStream(self.__pool, pc, results, make_row))
+                self.__streaming = True
+                return result
+            # The rows are read as lists of values, which become the
+            # columns of a table if we return name/value pairs.
+            id_pos     = select_columns.index(self.id_column) + 1
+            data       = []
+            last_id    = None
+            next_link  = None
+            while results.next():
+                if limit > 0  and  len(data) == count:
+                    # There is a next page, unless the pushdown limit has been reached
+                    if max_rows <= 0:
+                        next_link = self.__next_link(last_id, limit, pushdown_params, -1)
+                    elif max_rows > count:
+                        next_link = self.__next_link(last_id, limit, pushdown_params, max_rows - count)
+                    break
+                data.append(make_values())
+                if limit > 0:
+                    last_id = results.getObject(id_pos)
+        finally:
+            if not self.__streaming:
+                results.close()
+
+        if single:
             # Only one result
             if len(data) == 0:
                 return Result.notFound("Could not find entity with id '%s'" % id)
             elif len(data) > 1:
                 return Result.internalServerError("Data inconsistency")
+            elif self.name_value_pairs:
+                return Result.ok(dict(zip(resource_columns, data[0])))
             else:
-                data = data[0]
+                return Result.ok(data[0])
 
-        return Result.ok(data)
+        if self.name_value_pairs:
+            data = Table.fromRows(resource_columns, data)
+        result = Result.ok(data)
+        if next_link:
+            result.addHeader("Link", next_link)
+        return result
 
-    def __post_entry(self, connection, obj, colnames):
+    def __entry_uri(self, new_id):
+        return str(Url("%s/%d" % (self.getMyResourceUri(), new_id)))
+
+    def __insert_str(self, colnames):
         colstr    = ', '.join(colnames)
-        valstr    = ', '.join([(str(obj[k]) if type(obj[k]) in [int, long, float] else "'%s'" % obj[k]) for k in colnames ])
-        stmt      = connection.createStatement()
-        cmd_str   = str("INSERT INTO %s (%s) VALUES (%s)" % (self.table_name, colstr, valstr))
-        res       = stmt.executeUpdate(cmd_str, Statement.RETURN_GENERATED_KEYS)
+        valstr    = ', '.join([ "?" for k in colnames ])
+        return str("INSERT INTO %s (%s) VALUES (%s)" % (self.table_name, colstr, valstr))
+
+    def __update_str(self, colnames):
+        colsets   = ', '.join([ "%s=?" % k for k in colnames ])
+        return str("UPDATE %s SET %s WHERE %s=?" % (self.table_name, colsets, self.id_column))
+
+    def __post_entry(self, pc, obj, colnames):
+        stmt      = pc.prepare(self.__insert_str(colnames), Statement.RETURN_GENERATED_KEYS)
+        self.__bind(stmt, [ obj[k] for k in colnames ])
+        res       = stmt.executeUpdate()
         if res == 0:
             return Result.internalServerError("Cannot create new entry.")
         generated_keys = stmt.getGeneratedKeys()
-        generated_keys.next()
-        new_id = generated_keys.getLong(1)
-        stmt.close()
-        return Result.created(str(Url("%s/%d" % (self.getMyResourceUri(), new_id))))
-
-    def __put_entry(self, connection, obj, colnames, id):
-        # Check that this element exists in the database
-        # The new ID we will use to store this object
-        stmt    = connection.createStatement()
-        cmd_str = str("SELECT count(*) FROM %s WHERE %s=%d" % (self.table_name, self.id_column, id))
-        res     = stmt.executeQuery(cmd_str)
-        res.next()
-        num     = res.getInt(1)
-        stmt.close()
-        if num > 1:
+        try:
+            generated_keys.next()
+            new_id = generated_keys.getLong(1)
+        finally:
+            generated_keys.close()
+        return Result.created(self.__entry_uri(new_id))
+
+    def __put_entry(self, pc, obj, colnames, id):
+        # The ID is unique, so the update either finds the entry or not. There
+        # is no need to check for its existence first.
+        stmt    = pc.prepare(self.__update_str(colnames))
+        self.__bind(stmt, [ obj[k] for k in colnames ] + [ id ])
+        res     = stmt.executeUpdate()
+        if res > 1:
             return Result.internalServerError("Data inconsistency")
-        elif num == 0:
-            return Result.notFound("Entry with id '%d' cannot be found" % id)
-
-        colsets = ', '.join([ ("%s=%s" % (k, (str(obj[k]) if type(obj[k]) in [int, long, float] else "'%s'" % obj[k]))) for k in colnames ])
-        cmd_str = str("UPDATE %s SET %s WHERE %s=%d" % (self.table_name, colsets, self.id_column, id))
-        stmt    = connection.createStatement()
-        res = stmt.executeUpdate(cmd_str)
-        stmt.close()
-        if res > 0:
+        elif res > 0:
             return Result.ok("Updated %d columns" % res)
         else:
             return Result.notFound("Could not find entry '%d' for update." % id)
 
-    def __delete_entry(self, connection, id):
+    def __execute_batch(self, stmt, num, get_keys):
+        #
+        # Send the batched statements to the database. Returns the update
+        # counts, or the generated keys if 'get_keys' is set. Not all drivers
+        # return the keys for every statement of a batch, in which case the
+        # keys are None.
+        #
+        counts = list(stmt.executeBatch())
+        if not get_keys:
+            return counts
+        keys           = list()
+        generated_keys = stmt.getGeneratedKeys()
+        try:
+            while generated_keys.next():
+                keys.append(generated_keys.getLong(1))
+        finally:
+            generated_keys.close()
+        if len(keys) != num:
+            return [ None ] * num
+        return keys
+
+    def __bulk_entries(self, pc, table_columns, method, objs):
+        #
+        # Create or update several entries in a single transaction. The
+        # statements are sent to the database in batches of up to
+        # DB_BATCH_SIZE. Entries with the same columns share a statement.
+        #
+        is_post = method == HttpMethod.POST
+        if not objs:
+            return Result.badRequest("Format error: No information in request")
+        shapes  = list()
+        for i, obj in enumerate(objs):
+            if type(obj) is not dict:
+                return Result.badRequest("Format error: Expected JSON dictionary as entry %d" % i)
+            if is_post:
+                # We set the ID ourselves, just quietly remove it if it was specified
+                obj.pop(self.id_column, None)
+            elif self.id_column not in obj:
+                return Result.badRequest("Format error: Entry %d has no '%s'" % (i, self.id_column))
+            msg = self.__check_entry(obj, table_columns)
+            if msg:
+                return Result.badRequest(msg)
+            cols = tuple([ name for name in table_columns if name in obj  and  name != self.id_column ])
+            if not cols:
+                return Result.badRequest("Format error: No information in entry %d" % i)
+            shapes.append(cols)
+
+        connection = pc.connection
+        connection.setAutoCommit(False)
+        try:
+            try:
+                out     = list()
+                stmt    = None
+                shape   = None
+                pending = 0
+                for obj, cols in zip(objs, shapes):
+                    if cols != shape  or  pending == settings.DB_BATCH_SIZE:
+                        if pending:
+                            out.extend(self.__execute_batch(stmt, pending, is_post))
+                        shape   = cols
+                        pending = 0
+                        if is_post:
+                            stmt = pc.prepare(self.__insert_str(cols), Statement.RETURN_GENERATED_KEYS)
+                        else:
+                            stmt = pc.prepare(self.__update_str(cols))
+                    if is_post:
+                        self.__bind(stmt, [ obj[k] for k in cols ])
+                    else:
+                        self.__bind(stmt, [ obj[k] for k in cols ] + [ obj[self.id_column] ])
+                    stmt.addBatch()
+                    pending += 1
+                if pending:
+                    out.extend(self.__execute_batch(stmt, pending, is_post))
+
+                if not is_post:
+                    missing = [ str(obj[self.id_column]) for obj, count in zip(objs, out) if count == 0 ]
+                    if missing:
+                        connection.rollback()
+                        return Result.notFound("Could not find entries for update: %s" % ", ".join(missing))
+                connection.commit()
+            except:
+                connection.rollback()
+                raise
+        finally:
+            connection.setAutoCommit(True)
+
+        if is_post:
+            return Result.created("%s/entries" % self.getMyResourceUri(),
+                                  [ (new_id is not None and self.__entry_uri(new_id) or None) for new_id in out ])
+        else:
+            return Result.ok("Updated %d entries" % len(objs))
+
+    def __check_entry(self, obj, table_columns):
+        #
+        # Return an error message if the entry refers to columns that
+        # don't exist or can't be used.
+        #
+        # Getting the column names for the table and making sure that we are
+        # only referring to existing columns
+        for name in obj.keys():
+            if name not in table_columns:
+                return "Unknown column '%s' in input" % name
+
+        # Some sanity checking on those. The values are passed
+        # as bound variables, so they don't need to be checked.
+        for name in obj.keys():
+            for illegal in ";*()":
+                if illegal in name:
+                    return "Illegal character in column name: " + name
+        return None
+
+    def __delete_entry(self, pc, id):
         # Check that this element exists in the database
         # The new ID we will use to store this object
-        stmt    = connection.createStatement()
-        cmd_str = str("DELETE FROM %s WHERE %s=%d" % (self.table_name, self.id_column, id))
-        res     = stmt.executeUpdate(cmd_str)
-        stmt.close()
+        cmd_str = str("DELETE FROM %s WHERE %s=?" % (self.table_name, self.id_column))
+        stmt    = pc.prepare(cmd_str)
+        self.__bind(stmt, [ id ])
+        res     = stmt.executeUpdate()
         if res > 0:
             return Result.ok("Deleted %d columns" % res)
         else:
             return Result.notFound("Could not find entry '%d' for deletion." % id)
      
-    def entries(self, method, input, id):
+    def entries(self, method, input, id, pushdown_where, pushdown_columns, pushdown_limit, limit, offset, after_id):
         """
         Represents the 'entries' resource of this database table.
 
@@ -284,8 +688,18 @@ name_value_pairs : If set then we return each table row as a dictionary with the
 
         """
 
-        connection, table_columns = self.__get_connection()
-
+        pc, table_columns = self.__get_connection()
+        # Set if the result streams the rows and hands the connection back itself
+        self.__streaming  = False
+        try:
+            return self.__entries(pc, table_columns, method, input, id, pushdown_where, pushdown_columns, pushdown_limit,
+                                  limit, offset, after_id)
+        finally:
+            if not self.__streaming:
+                self.__pool.release(pc)
+
+    def __entries(self, pc, table_columns, method, input, id, pushdown_where, pushdown_columns, pushdown_limit,
+                  limit, offset, after_id):
         if self.columns  and  self.columns != "*":
             resource_columns = self.__column_sanity_check(self.columns)
         else:
@@ -295,7 +709,21 @@ name_value_pairs : If set then we return each table row as a dictionary with the
             #
             # Getting data
             #
-            return self.__get_entry(connection, table_columns, resource_columns, id)
+            if pushdown_columns:
+                # Can only narrow down the columns of this resource
+                columns = self.__column_sanity_check(pushdown_columns)
+                for name in columns:
+                    if name not in resource_columns:
+                        return Result.badRequest("Unknown column '%s' in pushdown columns" % name)
+                resource_columns = columns
+            if pushdown_where:
+                predicate = self.fromJson(pushdown_where)
+            else:
+                predicate = None
+            pushdown_params = [ ("pushdown_where", pushdown_where), ("pushdown_columns", pushdown_columns),
+                                ("pushdown_limit", pushdown_limit) ]
+            return self.__get_entry(pc, table_columns, resource_columns, id, predicate, pushdown_limit,
+                                    limit, offset, after_id, pushdown_params)
 
         elif self.allow_updates:
 
@@ -304,6 +732,11 @@ name_value_pairs : If set then we return each table row as a dictionary with the
                 # Creating a new entry or updating an existing one
                 #
                 obj = input
+                if type(obj) is list:
+                    # Several of them at once. Updates carry their own IDs.
+                    if id > 0:
+                        return Result.badRequest("Cannot specify an ID for several entries")
+                    return self.__bulk_entries(pc, table_columns, method, obj)
                 if type(obj) is not dict:
                     return Result.badRequest("Format error: Excpected JSON dictionary as input")
 
@@ -320,29 +753,18 @@ name_value_pairs : If set then we return each table row as a dictionary with the
                 if not obj:
                     return Result.badRequest("Format error: No information in request")
 
-                # Getting the column names for the table and making sure that we are
-                # only referring to existing columns
-                for name in obj.keys():
-                    if name not in table_columns:
-                        return Result.badRequest("Unknown column '%s' in input" % name)
-
-                # Some sanity checking on those
-                for name, value in obj.items():
-                    for illegal in ";*()":
-                        if illegal in name:
-                            return Result.badRequest("Illegal character in column name: " + name)
-                        if type(value) in [ str, unicode ]:
-                            if illegal in value:
-                                return Result.badRequest("Illegal character in value for column '%s'" % name)
+                msg = self.__check_entry(obj, table_columns)
+                if msg:
+                    return Result.badRequest(msg)
 
                 # Get the properly ordered list of columns that we have actually specified.
                 # This allows us to ommit optional values.
                 cols = [ name for name in table_columns if name in obj ]
 
                 if method == HttpMethod.POST:
-                    return self.__post_entry(connection, obj, cols)
+                    return self.__post_entry(pc, obj, cols)
                 else:
-                    return self.__put_entry(connection, obj, cols, id)
+                    return self.__put_entry(pc, obj, cols, id)
 
             elif method == HttpMethod.DELETE:
                 #
@@ -350,9 +772,16 @@ name_value_pairs : If set then we return each table row as a dictionary with the
                 #
                 if id < 1:
                     return Result.badRequest("Need to specify a valid entry ID for delete.")
-                return self.__delete_entry(connection, id)
+                return self.__delete_entry(pc, id)
 
         else:
             return Result.unauthorized("You don't have permission to modify this resource")
 
+    def pool(self, method, input):
+        """
+        Return statistics about the connection pool for this database.
+
+        """
+        return Result.ok(get_pool(self.jdbc_driver_class, self.db_connection_string).getStats())
+
 
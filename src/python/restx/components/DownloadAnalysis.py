@@ -40,19 +40,21 @@ class DownloadAnalysis(BaseComponent):
         
 
     def referrers(self, method, input):
-        status, access_log   = accessResource(self.access_log_resource)
-        status, download_log = accessResource(self.download_log_resource)
+        (status, access_log), (status, download_log) = accessResources([ self.access_log_resource,
+                                                                         self.download_log_resource ])
         # Get all IP addresses from which we downloaded
         download_ips = dict([ (e.split(" ", 1)[0], e.split(" ", 1)[1].split()[2][1:]) for e in download_log ] )
-        result = list()
+        # The result is a table, so the column names are only stored once
+        column_names = [ "download_time", "firstcontact_time", "ipaddr", "referrer", "trace" ]
+        rows         = list()
         for line in access_log:
             elems = line.split('"')
             ip_date = elems[0].split(" ",1)
             ip = ip_date[0]
             dt = ip_date[1].split()[2][1:]
             if ip in download_ips:
-                result.append(dict(firstcontact_time=dt, download_time=download_ips[ip], ipaddr=ip,
-                                   trace="%s/subset?filter=%s&unique_only=f" % (self.access_log_resource, ip), referrer=elems[3]))
+                rows.append((download_ips[ip], dt, ip, elems[3],
+                             "%s/subset?filter=%s&unique_only=f" % (self.access_log_resource, ip)))
 
-        return Result.ok(result)
+        return Result.ok(Table.fromRows(column_names, rows))
 
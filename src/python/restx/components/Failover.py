@@ -25,10 +25,84 @@ try the second URI and so on.
 
 For each URI a separate timeout can be specified.
 
+Instead of trying the URIs one after the other, the requests can also be
+sent in parallel ('race'), or the next URI can be tried once the previous
+one is slower than usual ('hedge').
+
 """
 
+# Python imports
+import time
+import Queue
+import threading
+
 from restx.components.api import *
 
+
+class _SiteLatencies(object):
+    """
+    Rolling response time statistics for the URIs used by Failover resources.
+
+    The most recent WINDOW response times are kept for each URI.
+
+    """
+    WINDOW = 100
+
+    def __init__(self):
+        self.__samples = dict()
+        self.__lock    = threading.Lock()
+
+    def record(self, uri, elapsed):
+        """
+        Add a response time for the URI.
+
+        @param uri:      The URI that was accessed.
+        @type uri:       string
+
+        @param elapsed:  The response time in seconds.
+        @type elapsed:   float
+
+        """
+        self.__lock.acquire()
+        try:
+            samples = self.__samples.setdefault(uri, list())
+            samples.append(elapsed)
+            if len(samples) > self.WINDOW:
+                del samples[0]
+        finally:
+            self.__lock.release()
+
+    def percentile(self, uri, pct, min_samples=1):
+        """
+        Return the given percentile of the recent response times of the URI.
+
+        @param uri:          The URI.
+        @type uri:           string
+
+        @param pct:          The percentile, between 0 and 100.
+        @type pct:           int
+
+        @param min_samples:  Return None if fewer samples than this are known.
+        @type min_samples:   int
+
+        @return:             Response time in seconds, or None.
+        @rtype:              float
+
+        """
+        self.__lock.acquire()
+        try:
+            samples = sorted(self.__samples.get(uri, list()))
+        finally:
+            self.__lock.release()
+        if not samples  or  len(samples) < min_samples:
+            return None
+        i = min(len(samples) - 1, int(len(samples) * pct / 100.0))
+        return samples[i]
+
+
+SITE_LATENCIES = _SiteLatencies()
+
+
 class Failover(BaseComponent):
 
     NAME             = "Failover"
@@ -74,6 +148,25 @@ cannot get the data that we expect from any of the URIs then the status code
 is always going to be 408.
 
 
+How the URIs are tried is determined by the 'strategy':
+
+    sequential:  Try one URI after the other, as described above. The
+                 worst case response time is the sum of all timeouts.
+
+    race:        Send the request to all URIs at the same time and return
+                 the first acceptable response.
+
+    hedge:       Send the request to the first URI. If there is no
+                 acceptable response within the time in which that URI
+                 usually answers (the 95th percentile of its recent response
+                 times), or if it fails, also send the request to the next
+                 URI, and so on. The first acceptable response is returned.
+
+With 'race' and 'hedge' the responses that arrive later are ignored.
+Please note that this means that a POST may be processed by more than
+one of the URIs.
+
+
 Currently, GET and POST operations are supported.
 </pre>
 """
@@ -88,6 +181,8 @@ Currently, GET and POST operations are supported.
                            "account_name" :       ParameterDef(PARAM_STRING, "Account name", required=False, default=""),
                            "account_password" :   ParameterDef(PARAM_STRING, "Account pasasword", required=False, default=""),
                            "expected_status" :    ParameterDef(PARAM_NUMBER, "Expected status code. If not received then this is treated like a timeout: We move on to the next URI. If no more URIs are available, we return this status code. (0 means: No particular status, anything that's not a timeout will be returned)", required=False, default=0),
+                           "strategy" :           ParameterDef(PARAM_STRING, "How the URIs are tried: 'sequential', 'race' or 'hedge'", required=False, default="sequential",
+                                                               choices=[ "sequential", "race", "hedge" ]),
                        }
     
     SERVICES         = {
@@ -97,6 +192,124 @@ Currently, GET and POST operations are supported.
                        }
         
 
+    # Hedging uses this delay for URIs with fewer than HEDGE_MIN_SAMPLES
+    # known response times.
+    HEDGE_MIN_SAMPLES   = 10
+    HEDGE_INITIAL_DELAY = 1.0
+
+    def __is_acceptable(self, code):
+        """
+        Return True if the status code means that we are done.
+
+        """
+        if self.expected_status > 0:
+            return self.expected_status == code
+        else:
+            # No expected status, so anything that's not a timeout is good
+            return code != HTTP.REQUEST_TIMEOUT
+
+    def __send(self, method, input, uri, timeout):
+        """
+        Send the request to one URI and record the response time.
+
+        @return:    Code and response data tuple.
+        @rtype:     tuple
+
+        """
+        start = time.time()
+        try:
+            if method == HttpMethod.POST:
+                return self.httpPost(uri, input, timeout=timeout)
+            else:
+                return self.httpGet(uri, timeout=timeout)
+        finally:
+            SITE_LATENCIES.record(uri, time.time() - start)
+
+    def __send_async(self, method, input, uri, timeout, results):
+        """
+        Send the request to one URI in a new thread.
+
+        The outcome is put on the results queue as (code, data). Failed
+        requests are reported as timed out, since we move on to the other URIs.
+
+        """
+        def run():
+            try:
+                code, data = self.__send(method, input, uri, timeout)
+            except Exception, e:
+                code, data = HTTP.REQUEST_TIMEOUT, str(e)
+            results.put((code, data))
+        t = threading.Thread(target=run)
+        # Nobody waits for the requests that lost the race
+        t.setDaemon(True)
+        t.start()
+
+    def __hedge_delay(self, uri, timeout):
+        """
+        Return how long we wait for the URI before trying the next one as well.
+
+        """
+        delay = SITE_LATENCIES.percentile(uri, 95, self.HEDGE_MIN_SAMPLES)
+        if delay is None:
+            delay = self.HEDGE_INITIAL_DELAY
+        if timeout is not None:
+            delay = min(delay, timeout)
+        return delay
+
+    def __sequential(self, method, input, targets):
+        data = ""
+        for uri, timeout in targets:
+            code, data = self.__send(method, input, uri, timeout)
+            if self.__is_acceptable(code):
+                return Result(code, data)
+        return Result(HTTP.REQUEST_TIMEOUT, data)
+
+    def __parallel(self, method, input, targets, hedge):
+        """
+        Send the request to several URIs and return the first acceptable result.
+
+        For a race, all requests are sent right away. For hedging, the next
+        request is only sent if nothing acceptable arrived within the hedge
+        delay of the most recently started request, or if all started
+        requests failed.
+
+        """
+        results = Queue.Queue()
+        started = 0
+        pending = 0
+        launch  = True
+        data    = ""
+        while True:
+            if launch:
+                if hedge:
+                    stop = started + 1
+                else:
+                    stop = len(targets)
+                while started < stop:
+                    uri, timeout = targets[started]
+                    self.__send_async(method, input, uri, timeout, results)
+                    started += 1
+                    pending += 1
+                launch = False
+            if pending == 0:
+                return Result(HTTP.REQUEST_TIMEOUT, data)
+            if hedge  and  started < len(targets):
+                uri, timeout = targets[started - 1]
+                wait = self.__hedge_delay(uri, timeout)
+            else:
+                wait = None
+            try:
+                code, data = results.get(True, wait)
+            except Queue.Empty:
+                # No acceptable response in time: Also try the next URI
+                launch = True
+                continue
+            pending -= 1
+            if self.__is_acceptable(code):
+                return Result(code, data)
+            if pending == 0  and  started < len(targets):
+                launch = True
+
     def access(self, method, input):
         if method not in [ HttpMethod.GET, HttpMethod.POST ]:
             return Result(HTTP.METHOD_NOT_ALLOWED, "Only supporting GET or POST for this resource")
@@ -110,28 +323,17 @@ Currently, GET and POST operations are supported.
             self.httpSetCredentials(self.account_name, self.account_password)
 
         try_targets = [ (self.site_1_uri, self.site_1_timeout), (self.site_2_uri, self.site_2_timeout), (self.site_3_uri, self.site_3_timeout) ]
-        data = ""
+        targets = list()
         for uri, timeout in try_targets:
             if uri:
                 if timeout < 0:
                     timeout = None
+                targets.append((uri, timeout))
 
-                if method == HttpMethod.POST:
-                    code, data = self.httpPost(uri, input, timeout=timeout)
-                elif method == HttpMethod.GET:
-                    code, data = self.httpGet(uri, timeout=timeout)
-
-                if self.expected_status > 0:
-                    if self.expected_status == code:
-                        # We got exactly what we were looking for
-                        return Result(code, data)
-                    else:
-                        # Not the result we are looking for yet
-                        continue
-                else:
-                    # No expected status, so anything that's not a timeout is good
-                    if code != HTTP.REQUEST_TIMEOUT:
-                        return Result(code, data)
-            
-        return Result(HTTP.REQUEST_TIMEOUT, data)
+        if self.strategy == "race":
+            return self.__parallel(method, input, targets, hedge=False)
+        elif self.strategy == "hedge":
+            return self.__parallel(method, input, targets, hedge=True)
+        else:
+            return self.__sequential(method, input, targets)
 
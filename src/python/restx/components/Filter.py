@@ -20,8 +20,8 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 """
 The Filter component takes input from a single resource, assuming
-the input is formatted as a list of dictionaries, or a dictionary
-of dictionaries. It detects the format automatically.
+the input is formatted as a list of dictionaries, a dictionary
+of dictionaries or a table. It detects the format automatically.
 
 Based on a filter expression, it removes top-level elements from
 the input.
@@ -29,10 +29,172 @@ the input.
 """
 
 import shlex
+import operator
+import itertools
+import threading
+
+try:
+    import numpy
+except ImportError:
+    # Not available under Jython. Comparisons are done in Python then.
+    numpy = None
 
 # Imports all aspects of the API
 from restx.components.api import *
 
+
+# Marks elements that could not be found in a top-level element
+_MISSING = object()
+
+_NUMERIC_TYPES = set([ int, long, float ])
+
+# Columns need at least this many values for NumPy to be worth it
+NUMPY_MIN_ROWS = 1000
+
+
+class _Comparison(object):
+    """
+    A single filter expression: Search expression, operator and value.
+
+    """
+    def __init__(self, search_list, op, op_func, value):
+        self.search_list = search_list
+        self.op          = op
+        self.op_func     = op_func
+        self.value       = value
+
+    def __get_elem(self, obj):
+        try:
+            for elem in self.search_list:
+                obj = obj[elem]
+            return obj
+        except Exception, e:
+            return _MISSING
+
+    def matches(self, obj):
+        """
+        Return True if the element identified in the top-level element matches.
+
+        """
+        elem = self.__get_elem(obj)
+        if elem is _MISSING:
+            return False
+        try:
+            return bool(self.op_func(elem, self.value))
+        except Exception, e:
+            return False
+
+    def __column(self, rows):
+        """
+        Return the identified element of each top-level element.
+
+        Elements that can't be found are returned as _MISSING.
+
+        """
+        if len(self.search_list) == 1:
+            key = self.search_list[0]
+            if isinstance(rows, Table):
+                if key in rows.getColumnNames():
+                    return rows.getColumnList(key)
+                return [ _MISSING ] * len(rows)
+            try:
+                return map(operator.itemgetter(key), rows)
+            except Exception, e:
+                # Some rows don't have it
+                pass
+            if set(map(type, rows)) == set([ dict ]):
+                return map(dict.get, rows, itertools.repeat(key, len(rows)), itertools.repeat(_MISSING, len(rows)))
+        get_elem = self.__get_elem
+        return [ get_elem(row) for row in rows ]
+
+    def select(self, rows):
+        """
+        Return a list of flags, which indicate which top-level elements match.
+
+        """
+        column  = self.__column(rows)
+        value   = self.value
+        op_func = self.op_func
+        if numpy  and  len(column) >= NUMPY_MIN_ROWS  and  type(value) in _NUMERIC_TYPES  and  \
+                set(map(type, column)) <= _NUMERIC_TYPES:
+            arr = numpy.array(column)
+            if arr.dtype != object:
+                return op_func(arr, value).tolist()
+        try:
+            flags = map(op_func, column, itertools.repeat(value, len(column)))
+        except Exception, e:
+            # Some elements can't be compared with the value
+            return [ self.matches(row) for row in rows ]
+        if _MISSING in column:
+            for i, elem in enumerate(column):
+                if elem is _MISSING:
+                    flags[i] = False
+        return flags
+
+
+class _And(object):
+    """
+    Matches if all of its expressions match.
+
+    """
+    def __init__(self, children):
+        self.children = children
+
+    def matches(self, obj):
+        for child in self.children:
+            if not child.matches(obj):
+                return False
+        return True
+
+    def select(self, rows):
+        flags = self.children[0].select(rows)
+        for child in self.children[1:]:
+            flags = map(operator.and_, flags, child.select(rows))
+        return flags
+
+
+class _Or(object):
+    """
+    Matches if any of its expressions match.
+
+    """
+    def __init__(self, children):
+        self.children = children
+
+    def matches(self, obj):
+        for child in self.children:
+            if child.matches(obj):
+                return True
+        return False
+
+    def select(self, rows):
+        flags = self.children[0].select(rows)
+        for child in self.children[1:]:
+            flags = map(operator.or_, flags, child.select(rows))
+        return flags
+
+
+class _Not(object):
+    """
+    Matches if its expression doesn't.
+
+    """
+    def __init__(self, child):
+        self.child = child
+
+    def matches(self, obj):
+        return not self.child.matches(obj)
+
+    def select(self, rows):
+        return map(operator.not_, self.child.select(rows))
+
+
+# Compiled filters, by the parameters of the Filter resource
+_COMPILED      = dict()
+_COMPILED_LOCK = threading.Lock()
+_COMPILED_MAX  = 1000
+
+
 class Filter(BaseComponent):
 
     # Name, description and doc string of the component as it should appear to the user.
@@ -56,14 +218,28 @@ and a 'Value Expression' (which identifies the value(s) that this element must
 match).
 
 
-Currently, only simple filter expressions are supported.  AND, OR, XOR or
-parenthesis to build more complex filter expressions might be provided later.
+Several filter expressions can be combined with AND, OR and NOT, using
+parentheses for grouping. NOT takes precedence over AND, which takes
+precedence over OR. For example:
+
+
+    ( foo = xyz OR foo = abc ) AND NOT bar > 100
+
+
+The keywords need to be in upper case. Inside of parentheses, values that
+contain ')' need to be quoted.
 
 
 Filter expressions are used to define a PASS filter: Only those elements matching
 this pass filter appear in the output.
 
 
+Some resources, for example those of the DatabaseAccess component, can do the
+filtering themselves. If the input resource is one of those then comparisons
+of top-level elements are handed to it, so that only the matching elements
+need to be retrieved.
+
+
 Quick start
 -----------
     Example 1:
@@ -296,14 +472,16 @@ to that type then the element is considered not-matched.
                        }
 
     __OP_LIST = {
-        "="  : lambda x,y: x == y,
-        ">"  : lambda x,y: x > y,
-        ">=" : lambda x,y: x >= y,
-        "<"  : lambda x,y: x < y,
-        "<=" : lambda x,y: x <= y,
-        "!=" : lambda x,y: x != y,
+        "="  : operator.eq,
+        ">"  : operator.gt,
+        ">=" : operator.ge,
+        "<"  : operator.lt,
+        "<=" : operator.le,
+        "!=" : operator.ne,
     }
 
+    __KEYWORDS = [ "AND", "OR", "NOT" ]
+
     def __parse_value(self, value):
         #
         # Examine the value, extracted as a string from a filter
@@ -402,63 +580,242 @@ to that type then the element is considered not-matched.
             obj = obj[elem]
         return obj
         
-    def filter(self, method, input, negate):
+    def __tokenize(self, expression):
+        #
+        # Split a complex filter expression into its simple filter
+        # expressions, the keywords and the parentheses. For example:
         #
-        # Parse the filter expression, performing some sanity checking
+        #     '( a = 1 OR b = "x y" ) AND NOT c/d > 2'
         #
-        search_expres = list()   # List of tuples of all search lists, operators and values
-        res = self._filter_compile(self.filter_expression_1)
-        if not res:
-            raise RestxException("Filter epxression 1 is invalid")
-        search_expres.append(res)
-
-        if self.filter_expression_2:
-            res = self._filter_compile(self.filter_expression_2)
-            if not res:
-                raise RestxException("Filter epxression 2 is invalid")
-            search_expres.append(res)
-
-        if self.filter_expression_3:
-            res = self._filter_compile(self.filter_expression_3)
-            if not res:
-                raise RestxException("Filter epxression 3 is invalid")
-            search_expres.append(res)
-
-        status, data = self.accessResource(self.input_resource_uri)
+        # becomes:
+        #
+        #     [ '(', 'a = 1', 'OR', 'b = "x y"', ')', 'AND', 'NOT', 'c/d > 2' ]
+        #
+        tokens    = list()
+        term      = ""
+        depth     = 0
+        in_quotes = False
+        i         = 0
+        while i < len(expression):
+            c = expression[i]
+            if c == '"':
+                in_quotes = not in_quotes
+            elif not in_quotes:
+                at_word_start = i == 0  or  expression[i-1] in " \t()"
+                keyword       = None
+                if at_word_start:
+                    for kw in self.__KEYWORDS:
+                        if expression.startswith(kw, i)  and  expression[i+len(kw):i+len(kw)+1] in [ "", " ", "\t", "(" ]:
+                            keyword = kw
+                            break
+                if keyword:
+                    tokens.append(term)
+                    tokens.append(keyword)
+                    term = ""
+                    i   += len(keyword)
+                    continue
+                if c == "("  and  not term.strip():
+                    tokens.append(term)
+                    tokens.append("(")
+                    term   = ""
+                    depth += 1
+                    i     += 1
+                    continue
+                if c == ")"  and  depth > 0:
+                    tokens.append(term)
+                    tokens.append(")")
+                    term   = ""
+                    depth -= 1
+                    i     += 1
+                    continue
+            term += c
+            i    += 1
+        tokens.append(term)
+        return [ t.strip() for t in tokens if t.strip() ]
+
+    def _expression_compile(self, expression):
+        #
+        # Compile a filter expression, which may combine simple filter
+        # expressions with AND, OR, NOT and parentheses, into an object
+        # with 'matches(elem)' and 'select(elems)' methods.
+        #
+        tokens = self.__tokenize(expression)
+        pos    = [ 0 ]
+
+        def peek():
+            if pos[0] < len(tokens):
+                return tokens[pos[0]]
+            return None
+
+        def take():
+            t = peek()
+            if t is None:
+                raise RestxException("Malformed filter expression: Unexpected end of expression")
+            pos[0] += 1
+            return t
+
+        def parse_or():
+            children = [ parse_and() ]
+            while peek() == "OR":
+                take()
+                children.append(parse_and())
+            if len(children) == 1:
+                return children[0]
+            return _Or(children)
+
+        def parse_and():
+            children = [ parse_not() ]
+            while peek() == "AND":
+                take()
+                children.append(parse_not())
+            if len(children) == 1:
+                return children[0]
+            return _And(children)
+
+        def parse_not():
+            t = take()
+            if t == "NOT":
+                return _Not(parse_not())
+            if t == "(":
+                node = parse_or()
+                if take() != ")":
+                    raise RestxException("Malformed filter expression: Missing ')'")
+                return node
+            if t in [ ")", "AND", "OR" ]:
+                raise RestxException("Malformed filter expression: Unexpected '%s'" % t)
+            search_list, op, value = self._filter_compile(t)
+            if op not in self.__OP_LIST:
+                raise RestxException("Malformed filter expression: Unknown operator '%s'" % op)
+            return _Comparison(search_list, op, self.__OP_LIST[op], value)
+
+        node = parse_or()
+        if peek() is not None:
+            raise RestxException("Malformed filter expression: Unexpected '%s'" % peek())
+        return node
+
+    def __get_predicate(self):
+        #
+        # Return the compiled filter for the filter expressions of this
+        # resource. Filters are only compiled once and then re-used for
+        # all requests with the same expressions.
+        #
+        key = (self.filter_expression_1, self.filter_expression_2, self.filter_expression_3, self.match_all)
+        _COMPILED_LOCK.acquire()
+        try:
+            predicate = _COMPILED.get(key)
+        finally:
+            _COMPILED_LOCK.release()
+        if predicate:
+            return predicate
+
+        children = list()
+        for i, expression in enumerate(key[:3]):
+            if not expression  and  i > 0:
+                continue
+            try:
+                children.append(self._expression_compile(expression))
+            except RestxException:
+                raise
+            except Exception, e:
+                raise RestxException("Filter epxression %d is invalid" % (i+1))
+        if len(children) == 1:
+            predicate = children[0]
+        elif self.match_all:
+            predicate = _And(children)
+        else:
+            predicate = _Or(children)
+
+        _COMPILED_LOCK.acquire()
+        try:
+            if len(_COMPILED) >= _COMPILED_MAX:
+                _COMPILED.clear()
+            _COMPILED[key] = predicate
+        finally:
+            _COMPILED_LOCK.release()
+        return predicate
+
+    def __pushdown_predicate(self, predicate):
+        #
+        # Translate a compiled filter into the structured predicate,
+        # which is accepted by services with a 'where' pushdown:
+        #
+        #     [ "and", [ "=", "city", "Berlin" ], [ ">", "amount", 100 ] ]
+        #
+        # Only comparisons of top-level dictionary elements can be
+        # translated. Parts of an AND that can't be translated are
+        # left out, since the filter is applied to the result anyway.
+        # NOT is never translated: Databases don't match elements
+        # without a value, whether negated or not.
+        #
+        # Returns None if nothing can be translated.
+        #
+        if isinstance(predicate, _Comparison):
+            if len(predicate.search_list) == 1  and  type(predicate.search_list[0]) in [ str, unicode ]:
+                return [ predicate.op, predicate.search_list[0], predicate.value ]
+            return None
+        if isinstance(predicate, _And):
+            children = [ self.__pushdown_predicate(c) for c in predicate.children ]
+            children = [ c for c in children if c ]
+            if not children:
+                return None
+            if len(children) == 1:
+                return children[0]
+            return [ "and" ] + children
+        if isinstance(predicate, _Or):
+            children = [ self.__pushdown_predicate(c) for c in predicate.children ]
+            if None in children:
+                return None
+            return [ "or" ] + children
+        return None
+
+    def __get_input(self, predicate, negate):
+        #
+        # Get the data from the input resource. If the input service
+        # supports it, the filter is handed to the service, so that
+        # it only has to send the matching elements.
+        #
+        where = None
+        if not negate:
+            service_def = self.getServiceDefinition(self.input_resource_uri)
+            if service_def  and  "where" in (service_def.get("pushdown") or []):
+                where = self.__pushdown_predicate(predicate)
+        if where:
+            try:
+                status, data = self.accessResource(self.input_resource_uri,
+                                                   params=dict(pushdown_where=self.toJson(where)))
+                if status == 200:
+                    return status, data
+            except Exception, e:
+                pass
+            # The service may refuse elements that it doesn't know, which
+            # just don't match here. So, we try again without pushdown.
+        return self.accessResource(self.input_resource_uri)
+
+    def filter(self, method, input, negate):
+        predicate = self.__get_predicate()
+
+        # The filter is applied even to pushed down results: The input
+        # service may match some elements that the filter wouldn't.
+        status, data = self.__get_input(predicate, negate)
         if status != 200:
             raise RestxException("Could not get data from input resource")
 
         if type(data) is dict:
-            is_dict = True
-            keys    = data.keys()
-            out     = dict()
-            def adder(k,v):
-                out[k] = v
+            keys  = data.keys()
+            rows  = [ data[k] for k in keys ]
+        elif type(data) is list  or  isinstance(data, Table):
+            # The columns of a table are compared directly
+            rows  = data
         else:
-            is_dict = False
-            keys    = range(len(data))
-            out     = list()
-            def adder(k,v):
-                out.append(v)
-            
-        for k in keys:
-            top_level_elem = data[k]
-            matched_count  = 0
-            matched        = False
-            try:
-                # Match against all of any of the search expressions
-                for (search_list, op, value) in search_expres:
-                    elem = self._get_elem(top_level_elem, search_list)
-                    if self.__OP_LIST[op](elem, value):
-                        matched_count += 1
-                        if not self.match_all  or  (matched_count == len(search_expres)):
-                            matched = True
-                            break
-            except:
-                pass
-            if (matched and not negate)  or  (not matched and negate):
-                adder(k, top_level_elem)
+            rows  = list(data)
+        flags = predicate.select(rows)
 
-        return Result.ok(out)
+        if type(data) is dict:
+            out = dict([ (k, row) for k, row, flag in itertools.izip(keys, rows, flags) if (not flag) == negate ])
+        elif isinstance(data, Table):
+            out = data.select([ (not flag) == negate for flag in flags ])
+        else:
+            out = [ row for row, flag in itertools.izip(rows, flags) if (not flag) == negate ]
 
+        return Result.ok(out)
 
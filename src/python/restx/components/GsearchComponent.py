@@ -56,6 +56,7 @@ class GsearchComponent(BaseComponent):
                                                            default=10)
                                },
                                "input_types" : [],
+                               "cache_ttl"   : 300,
                            }
                        }
     
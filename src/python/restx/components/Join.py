@@ -26,10 +26,220 @@ input has to be of the same format.
 The join is performed based on a key field in each input. The key
 fields in each input can have different names.
 
+The records of the smaller input are indexed by their key, while the
+records of the other input are streamed past that index. Inputs that
+are sorted by their key can be merged instead.
+
 """
 
+# Python imports
+import operator
+import itertools
+
 from restx.components.api import *
 
+
+JOIN_TYPES = [ "inner", "left", "right", "outer" ]
+
+
+def _size(data):
+    """
+    Return the number of records in an input, or None if it is not known.
+
+    """
+    try:
+        return len(data)
+    except TypeError:
+        return None
+
+def _peek(data):
+    """
+    Return the first record of an input and an iterator over all of its records.
+
+    The first record is None if the input is empty.
+
+    """
+    it = iter(data or [])
+    for first in it:
+        def all_records():
+            yield first
+            for rec in it:
+                yield rec
+        return first, all_records()
+    return None, it
+
+def _index(records, keyfield):
+    """
+    Return a dictionary of lists of records, indexed by their key.
+
+    """
+    index = dict()
+    for rec in records:
+        keyval  = rec[keyfield]
+        matches = index.get(keyval)
+        if matches is None:
+            index[keyval] = [ rec ]
+        else:
+            matches.append(rec)
+    return index
+
+def _probe(index, records, keyfield, merge, keep_build, keep_probe):
+    """
+    Stream records past the index of the build input and produce the joined records.
+
+    @param index:        The records of the build input, indexed by their key.
+    @type index:         dict
+
+    @param records:      The records of the probe input.
+    @type records:       iterable
+
+    @param keyfield:     The key field of the probe input.
+    @type keyfield:      string
+
+    @param merge:        Function that creates the joined record out of a build
+                         record, a probe record and the key. Either record may
+                         be None, if there is no match.
+    @type merge:         function
+
+    @param keep_build:   Also produce the build records without a match.
+    @type keep_build:    boolean
+
+    @param keep_probe:   Also produce the probe records without a match.
+    @type keep_probe:    boolean
+
+    """
+    if keep_build:
+        matched = set()
+    for rec in records:
+        keyval  = rec[keyfield]
+        matches = index.get(keyval)
+        if matches:
+            for build_rec in matches:
+                yield merge(build_rec, rec, keyval)
+            if keep_build:
+                matched.add(keyval)
+        elif keep_probe:
+            yield merge(None, rec, keyval)
+    if keep_build:
+        for keyval, matches in index.iteritems():
+            if keyval not in matched:
+                for build_rec in matches:
+                    yield merge(build_rec, None, keyval)
+
+def _groups(records, keyfield, name):
+    """
+    Produce (key, records) tuples for the runs of records with the same key.
+
+    @raise RestxException:  If the records are not sorted by their key.
+
+    """
+    group = None
+    for rec in records:
+        keyval = rec[keyfield]
+        if group is not None:
+            if keyval == group[0]:
+                group[1].append(rec)
+                continue
+            if keyval < group[0]:
+                raise RestxException("Input %s is not sorted by its key field" % name)
+            yield group
+        group = (keyval, [ rec ])
+    if group is not None:
+        yield group
+
+
+def _next_group(groups):
+    """
+    Return the next (key, records) tuple, or None if there are no more.
+
+    """
+    try:
+        return groups.next()
+    except StopIteration:
+        return None
+
+def _merge_join(data_A, data_B, keyfield_A, keyfield_B, merge, keep_A, keep_B):
+    """
+    Produce the joined records of two inputs, which are sorted by their key.
+
+    We walk through both inputs side by side, so only the records with the
+    same key need to be held in memory.
+
+    """
+    groups_A = _groups(data_A, keyfield_A, "A")
+    groups_B = _groups(data_B, keyfield_B, "B")
+    group_A  = _next_group(groups_A)
+    group_B  = _next_group(groups_B)
+    while group_A is not None  or  group_B is not None:
+        if group_B is None  or  (group_A is not None  and  group_A[0] < group_B[0]):
+            if keep_A:
+                for rec_A in group_A[1]:
+                    yield merge(rec_A, None, group_A[0])
+            group_A = _next_group(groups_A)
+        elif group_A is None  or  group_B[0] < group_A[0]:
+            if keep_B:
+                for rec_B in group_B[1]:
+                    yield merge(None, rec_B, group_B[0])
+            group_B = _next_group(groups_B)
+        else:
+            for rec_A in group_A[1]:
+                for rec_B in group_B[1]:
+                    yield merge(rec_A, rec_B, group_A[0])
+            group_A = _next_group(groups_A)
+            group_B = _next_group(groups_B)
+
+def _values_getter(fields):
+    """
+    Return a function that returns the values of the given fields of a record as tuple.
+
+    """
+    if not fields:
+        return lambda rec : ()
+    if len(fields) == 1:
+        field = fields[0]
+        return lambda rec : (rec[field],)
+    return operator.itemgetter(*fields)
+
+
+class _RecordMerger(object):
+    """
+    Creates the joined records out of the records of the two inputs.
+
+    The layout of the joined records is worked out once per join: The
+    key comes first, followed by the fields of A and then those of B,
+    each under its new name.
+
+    """
+    def __init__(self, new_keyfield_name, table_A, table_B, rec_A, rec_B):
+        fields_A         = [ k for k in rec_A.keys() if k in table_A ]
+        fields_B         = [ k for k in rec_B.keys() if k in table_B ]
+        self.header      = [ new_keyfield_name ] + [ table_A[k] for k in fields_A ] + [ table_B[k] for k in fields_B ]
+        self.__values_A  = _values_getter(fields_A)
+        self.__values_B  = _values_getter(fields_B)
+        self.__null_A    = (None,) * len(fields_A)
+        self.__null_B    = (None,) * len(fields_B)
+
+    def row(self, rec_A, rec_B, keyval):
+        """
+        Return the values of the joined record as tuple, in the order of the header.
+
+        Either record may be None, in which case its fields are null.
+
+        """
+        if rec_A is None:
+            return (keyval,) + self.__null_A + self.__values_B(rec_B)
+        if rec_B is None:
+            return (keyval,) + self.__values_A(rec_A) + self.__null_B
+        return (keyval,) + self.__values_A(rec_A) + self.__values_B(rec_B)
+
+    def record(self, rec_A, rec_B, keyval):
+        """
+        Return the joined record as dictionary.
+
+        """
+        return dict(zip(self.header, self.row(rec_A, rec_B, keyval)))
+
+
 class Join(BaseComponent):
 
     NAME             = "Join"
@@ -136,6 +346,26 @@ If 'new_keyfield_name' is set to "Address" and 'always_use_prefix' is set then t
 
 If prefix names are not defined then in case of name collision, "A" and "B" will be used
 as default prefixes.
+
+
+A record of one resource is joined with every record of the other resource that has
+the same key. The 'join' service accepts these parameters:
+
+
+    'join_type' :         'inner' (the default) only returns the joined records. 'left'
+                          also returns the records of A without a match, 'right' those
+                          of B and 'outer' those of both. The fields of the missing
+                          record are null.
+    'sorted_inputs' :     Set this if both resources produce their records sorted by
+                          their key field. The inputs are then merged, which needs
+                          very little memory. The output is sorted by the key as well.
+    'compact' :           Instead of a dictionary per joined record, return a list with
+                          the field names first, followed by a list of values for each
+                          joined record, in the same order as the names.
+
+
+Otherwise, the records of the smaller resource are indexed by their key, and the records
+of the other resource are joined with them one by one.
 </pre>
 """
 
@@ -154,6 +384,12 @@ as default prefixes.
                            "join" : {
                                "desc" : "Get the join result",
                                "output_types" : [ "application/json", "text/html" ],
+                               "params" : {
+                                   "join_type"     : ParameterDef(PARAM_STRING, "Type of join: 'inner', 'left', 'right' or 'outer'", required=False, default="inner",
+                                                                  choices=JOIN_TYPES),
+                                   "sorted_inputs" : ParameterDef(PARAM_BOOL,   "Both resources produce their records sorted by the key field", required=False, default=False),
+                                   "compact"       : ParameterDef(PARAM_BOOL,   "Return the field names, followed by a list of values for each joined record", required=False, default=False),
+                               }
                            }
                        }
 
@@ -202,53 +438,54 @@ as default prefixes.
 
         return (table_A, table_B)
             
-    def __join_two_records(self, rec_A, rec_B, new_keyfield_name, keyfield_val):
-        """
-        Create a new record out of two given records. We know that
-        they match in their key fields, since otherwise we would not
-        have been called here.
+    def join(self, method, input, join_type="inner", sorted_inputs=False, compact=False):
+        if join_type not in JOIN_TYPES:
+            return Result.badRequest("Unknown join type '%s'" % join_type)
+        keep_A = join_type in [ "left", "outer" ]
+        keep_B = join_type in [ "right", "outer" ]
 
-        We now need to deal with prefixes and similarly named fields
-        and such.
-
-        """
-        if not self.translation_tables:
-            # Cache the output of this, so we don't have to do this for every record
-            self.translation_tables = self.__make_field_translation_tables(new_keyfield_name, rec_A, rec_B)
-
-        table_A, table_B = self.translation_tables
-
-        d = dict()
-        d[new_keyfield_name] = keyfield_val
-        d.update([ (table_A[k], rec_A[k]) for k in table_A.keys() ])
-        d.update([ (table_B[k], rec_B[k]) for k in table_B.keys() ])
-
-        return d
-
-    def join(self, method, input):
         # Some processing ahead of time
         new_keyfield_name = self.__make_keyfield_name()
-        self.translation_tables = None
 
-        # Get the data from the two join resources
-        status, data_A = self.accessResource(self.resource_A_uri)
-        if status != 200:
+        # Get the data from the two join resources (in parallel)
+        (status_A, data_A), (status_B, data_B) = self.accessResources([ self.resource_A_uri, self.resource_B_uri ])
+        if status_A != 200:
             raise RestxException("Could not get data from resource A")
-        status, data_B = self.accessResource(self.resource_B_uri)
-        if status != 200:
+        if status_B != 200:
             raise RestxException("Could not get data from resource B")
 
-        # Index the data from each table by the key field
-        data_A_dict = dict([ (e[self.keyfield_A], e) for e in data_A ])
-        data_B_dict = dict([ (e[self.keyfield_B], e) for e in data_B ])
+        # All records of an input have the same fields, so the first ones tell
+        # us how to lay out the joined records.
+        size_A           = _size(data_A)
+        size_B           = _size(data_B)
+        first_A, data_A  = _peek(data_A)
+        first_B, data_B  = _peek(data_B)
+        first_A          = first_A or dict()
+        first_B          = first_B or dict()
+        table_A, table_B = self.__make_field_translation_tables(new_keyfield_name, first_A, first_B)
+        merger           = _RecordMerger(new_keyfield_name, table_A, table_B, first_A, first_B)
+        if compact:
+            merge = merger.row
+        else:
+            merge = merger.record
+
+        # The joined records are produced after the component has been handed
+        # back, so whatever produces them must not refer to 'self'.
+        keyfield_A = self.keyfield_A
+        keyfield_B = self.keyfield_B
+        if sorted_inputs:
+            out = _merge_join(data_A, data_B, keyfield_A, keyfield_B, merge, keep_A, keep_B)
+        elif size_B is None  or  (size_A is not None  and  size_A <= size_B):
+            # Index A, since it is the smaller input
+            out = _probe(_index(data_A, keyfield_A), data_B, keyfield_B, merge, keep_A, keep_B)
+        else:
+            def merge_B(rec_B, rec_A, keyval):
+                return merge(rec_A, rec_B, keyval)
+            out = _probe(_index(data_B, keyfield_B), data_A, keyfield_A, merge_B, keep_B, keep_A)
 
-        # Create the join
-        out = list()
-        for keyval, data_A_record in data_A_dict.items():
-            data_B_record = data_B_dict.get(keyval)
-            if data_B_record:
-                out.append(self.__join_two_records(data_A_record, data_B_record, new_keyfield_name, keyval))
+        if compact:
+            out = itertools.chain([ merger.header ], out)
 
+        # The joined records are produced while the response is sent
         return Result.ok(out)
 
-
@@ -27,88 +27,329 @@ from restx.components.api import *
 
 import os, sys
 import re
+import glob
+import bisect
+import threading
+
+try:
+    from hashlib import md5
+except ImportError:
+    from md5 import md5
 
 from stat     import *
 from datetime import date, datetime, timedelta
 
-MONTH_LOOKUP = {
-    "Jan" : "01",
-    "Feb" : "02",
-    "Mar" : "03",
-    "Apr" : "04",
-    "May" : "05",
-    "Jun" : "06",
-    "Jul" : "07",
-    "Aug" : "08",
-    "Sep" : "09",
-    "Oct" : "10",
-    "Nov" : "11",
-    "Dec" : "12",
-}
-
-
-def makedatestr(date_text):
+from restx.components.logscan import makedatestr, linedatestr, LineMatcher, SCAN_POOL, \
+                                     is_compressed, open_log, time_span, blocks_in_range, \
+                                     count_lines, ipaddr_set, iter_lines, unique_lines
+
+#
+# The time index of a log file has an entry for one line in every
+# INDEX_STEP bytes. To notice when a log file was replaced instead of
+# appended to, we remember a checksum of its first INDEX_HEAD bytes.
+# An index is written to storage once it has INDEX_STORE_ENTRIES entries
+# more than the stored one.
+#
+INDEX_STEP          = 64 * 1024
+INDEX_HEAD          = 512
+INDEX_STORE_ENTRIES = 16
+
+class _LogIndex(object):
+    """
+    Sparse time index of a log file.
+
+    Holds the date and offset of the first complete line after every
+    INDEX_STEP bytes of the file. The lines of a log file are in time
+    order, so to find the start of a time range we only need to read
+    forward from the last indexed line that is older than the range.
+
     """
-    date_text has to be in format DD/mmm/YYYY/HH:MM[:SS]
+    def __init__(self):
+        self.ino            = 0
+        self.size           = 0     # Size of the file when it was last indexed
+        self.next_offset    = 0     # Where to continue indexing once the file grew
+        self.head_len       = 0
+        self.head           = ""
+        self.dates          = list()
+        self.offsets        = list()
+        self.stored_entries = 0     # Number of entries in the stored copy of the index
+
+    def __head_digest(self, handle, length):
+        handle.seek(0)
+        return md5(handle.read(length)).hexdigest()
+
+    def is_valid_for(self, handle, st):
+        """
+        Return True if the file is still the one that was indexed, possibly with more lines.
+
+        """
+        if st[ST_INO] != self.ino  or  st[ST_SIZE] < self.size:
+            return False
+        return self.__head_digest(handle, self.head_len) == self.head
+
+    def extend(self, handle, st):
+        """
+        Index the part of the file that was added since it was last indexed.
+
+        Seeks to every INDEX_STEP bytes, skips to the start of the next line
+        and remembers the date and offset of that line. A line that's still
+        being written (no newline yet) is indexed on a later call.
 
-    Return string "YYYYMMDD:HH:MM[:SS]
+        @return:    True if the index has changed.
+        @rtype:     boolean
+
+        """
+        size = st[ST_SIZE]
+        if size == self.size:
+            return False
+        pos = self.next_offset
+        if self.offsets:
+            last = self.offsets[-1]
+        else:
+            last = -1
+        while pos < size:
+            if pos == 0:
+                handle.seek(0)
+            else:
+                # Starting one byte early, in case pos is the start of a line
+                handle.seek(pos - 1)
+                handle.readline()
+            start = handle.tell()
+            line  = handle.readline()
+            if not line.endswith("\n"):
+                break
+            if start > last:
+                linedate = linedatestr(line.rstrip("\n"))
+                if linedate:
+                    # The offset goes in first: start_offset() may be called
+                    # by another thread while the index is extended.
+                    self.offsets.append(start)
+                    self.dates.append(linedate)
+                    last = start
+            pos = max(pos + INDEX_STEP, handle.tell())
+
+        self.ino         = st[ST_INO]
+        self.size        = size
+        self.next_offset = pos
+        self.head_len    = min(size, INDEX_HEAD)
+        self.head        = self.__head_digest(handle, self.head_len)
+        return True
+
+    def start_offset(self, searchstart):
+        """
+        Return an offset in the file at or before the first line of the time range.
 
-    If it can't be parsed properly then it just returns
-    an empty string.
+        """
+        i = bisect.bisect_left(self.dates, searchstart)
+        if i == 0:
+            return 0
+        return self.offsets[i - 1]
 
+    def serialize(self):
+        """
+        Return the index as a string, for storage.
+
+        """
+        out = [ "%d %d %d %d %s" % (self.ino, self.size, self.next_offset, self.head_len, self.head) ]
+        for linedate, offset in zip(self.dates, self.offsets):
+            out.append("%s %d" % (linedate, offset))
+        return "\n".join(out)
+
+    @classmethod
+    def parse(cls, buf):
+        """
+        Create an index from its serialized form.
+
+        @return:    The index, or None if the buffer couldn't be parsed.
+        @rtype:     _LogIndex
+
+        """
+        index = cls()
+        try:
+            lines = buf.split("\n")
+            ino, size, next_offset, head_len, head = lines[0].split(" ")
+            index.ino         = int(ino)
+            index.size        = int(size)
+            index.next_offset = int(next_offset)
+            index.head_len    = int(head_len)
+            index.head        = head
+            for l in lines[1:]:
+                linedate, offset = l.split(" ")
+                index.dates.append(linedate)
+                index.offsets.append(int(offset))
+        except Exception, e:
+            return None
+        index.stored_entries = len(index.offsets)
+        return index
+
+
+# The indices of the log files we have seen, by file name. They are
+# loaded from the resource's storage the first time a log file is used.
+# Each log file has its own lock, so that indexing one file doesn't hold
+# up searches in the others. _INDEX_LOCK only protects _INDEX_LOCKS.
+_INDICES     = dict()
+_INDEX_LOCKS = dict()
+_INDEX_LOCK  = threading.Lock()
+
+def _index_lock(filename):
     """
+    Return the lock for the index of a log file.
+
+    """
+    _INDEX_LOCK.acquire()
     try:
-        _date, _time =  date_text.split(":", 1)
-        day, month, year = _date.split("/")
-        linedate = year + MONTH_LOOKUP[month] + day + ":" + _time
-    except Exception, e:
-        linedate = ''
+        lock = _INDEX_LOCKS.get(filename)
+        if lock is None:
+            lock = threading.Lock()
+            _INDEX_LOCKS[filename] = lock
+        return lock
+    finally:
+        _INDEX_LOCK.release()
+
+def _get_index(handle, filename, storage):
+    """
+    Return the up-to-date time index for an open log file.
 
-    return linedate
+    If the file grew since it was last indexed then the index is extended.
+    If the file was replaced (for example by log rotation) then a new index
+    is built. Once an index has INDEX_STORE_ENTRIES entries more than the
+    copy in the storage, if there is one, it is written to the storage.
+    That's done after the lock is released, so that other searches in the
+    same file don't have to wait for it.
 
-class SignalException(Exception):
-    pass
+    @param handle:      The open log file.
+    @type handle:       file
 
-# Function to read lines from file and extract the date and time
-def getdata(handle, bufsize):
-    """Read a line from a file
+    @param filename:    The name of the log file.
+    @type filename:     string
 
-    Return a tuple containing:
-        the date/time in a format such as 'Jan 15 20:14:01'
-        the line itself
+    @param storage:     The storage of the resource, or None.
+    @type storage:      FileStorage
 
-    The last colon and seconds are optional and
-    not handled specially
+    @return:            The index.
+    @rtype:             _LogIndex
 
     """
+    filename     = os.path.abspath(filename)
+    storage_name = "logindex_%s" % md5(filename).hexdigest()
+    st           = os.stat(filename)
+    lock         = _index_lock(filename)
+    data         = None
+    lock.acquire()
     try:
-        line = handle.readline(bufsize)
-    except Exception, e:
-        raise RestxException("File I/O Error: " + str(e))
-    if line == '':
-        raise SignalException()
-    if line[-1] == '\n':
-        line = line.rstrip('\n')
-    else:
-        if len(line) >= bufsize:
-            raise RestxException("Line length exceeds buffer size")
-        else:
-            raise RestxException("Missing newline")
-        exit(1)
-    words = line.split(' ')
-    if len(words) >= 6:
-        tword = words[3][1:]
-        linedate = makedatestr(tword)
-    else:
-        linedate = ''
+        index = _INDICES.get(filename)
+        if index is None  and  storage:
+            try:
+                index = _LogIndex.parse(storage.loadFile(storage_name))
+            except RestxFileNotFoundException, e:
+                pass
+        if index is None  or  not index.is_valid_for(handle, st):
+            index = _LogIndex()
+        _INDICES[filename] = index
+        if index.extend(handle, st)  and  storage  and \
+                len(index.offsets) - index.stored_entries >= INDEX_STORE_ENTRIES:
+            data                 = index.serialize()
+            index.stored_entries = len(index.offsets)
+    finally:
+        lock.release()
+    if data:
+        storage.storeFile(storage_name, data)
+    return index
+
+
+# The time spans of the log files we have seen, by file name, as tuples
+# of ((inode, size, modification time), first time stamp, last time stamp).
+_SPANS     = dict()
+_SPAN_LOCK = threading.Lock()
+
+def _get_span(filename, storage):
+    """
+    Return the time stamps of the first and last line of a log file.
+
+    Spans are remembered until the file changes. Finding the span of a
+    compressed log file means reading all of it, so those spans are kept
+    in the storage as well.
+
+    @param filename:    The name of the log file.
+    @type filename:     string
 
+    @param storage:     The storage of the resource, or None.
+    @type storage:      FileStorage
+
+    @return:            Tuple of first and last time stamp.
+    @rtype:             tuple
+
+    """
+    filename     = os.path.abspath(filename)
+    storage_name = "logspan_%s" % md5(filename).hexdigest()
+    st           = os.stat(filename)
+    key          = "%d %d %d" % (st[ST_INO], st[ST_SIZE], st[ST_MTIME])
+    _SPAN_LOCK.acquire()
+    try:
+        span = _SPANS.get(filename)
+    finally:
+        _SPAN_LOCK.release()
+    if span is None  and  storage  and  is_compressed(filename):
+        try:
+            stored_key, first, last = storage.loadFile(storage_name).split("\t")
+            span = (stored_key, first, last)
+        except Exception, e:
+            pass
+    if span  and  span[0] == key:
+        return span[1:]
+
+    first, last = time_span(filename)
+    _SPAN_LOCK.acquire()
+    try:
+        _SPANS[filename] = (key, first, last)
+    finally:
+        _SPAN_LOCK.release()
+    if storage  and  is_compressed(filename):
+        storage.storeFile(storage_name, "\t".join([ key, first, last ]))
+    return first, last
+
+def _segment_blocks(filename, searchstart, searchend, storage):
+    """
+    Return the lines of one log file within the time range, in blocks.
+
+    """
+    if is_compressed(filename):
+        return blocks_in_range(open_log(filename), 0, searchstart, searchend)
+    try:
+        handle = open(filename, "rb")
+    except:
+        raise RestxException("File Open Error")
+    try:
+        # Look up where to start in the index
+        index = _get_index(handle, filename, storage)
+        start = index.start_offset(searchstart)
+    except:
+        handle.close()
+        raise
+    return blocks_in_range(handle, start, searchstart, searchend)
+
+def _segment_count(filename, searchstart, searchend, storage, matcher):
+    return count_lines(_segment_blocks(filename, searchstart, searchend, storage), matcher, False)
+
+def _segment_ipaddrs(filename, searchstart, searchend, storage, matcher):
+    return ipaddr_set(_segment_blocks(filename, searchstart, searchend, storage), matcher)
+
+def _merged_lines(segments, searchstart, searchend, storage, matcher, unique_only):
     """
-    if len(words) >= 3:
-        linedate = words[0] + " " + words[1] + " " + words[2]
-    else:
-        linedate = ''
+    Produce the lines found in several log files, one file after the other.
+
+    A file is only read when the lines of the previous one have been
+    consumed, so that no more than a block of lines is held in memory,
+    however many files there are.
+
     """
-    return (linedate, line)
+    hitlist = set()
+    for name in segments:
+        lines = iter_lines(_segment_blocks(name, searchstart, searchend, storage), matcher, False)
+        if unique_only:
+            lines = unique_lines(lines, hitlist)
+        for line in lines:
+            yield line
 
 
 class LogFileComponent(BaseComponent):
@@ -119,7 +360,7 @@ class LogFileComponent(BaseComponent):
     DOCUMENTATION    = "A longer description"
 
     PARAM_DEFINITION = {
-                           "filename"  :      ParameterDef(PARAM_STRING, "Full file name of the logfile", required=True), 
+                           "filename"  :      ParameterDef(PARAM_STRING, "Full file name of the logfile. To include rotated logs use wildcards, for example '/var/log/access.log*'. Files ending in '.gz' are decompressed.", required=True), 
                            "mustContain" :    ParameterDef(PARAM_STRING, "Filter terms a line must contain, separate multiples with ';'", required=False, default=""),
                            "mustNotContain" : ParameterDef(PARAM_STRING, "Filter terms a line must NOT contain, separate multiples with ';'", required=False, default=""),
                        }
@@ -168,122 +409,65 @@ class LogFileComponent(BaseComponent):
         searchstart = makedatestr(start_time)
         searchend   = makedatestr(end_time)
 
-        try:
-            handle = open(self.filename,'r')
-        except:
-            raise RestxException("File Open Error")
-
-        # Set some initial values
-        bufsize = 4096  # handle long lines, but put a limit them
-        rewind  =  100  # arbitrary, the optimal value is highly dependent on the structure of the file
-        limit   =   75  # arbitrary, allow for a VERY large file, but stop it if it runs away
-        count   =    0
-        size    =    os.stat(self.filename)[ST_SIZE]
-        beginrange   = 0
-        midrange     = size / 2
-        oldmidrange  = midrange
-        endrange     = size
-        linedate     = ''
-
-        pos1 = pos2  = 0
-
+        inc_filters = list()
+        exl_filters = list()
+        if filter:
+            filter_elems = filter.split(";")
+            inc_filters.extend([ f for f in filter_elems if not f.startswith("-") ])
+            exl_filters.extend([ f[1:] for f in filter_elems if f.startswith("-") ])
+        if self.mustContain:
+            inc_filters.extend(self.mustContain.split(";"))
+        if self.mustNotContain:
+            exl_filters.extend(self.mustNotContain.split(";"))
+
+        matcher  = LineMatcher(inc_filters, exl_filters)
+        storage  = self.getFileStorage()
+        segments = self.__segments(searchstart, searchend, storage)
+
+        if len(segments) == 1:
+            blocks = _segment_blocks(segments[0], searchstart, searchend, storage)
+            if count_only:
+                return Result.ok(count_lines(blocks, matcher, unique_only))
+            # The matching lines are produced as the response is sent, so that
+            # large ranges never have to be held in memory.
+            return Result.ok(iter_lines(blocks, matcher, unique_only))
+
+        # For counts, several log files are searched in parallel. Lines
+        # are read one file after the other, as the response is sent.
         if count_only:
-            out = 0
-        else:
-            out = list()
-        try:
-            # Seek using binary search
-            while pos1 != endrange and oldmidrange != 0 and linedate != searchstart:
-                handle.seek(midrange)
-                linedate, line = getdata(handle, bufsize)    # sync to line ending
-                pos1 = handle.tell()
-                if midrange > 0:             # if not BOF, discard first read
-                    linedate, line = getdata(handle, bufsize)
-
-                pos2 = handle.tell()
-                count += 1
-                if  searchstart > linedate:
-                    beginrange = midrange
-                else:
-                    endrange = midrange
-                oldmidrange = midrange
-                midrange = (beginrange + endrange) / 2
-                if count > limit:
-                    raise RestxException("ERROR: ITERATION LIMIT EXCEEDED")
-
-            # Rewind a bit to make sure we didn't miss any
-            seek = oldmidrange
-            while linedate >= searchstart and seek > 0:
-                if seek < rewind:
-                    seek = 0
-                else:
-                    seek = seek - rewind
-                handle.seek(seek)
-                linedate, line = getdata(handle, bufsize)    # sync to line ending
-                linedate, line = getdata(handle, bufsize)
-
-            # Scan forward
-            while linedate < searchstart:
-                linedate, line = getdata(handle, bufsize)
-
-            # Now that the preliminaries are out of the way, we just loop,
-            # reading lines and storing them in a list (or counting) until they
-            # are beyond the end of the range we want
-            # However, if unique_only is set then we maintain a set, which
-            # tells us whether we have an entry for this IP address already
-            # and will ignore further entries.
             if unique_only:
+                jobs    = [ SCAN_POOL.submit(_segment_ipaddrs, name, searchstart, searchend, storage, matcher) for name in segments ]
                 hitlist = set()
-            do_filter = False
-            inc_filters = list()
-            exl_filters = list()
-            if filter:
-                do_filter = True
-                filter_elems = filter.split(";")
-                inc_filters.extend([ f for f in filter_elems if not f.startswith("-") ])
-                exl_filters.extend([ f[1:] for f in filter_elems if f.startswith("-") ])
-            if self.mustContain:
-                do_filter = True
-                inc_filters.extend(self.mustContain.split(";"))
-            if self.mustNotContain:
-                do_filter = True
-                exl_filters.extend(self.mustNotContain.split(";"))
-
-            while linedate <= searchend:
-                old_line = unicode(line)
-                linedate, line = getdata(handle, bufsize)
-
-                # Might not have to add this line, if the IP address appeared before
-                if unique_only:
-                    ipaddr, remainder = old_line.split(" ", 1)
-                    if ipaddr in hitlist:
-                        continue
-
-                # Check for filter expressions
-                if do_filter:
-                    filter_out = False
-                    for f in inc_filters:
-                        if f not in old_line:
-                            filter_out = True
-                            break
-                    for f in exl_filters:
-                        if f in old_line:
-                            filter_out = True
-                            break
-                    if filter_out:
-                        continue
-                    
-                if unique_only:
-                    hitlist.add(ipaddr)
-                if count_only:
-                    out += 1
-                else:
-                    out.append(old_line)
-
-        except SignalException, e:
-            pass
+                for job in jobs:
+                    hitlist.update(job.get())
+                return Result.ok(len(hitlist))
+            else:
+                jobs = [ SCAN_POOL.submit(_segment_count, name, searchstart, searchend, storage, matcher) for name in segments ]
+                return Result.ok(sum([ job.get() for job in jobs ]))
 
-        handle.close()
-      
-        return Result.ok(out)
+        return Result.ok(_merged_lines(segments, searchstart, searchend, storage, matcher, unique_only))
+
+    def __segments(self, searchstart, searchend, storage):
+        """
+        Return the log files with lines in the time range, oldest first.
 
+        The filename may contain wildcards, to specify a set of rotated
+        log files. The logs in such a set are assumed not to overlap in
+        time, so that their lines are in time order if we take one file
+        after the other.
+
+        """
+        if glob.has_magic(self.filename):
+            names = [ name for name in glob.glob(self.filename) if os.path.isfile(name) ]
+        else:
+            if not os.path.isfile(self.filename):
+                raise RestxException("File Open Error")
+            return [ self.filename ]
+
+        segments = list()
+        for name in names:
+            first, last = _get_span(name, storage)
+            if first  and  first <= searchend  and  (not last  or  last >= searchstart):
+                segments.append((first, name))
+        segments.sort()
+        return [ name for first, name in segments ]
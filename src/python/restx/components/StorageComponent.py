@@ -52,7 +52,8 @@ class StorageComponent(BaseComponent):
                                     "name" : ParameterDef(PARAM_STRING, "Name of the stored data item", required=False,
                                                           default=""),
                                },
-                               "positional_params" : [ "name" ]
+                               "positional_params" : [ "name" ],
+                               "stream_input"      : True
                            }
                        }
     
@@ -64,8 +65,9 @@ class StorageComponent(BaseComponent):
         @param method:     The HTTP request method.
         @type method:      string
         
-        @param input:      Any data that came in the body of the request.
-        @type input:       string
+        @param input:      Any data that came in the body of the request. Either
+                           a string or a stream object, which can be read incrementally.
+        @type input:       string or RequestBody
         
         @return:           The output data of this service.
         @rtype:            string
@@ -90,7 +92,11 @@ class StorageComponent(BaseComponent):
                 data = "File deleted"
             else:
                 if input:
-                    storage.storeFile(name, input)
+                    if hasattr(input, "read"):
+                        # Large uploads arrive as a stream, which we hand straight to the storage.
+                        storage.storeFileStream(name, input)
+                    else:
+                        storage.storeFile(name, input)
                     data = "Successfully stored"
                 else:
                     data = storage.loadFile(name)
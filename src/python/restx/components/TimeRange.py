@@ -21,6 +21,11 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 # Imports all aspects of the API
 from restx.components.api import *
 
+try:
+    from hashlib import md5
+except ImportError:
+    from md5 import md5
+
 from datetime import datetime, timedelta
 
 # -------------------------------------------------------
@@ -117,6 +122,142 @@ class TimeRange(BaseComponent):
             p[self.unique_only_name] = unique_only
         return p
 
+    # Results for days older than the longest window are not needed anymore
+    __BUCKET_MAX_AGE = 90
+
+    def __bucket_name(self, day, fingerprint, filter, unique_only):
+        """
+        Return the name under which the result for a day is stored.
+
+        The name includes the fingerprint of the base resource's definition,
+        so that results are not re-used once the base resource is re-defined.
+
+        """
+        query = "%s\n%s\n%s\n%s" % (self.base_resource, fingerprint, filter, unique_only)
+        if type(query) is unicode:
+            query = query.encode("UTF-8")
+        return "day_%s_%s" % (md5(query).hexdigest(), day.strftime("%Y%m%d"))
+
+    def __prune_buckets(self, storage, today):
+        """
+        Remove the stored results for days that no window covers anymore.
+
+        """
+        oldest = (today - timedelta(self.__BUCKET_MAX_AGE)).strftime("%Y%m%d")
+        for name in storage.listFiles():
+            if name.startswith("day_")  and  name[-8:] < oldest:
+                try:
+                    storage.deleteFile(name)
+                except RestxFileNotFoundException, e:
+                    # Someone else removed it already
+                    pass
+
+    def __load_bucket(self, storage, name, unique_only):
+        """
+        Return the stored result for a day, or None if there is none.
+
+        The result is a count, or with unique_only the set of IP addresses.
+
+        """
+        try:
+            buf = storage.loadFile(name)
+        except RestxFileNotFoundException, e:
+            return None
+        if unique_only:
+            return set([ ipaddr for ipaddr in buf.split("\n") if ipaddr ])
+        return int(buf)
+
+    def __store_bucket(self, storage, name, value, unique_only):
+        if unique_only:
+            buf = "\n".join(sorted(value))
+        else:
+            buf = str(value)
+        storage.storeFile(name, buf)
+
+    def __count_window(self, start, end, filter, unique_only):
+        """
+        Return the number of entries in a time window.
+
+        The window is split into calendar days. The results for complete
+        days before today don't change anymore, so they are kept in the
+        resource's storage and only requested once, unless the base resource
+        is re-defined. Results for days older than the longest window are
+        removed. The partial days at
+        either end of the window are always requested, in parallel with
+        any complete days we don't know yet.
+
+        To count unique entries across several days, we keep the set of IP
+        addresses for each day (the first word of the unique entries)
+        rather than a count.
+
+        """
+        storage = self.getFileStorage()
+        if storage:
+            fingerprint = self.getResourceFingerprint(self.base_resource)
+        else:
+            fingerprint = None
+        today   = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        day     = start.replace(hour=0, minute=0, second=0, microsecond=0)
+        buckets = list()
+        while day <= end:
+            day_end   = day + timedelta(1) - timedelta(seconds=1)
+            b_start   = max(start, day)
+            b_end     = min(end, day_end)
+            if fingerprint  and  b_start == day  and  b_end == day_end  and  day < today:
+                name = self.__bucket_name(day, fingerprint, filter, unique_only)
+            else:
+                name = None
+            buckets.append((b_start, b_end, name))
+            day += timedelta(1)
+
+        results  = list()
+        missing  = list()
+        requests = list()
+        for i, (b_start, b_end, name) in enumerate(buckets):
+            value = None
+            if name:
+                value = self.__load_bucket(storage, name, unique_only)
+            if value is None:
+                missing.append(i)
+                # For unique counts we need the entries themselves
+                requests.append(dict(resource_uri=self.base_resource,
+                                     params=self.__make_params(b_start, b_end, not unique_only, filter, unique_only)))
+            results.append(value)
+
+        stored = False
+        for i, (status, data) in zip(missing, self.accessResources(requests)):
+            if status != HTTP.OK:
+                return Result(status, data)
+            if unique_only:
+                value = set([ line.split(" ", 1)[0] for line in data ])
+            else:
+                value = data
+            results[i] = value
+            name = buckets[i][2]
+            if name:
+                self.__store_bucket(storage, name, value, unique_only)
+                stored = True
+        if stored:
+            # A new day was stored, so another one may have become too old
+            self.__prune_buckets(storage, today)
+
+        if unique_only:
+            hitlist = set()
+            for value in results:
+                hitlist.update(value)
+            return Result.ok(len(hitlist))
+        return Result.ok(sum(results))
+
+    def __window(self, start, end, count_only, filter, unique_only):
+        """
+        Return the entries, or the number of entries, in a time window.
+
+        """
+        if count_only  and  self.count_flag_name  and  (self.unique_only_name  or  not unique_only):
+            return self.__count_window(start, end, filter, unique_only)
+        status, data = accessResource(self.base_resource, params=self.__make_params(start, end, count_only, filter, unique_only))
+        return Result(status, data)
+
     def current_time(self, method, input):
         """
         Return the current time.
@@ -133,27 +274,24 @@ class TimeRange(BaseComponent):
     def yesterday(self, method, input, count_only, filter, unique_only):
         ld    = datetime.now()-timedelta(1)
         start = datetime(ld.year, ld.month, ld.day)
-        end   = start+timedelta(1)
-        status, data = accessResource(self.base_resource, params=self.__make_params(start, end, count_only, filter, unique_only))
-        return Result(status, data)
+        # The day ends just before today starts
+        end   = start+timedelta(1)-timedelta(seconds=1)
+        return self.__window(start, end, count_only, filter, unique_only)
 
     def last7days(self, method, input, count_only, filter, unique_only):
         now   = datetime.now()
         start = now-timedelta(7)
-        status, data = accessResource(self.base_resource, params=self.__make_params(start, now, count_only, filter, unique_only))
-        return Result(status, data)
+        return self.__window(start, now, count_only, filter, unique_only)
 
     def last30days(self, method, input, count_only, filter, unique_only):
         now   = datetime.now()
         start = now-timedelta(30)
-        status, data = accessResource(self.base_resource, params=self.__make_params(start, now, count_only, filter, unique_only))
-        return Result(status, data)
+        return self.__window(start, now, count_only, filter, unique_only)
 
     def last90days(self, method, input, count_only, filter, unique_only):
         now   = datetime.now()
         start = now-timedelta(90)
-        status, data = accessResource(self.base_resource, params=self.__make_params(start, now, count_only, filter, unique_only))
-        return Result(status, data)
+        return self.__window(start, now, count_only, filter, unique_only)
 
        
 
@@ -54,6 +54,7 @@ To create the resource, the Twitter account name and password need to be specifi
                                             "count"  : ParameterDef(PARAM_NUMBER, "Number of results", required=False, default=20),
                                             "filter" : ParameterDef(PARAM_BOOL,   "If set, only 'important' fields are returned", required=False, default=True),
                                          },
+                                         "cache_ttl" : 60,
                                       },
                          "home_timeline" : {
                                          "desc" : "You can GET the home timeline of the user.",
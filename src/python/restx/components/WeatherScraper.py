@@ -115,7 +115,8 @@ page, you should be fine setting a 'search_length' of around
     # A dictionary with information about each exposed service method (sub-resource).
     SERVICES         = {
                            "current" : {
-                               "desc" : "Provide current weather information",
+                               "desc"      : "Provide current weather information",
+                               "cache_ttl" : 300,
                            }
                        }
         
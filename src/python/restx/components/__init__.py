@@ -24,12 +24,25 @@ Exports the various components, which are available.
 Also defines a base class for all components.
 
 """
+import threading
+
+import restx.settings as settings
+
+from restx.httpabstraction.base_server import is_streamed_entity
+
 # Import all the components
 import restx_components_list
 
 __CODE_MAP         = None
 __KNOWN_COMPONENTS = None
 
+#
+# Idle component instances, keyed by (component name, resource name).
+# Only components written in Python are pooled.
+#
+__COMPONENT_POOL      = dict()
+__COMPONENT_POOL_LOCK = threading.Lock()
+
 def make_component(component_name):
     """
     Return a readily created component. The instance configuration
@@ -47,6 +60,166 @@ def make_component(component_name):
     except KeyError, e:
         return None
 
+def acquire_component(component_name, resource_name):
+    """
+    Return a component instance, ready to serve a request for a resource.
+
+    Python component instances are taken from a per-resource pool, if an
+    idle instance is available. Otherwise, a new instance is created.
+    The instance should be handed back with release_component() once the
+    request has been processed, or with release_component_after() if the
+    result of the request may be streamed.
+
+    Returns nothing if the component wasn't found.
+
+    """
+    key = (component_name, resource_name)
+    __COMPONENT_POOL_LOCK.acquire()
+    try:
+        idle = __COMPONENT_POOL.get(key)
+        if idle:
+            return idle.pop()
+    finally:
+        __COMPONENT_POOL_LOCK.release()
+
+    comp = make_component(component_name)
+    if comp:
+        comp.setResourceName(resource_name)
+        if comp.LANGUAGE == "PYTHON"  and  settings.COMPONENT_POOL_SIZE > 0:
+            # Remember the pristine state of the instance, so that we can
+            # restore it when the instance is handed back.
+            comp._pool_key   = key
+            comp._pool_state = None
+            comp._pool_state = dict(comp.__dict__)
+    return comp
+
+def release_component(component):
+    """
+    Hand a component instance back after a request has been processed.
+
+    Anything that was assigned to the instance during the request (for
+    example, the resource creation time parameters) is removed, before
+    the instance is placed back into the pool.
+
+    This must not be called while a streamed result entity of the request
+    has not been read completely, since the stream may still refer to the
+    instance. Use release_component_after() for those.
+
+    """
+    state = getattr(component, "_pool_state", None)
+    if not state:
+        # Not a pooled instance.
+        return
+    component.__dict__.clear()
+    component.__dict__.update(state)
+    component._pool_state = state
+    __COMPONENT_POOL_LOCK.acquire()
+    try:
+        idle = __COMPONENT_POOL.setdefault(component._pool_key, list())
+        if len(idle) < settings.COMPONENT_POOL_SIZE:
+            idle.append(component)
+    finally:
+        __COMPONENT_POOL_LOCK.release()
+
+class _ReleasingStream(object):
+    """
+    Iterates over a streamed result entity of a component.
+
+    The entity may still need the component instance that produced it,
+    so the instance is only handed back once all elements have been read
+    or when the stream is closed.
+
+    """
+    def __init__(self, entity, component):
+        self.__entity    = entity
+        self.__component = component
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        if self.__component is None:
+            raise StopIteration()
+        try:
+            return self.__entity.next()
+        except:
+            self.close()
+            raise
+
+    def close(self):
+        component = self.__component
+        if component is None:
+            return
+        self.__component = None
+        try:
+            if hasattr(self.__entity, "close"):
+                self.__entity.close()
+        finally:
+            release_component(component)
+
+    def __del__(self):
+        # In case the consumer gave up on the stream without closing it
+        self.close()
+
+def release_component_after(result, component):
+    """
+    Hand a component instance back once its result has been consumed.
+
+    If the entity of the result is streamed (an iterator), it is only
+    produced while it is read, possibly with the help of the component
+    instance. The entity is then wrapped, so that the instance is released
+    when the stream is exhausted or closed. Otherwise, the instance is
+    released right away.
+
+    @param result:      The result returned by the component's service method.
+    @type result:       L{Result}
+
+    @param component:   The component instance that produced the result.
+    @type component:    L{BaseComponent}
+
+    """
+    entity = result and result.getEntity()
+    if not is_streamed_entity(entity)  or  not getattr(component, "_pool_state", None):
+        release_component(component)
+    else:
+        result.setEntity(_ReleasingStream(entity, component))
+
+def forget_resource(resource_name, resource_uri):
+    """
+    Drop the idle component instances and service descriptions of a deleted resource.
+
+    @param resource_name:  Name of the deleted resource.
+    @type resource_name:   string
+
+    @param resource_uri:   URI of the deleted resource.
+    @type resource_uri:    string
+
+    """
+    __COMPONENT_POOL_LOCK.acquire()
+    try:
+        for key in __COMPONENT_POOL.keys():
+            if key[1] == resource_name:
+                del __COMPONENT_POOL[key]
+    finally:
+        __COMPONENT_POOL_LOCK.release()
+    if __CODE_MAP:
+        for component_class, component_config in __CODE_MAP.values():
+            forget_services = getattr(component_class, "_forgetServices", None)
+            if forget_services:
+                forget_services(resource_uri)
+
+def get_pool_stats():
+    """
+    Return the number of idle component instances per resource.
+
+    """
+    __COMPONENT_POOL_LOCK.acquire()
+    try:
+        return dict([ ("%s (%s)" % (resource_name, component_name), len(idle)) \
+                            for (component_name, resource_name), idle in __COMPONENT_POOL.items() ])
+    finally:
+        __COMPONENT_POOL_LOCK.release()
+
 def get_component_names():
     """
     Return a list of component names.
@@ -60,5 +233,11 @@ def get_component_names():
     if new_component_list:
         __KNOWN_COMPONENTS = new_component_list
         __CODE_MAP         = dict([ (component_config['cname'], (component_class, component_config)) for component_class, component_config in __KNOWN_COMPONENTS ])
+        # Pooled instances may be of outdated classes now.
+        __COMPONENT_POOL_LOCK.acquire()
+        try:
+            __COMPONENT_POOL.clear()
+        finally:
+            __COMPONENT_POOL_LOCK.release()
     return __CODE_MAP.keys()
 
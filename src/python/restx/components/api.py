@@ -24,7 +24,8 @@ Expose the complete API for component authors.
 """
 from restx.components.BaseComponent   import BaseComponent
 from restx.core.parameter             import *
-from restx.resources.resource_runner  import accessResource
+from restx.core.table                 import Table
+from restx.resources.resource_runner  import accessResource, accessResources
 from restx.resources                  import makeResource
 
 from org.mulesoft.restx.exception     import *
@@ -23,10 +23,11 @@ Defines a base class for all components.
 
 """
 # Python imports
-import urlparse, urllib, urllib2, socket, httplib, base64
+import urlparse, urllib, urllib2, base64
 
 import restx.settings as settings
 
+from restx.components.http_client          import CONNECTION_POOL
 from restx.storageabstraction.file_storage import FileStorage
 from org.mulesoft.restx.component          import BaseComponentCapabilities
 from org.mulesoft.restx.component.api      import HttpResult, HTTP
@@ -148,43 +149,16 @@ class BaseCapabilities(BaseComponentCapabilities):
         else:
             headers = dict()
 
-        #
-        # For some reason, under Jython we are REALLY slow in handling the kind
-        # of host names where we get more than one DNS hit back.
-        #
-        # As a stop gap measure:
-        #
-        #    1. Do a normal DNS lookup for the host name, using the socket library
-        #    2. Replace the host name in the URI with the IP address string
-        #    3. Add a 'Host' header with the original host name to the request
-        #
-        # Wish I wouldn't have to do that...
-        #
-        try:
-            ipaddr          = socket.gethostbyname(host)   # One of the possible IP addresses for this host
-            headers["Host"] = host                         # Will add a proper host header
-            host            = ipaddr
-        except Exception, e:
-            # Can't do IP address replacemenet? Let it sort itself out on its own
-            pass
-
         if (self.__accountname is not None)  and  (self.__password is not None):
             headers["Authorization"] = "Basic " + base64.encodestring('%s:%s' % (self.__accountname, self.__password))[:-1]
 
-        if scheme == 'https':
-            conn = httplib.HTTPSConnection(host)
-        else:
-            conn = httplib.HTTPConnection(host)
-
-        conn.request(method, allpath, data, headers)
-        conn.sock.settimeout(timeout)
+        if port:
+            port = int(port)
 
-        try:
-            resp   = conn.getresponse()
-            code   = resp.status
-            data   = resp.read()
-        except socket.timeout, e:
-            return HTTP.REQUEST_TIMEOUT, "Request timed out"
+        # The connection pool resolves the host name itself (with a cache,
+        # since DNS lookups are really slow under Jython) and re-uses open
+        # connections to the same server.
+        code, data = CONNECTION_POOL.request(method, scheme, host, port, allpath, data, headers, timeout)
 
         return code, data
         
@@ -270,6 +244,55 @@ class BaseCapabilities(BaseComponentCapabilities):
             _ACCESS_RESOURCE_IMPORTED = False
         return accessResource_glob(*args, **kwargs)
 
+    def accessResources(self, resource_requests, timeout=None):
+        """
+        Access several resources in parallel.
+
+        Each access goes through accessResource() of this object.
+
+        @param resource_requests:   List of resource URIs or of dictionaries with the
+                                    arguments for accessResource(), each optionally
+                                    with a 'timeout'.
+        @type resource_requests:    list
+
+        @param timeout:             Number of seconds to wait for each call, or None.
+        @type timeout:              float
+
+        @return:                    List of (status, data) tuples, in the order of the requests.
+        @rtype:                     list
+
+        """
+        from restx.resources.resource_runner import accessResources as accessResources_glob
+        return accessResources_glob(resource_requests, timeout, self.accessResource)
+
+    def getServiceDefinition(self, resource_uri):
+        """
+        Return the definition of the service a resource URI refers to.
+
+        @param resource_uri:        The uri of the resource, starting with "/resource/".
+        @type resource_uri:         string
+
+        @return:                    The public service definition or None.
+        @rtype:                     dict
+
+        """
+        from restx.resources.resource_runner import getServiceDefinition as getServiceDefinition_glob
+        return getServiceDefinition_glob(resource_uri)
+
+    def getResourceFingerprint(self, resource_uri):
+        """
+        Return a digest of the stored definition of the resource a URI refers to.
+
+        @param resource_uri:        The uri of the resource, starting with "/resource/".
+        @type resource_uri:         string
+
+        @return:                    The digest or None.
+        @rtype:                     string
+
+        """
+        from restx.resources.resource_runner import getResourceFingerprint as getResourceFingerprint_glob
+        return getResourceFingerprint_glob(resource_uri)
+
     def makeResource(self, *args, **kwargs):
         """
         Create a new resource representation from the
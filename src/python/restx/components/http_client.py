@@ -0,0 +1,326 @@
+"""
+RESTx: Sane, simple and effective data publishing and integration.
+
+Copyright (C) 2010   MuleSoft Inc.    http://www.mulesoft.com
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+"""
+A shared HTTP client for the components.
+
+Connections to other servers are kept open after a request and are
+re-used for the next request to the same (scheme, host, port). Host names
+are resolved once and the address is remembered for HTTP_CLIENT_DNS_TTL
+seconds. Responses are requested with gzip compression where the server
+supports it.
+
+"""
+
+# Python imports
+import time
+import gzip
+import socket
+import httplib
+import threading
+
+from StringIO import StringIO
+
+import restx.settings as settings
+
+from org.mulesoft.restx.component.api import HTTP
+
+
+# Methods that may be sent again if a re-used connection fails
+_IDEMPOTENT_METHODS = [ "GET", "HEAD", "PUT", "DELETE", "OPTIONS" ]
+
+
+def _keep_alive_timeout(resp):
+    """
+    Return for how many seconds a connection may stay idle after this response.
+
+    A server may announce its keep-alive timeout in a 'Keep-Alive' header,
+    for example "timeout=5, max=100". We stop using the connection a second
+    before that, since the server started counting when it sent the response.
+    Without such a header, HTTP_CLIENT_IDLE_TIMEOUT applies.
+
+    """
+    timeout = settings.HTTP_CLIENT_IDLE_TIMEOUT
+    for param in (resp.getheader("Keep-Alive") or "").split(","):
+        name, _, value = param.strip().partition("=")
+        if name.lower() == "timeout":
+            try:
+                timeout = min(timeout, int(value) - 1)
+            except ValueError:
+                pass
+    return timeout
+
+
+class _StaleConnection(Exception):
+    """
+    Raised when a re-used connection turns out to have been closed by the server.
+
+    """
+    pass
+
+
+class _DnsCache(object):
+    """
+    Remembers the resolved address of host names for a while.
+
+    """
+    def __init__(self):
+        self.__addresses = dict()
+        self.__lock      = threading.Lock()
+
+    def resolve(self, host):
+        """
+        Return an IP address for the host, or None if it can't be resolved.
+
+        Failed lookups are not remembered.
+
+        @param host:    The host name.
+        @type host:     string
+
+        @return:        One of the IP addresses of the host.
+        @rtype:         string
+
+        """
+        now = time.time()
+        self.__lock.acquire()
+        try:
+            entry = self.__addresses.get(host)
+        finally:
+            self.__lock.release()
+        if entry  and  entry[1] > now:
+            return entry[0]
+        try:
+            ipaddr = socket.gethostbyname(host)
+        except Exception, e:
+            return None
+        self.__lock.acquire()
+        try:
+            self.__addresses[host] = (ipaddr, now + settings.HTTP_CLIENT_DNS_TTL)
+        finally:
+            self.__lock.release()
+        return ipaddr
+
+
+class HttpConnectionPool(object):
+    """
+    Keeps idle keep-alive connections, keyed by (scheme, host, port).
+
+    """
+    def __init__(self):
+        self.__idle      = dict()
+        self.__lock      = threading.Lock()
+        self.__dns_cache = _DnsCache()
+        self.__created   = 0
+        self.__reused    = 0
+
+    def __get_connection(self, key, max_idle):
+        """
+        Return an idle connection for the key, or None.
+
+        Connections that have been idle for longer than their keep-alive
+        timeout are closed, since the server has probably dropped them
+        already. Connections that have been idle for longer than 'max_idle'
+        seconds are left for other requests.
+
+        """
+        now = time.time()
+        self.__lock.acquire()
+        try:
+            idle = self.__idle.get(key)
+            while idle:
+                # The most recently used connection is at the end
+                conn, since, timeout = idle[-1]
+                if now - since >= timeout:
+                    idle.pop()
+                    conn.close()
+                    continue
+                if now - since >= max_idle:
+                    return None
+                idle.pop()
+                self.__reused += 1
+                return conn
+            return None
+        finally:
+            self.__lock.release()
+
+    def __put_connection(self, key, conn, timeout):
+        """
+        Put a connection back into the pool after its response was read.
+
+        The connection is re-used for at most 'timeout' seconds.
+
+        """
+        if timeout > 0:
+            self.__lock.acquire()
+            try:
+                idle = self.__idle.setdefault(key, list())
+                if len(idle) < settings.HTTP_CLIENT_MAX_IDLE_PER_HOST:
+                    idle.append((conn, time.time(), timeout))
+                    return
+            finally:
+                self.__lock.release()
+        conn.close()
+
+    def __new_connection(self, scheme, host, port):
+        """
+        Open a new connection to the server.
+
+        The connection is established right away, with the connect timeout
+        from the settings, if the platform's httplib supports that.
+
+        """
+        ipaddr = self.__dns_cache.resolve(host)
+        if ipaddr:
+            host = ipaddr
+        if scheme == "https":
+            conn_class = httplib.HTTPSConnection
+        else:
+            conn_class = httplib.HTTPConnection
+        try:
+            conn = conn_class(host, port, timeout=settings.HTTP_CLIENT_CONNECT_TIMEOUT)
+        except TypeError:
+            # Older httplib (Jython 2.5) doesn't know about timeouts
+            conn = conn_class(host, port)
+        conn.connect()
+        self.__lock.acquire()
+        try:
+            self.__created += 1
+        finally:
+            self.__lock.release()
+        return conn
+
+    def request(self, method, scheme, host, port, path, data=None, headers=None, timeout=None):
+        """
+        Send a request and return the response.
+
+        If the server closed a re-used connection in the meantime then the
+        request is sent again on a new connection. This is only done if
+        the request couldn't be sent, or for idempotent requests (such as
+        GET), which are safe to repeat. Other requests (such as POST) only
+        re-use a connection that has been idle for a very short time, since
+        the server is unlikely to have closed it yet.
+
+        @param method:     The method for the HTTP request.
+        @type method:      string
+
+        @param scheme:     Either 'http' or 'https'.
+        @type scheme:      string
+
+        @param host:       The host name of the server.
+        @type host:        string
+
+        @param port:       The port of the server, or None for the default.
+        @type port:        int
+
+        @param path:       The path, query and fragment of the URL.
+        @type path:        string
+
+        @param data:       The request body, or None.
+        @type data:        string
+
+        @param headers:    The request headers. A 'Host' and an 'Accept-Encoding'
+                           header are added if they are not present.
+        @type headers:     dict
+
+        @param timeout:    Timeout for reading the response in seconds, or None.
+        @type timeout:     float
+
+        @return:           Code and response data tuple.
+        @rtype:            tuple
+
+        """
+        if headers is None:
+            headers = dict()
+        lower_names = [ name.lower() for name in headers.keys() ]
+        if "host" not in lower_names:
+            headers["Host"] = host if not port else "%s:%s" % (host, port)
+        if "accept-encoding" not in lower_names:
+            headers["Accept-Encoding"] = "gzip"
+
+        if method in _IDEMPOTENT_METHODS:
+            max_idle = settings.HTTP_CLIENT_IDLE_TIMEOUT
+        else:
+            max_idle = settings.HTTP_CLIENT_UNSAFE_IDLE_TIMEOUT
+        key  = (scheme, host, port)
+        conn = self.__get_connection(key, max_idle)
+        if conn:
+            try:
+                return self.__send(key, conn, method, path, data, headers, timeout, reused=True)
+            except _StaleConnection:
+                # The server closed the idle connection in the meantime.
+                pass
+        conn = self.__new_connection(scheme, host, port)
+        return self.__send(key, conn, method, path, data, headers, timeout)
+
+    def __send(self, key, conn, method, path, data, headers, timeout, reused=False):
+        """
+        Send the request on the given connection and read the response.
+
+        Afterwards, the connection is put back into the pool, unless the
+        server indicated that it is going to close it.
+
+        @raise _StaleConnection:  If a re-used connection failed and the request
+                                  can safely be sent again.
+
+        """
+        conn.sock.settimeout(timeout)
+        sent = False
+        try:
+            conn.request(method, path, data, headers)
+            sent = True
+            resp = conn.getresponse()
+            body = resp.read()
+        except socket.timeout, e:
+            conn.close()
+            return HTTP.REQUEST_TIMEOUT, "Request timed out"
+        except (socket.error, httplib.HTTPException), e:
+            conn.close()
+            if reused  and  (not sent  or  method in _IDEMPOTENT_METHODS):
+                raise _StaleConnection()
+            raise
+        except:
+            conn.close()
+            raise
+
+        if resp.will_close:
+            conn.close()
+        else:
+            self.__put_connection(key, conn, _keep_alive_timeout(resp))
+
+        if (resp.getheader("Content-Encoding") or "").lower() == "gzip":
+            body = gzip.GzipFile(fileobj=StringIO(body)).read()
+        return resp.status, body
+
+    def getStats(self):
+        """
+        Return information about the connections in the pool.
+
+        """
+        self.__lock.acquire()
+        try:
+            idle = dict([ ("%s://%s%s" % (scheme, host, ":%s" % port if port else ""), len(conns)) \
+                                for (scheme, host, port), conns in self.__idle.items() ])
+            return dict(idle=idle, created=self.__created, reused=self.__reused)
+        finally:
+            self.__lock.release()
+
+
+CONNECTION_POOL = HttpConnectionPool()
+
@@ -0,0 +1,372 @@
+"""
+RESTx: Sane, simple and effective data publishing and integration.
+
+Copyright (C) 2010   MuleSoft Inc.    http://www.mulesoft.com
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+"""
+Pools of JDBC connections for the components.
+
+There is one pool per database (driver class and connection string).
+A pool opens at most DB_POOL_MAX_SIZE connections. A connection is
+validated before it is handed out and connections that have been idle
+for longer than DB_POOL_IDLE_TIMEOUT seconds are closed. Each connection
+keeps the statements that were prepared on it, so that the same SQL
+is only prepared once per connection.
+
+"""
+
+# Python imports
+import time
+import threading
+
+import restx.settings as settings
+
+from org.mulesoft.restx.exception import RestxException
+
+from java.sql  import DriverManager
+from java.lang import Class
+
+
+class PooledConnection(object):
+    """
+    A JDBC connection together with the statements prepared on it.
+
+    Statements returned by prepare() belong to the connection and
+    must not be closed by the caller.
+
+    """
+    def __init__(self, pool, connection):
+        self.pool         = pool
+        self.connection   = connection
+        self.last_used    = time.time()
+        self.__statements = dict()
+        self.__lru        = list()
+
+    def prepare(self, sql, flags=None):
+        """
+        Return a prepared statement for the SQL.
+
+        The statement is re-used if it was prepared on this connection
+        before. Its parameters and maximum number of rows are reset.
+
+        @param sql:      The SQL, with '?' as placeholders.
+        @type sql:       string
+
+        @param flags:    Optional flags for prepareStatement(), for example
+                         Statement.RETURN_GENERATED_KEYS.
+        @type flags:     int
+
+        @return:         The prepared statement.
+        @rtype:          PreparedStatement
+
+        """
+        key  = (sql, flags)
+        stmt = self.__statements.get(key)
+        if stmt is not None:
+            self.__lru.remove(key)
+            self.__lru.append(key)
+            stmt.clearParameters()
+            stmt.setMaxRows(0)
+            self.pool._count("statements_reused")
+            return stmt
+
+        if flags is None:
+            stmt = self.connection.prepareStatement(sql)
+        else:
+            stmt = self.connection.prepareStatement(sql, flags)
+        if len(self.__lru) >= settings.DB_POOL_MAX_STATEMENTS:
+            # Close the least recently used statement
+            old_key = self.__lru.pop(0)
+            self.__close_quietly(self.__statements.pop(old_key))
+        self.__statements[key] = stmt
+        self.__lru.append(key)
+        self.pool._count("statements_prepared")
+        return stmt
+
+    def is_valid(self):
+        """
+        Return True if the connection can still be used.
+
+        """
+        try:
+            return bool(self.connection.isValid(settings.DB_POOL_VALIDATION_TIMEOUT))
+        except:
+            # Drivers without JDBC 4 support don't know isValid()
+            try:
+                return not self.connection.isClosed()
+            except:
+                return False
+
+    def close(self):
+        """
+        Close the connection and all of its statements.
+
+        """
+        for stmt in self.__statements.values():
+            self.__close_quietly(stmt)
+        self.__statements = dict()
+        self.__lru        = list()
+        self.__close_quietly(self.connection)
+
+    def __close_quietly(self, obj):
+        try:
+            obj.close()
+        except:
+            pass
+
+
+class JdbcConnectionPool(object):
+    """
+    A bounded pool of connections to a single database.
+
+    """
+    def __init__(self, driver_class, connection_string):
+        self.__driver_class      = driver_class
+        self.__connection_string = connection_string
+        self.__idle              = list()
+        self.__size              = 0
+        self.__cond              = threading.Condition(threading.Lock())
+        self.__table_columns     = dict()
+        self.__stats             = dict(created=0, borrowed=0, invalid=0, evicted=0, waited=0, timeouts=0,
+                                        statements_prepared=0, statements_reused=0)
+
+    def _count(self, name):
+        self.__cond.acquire()
+        try:
+            self.__stats[name] += 1
+        finally:
+            self.__cond.release()
+
+    def __evict(self, now):
+        """
+        Remove connections from the pool, which have been idle for too long.
+
+        Needs to be called with the lock held. The removed connections are
+        returned, so that they can be closed after the lock is released.
+
+        """
+        expired = [ pc for pc in self.__idle if now - pc.last_used > settings.DB_POOL_IDLE_TIMEOUT ]
+        if expired:
+            self.__idle                = [ pc for pc in self.__idle if pc not in expired ]
+            self.__size               -= len(expired)
+            self.__stats['evicted']   += len(expired)
+            self.__cond.notify()
+        return expired
+
+    def __connect(self):
+        Class.forName(self.__driver_class)
+        return PooledConnection(self, DriverManager.getConnection(self.__connection_string))
+
+    def borrow(self):
+        """
+        Return a connection from the pool.
+
+        An idle connection is handed out if there is one, after checking that
+        it is still valid. Otherwise a new connection is opened, unless the pool
+        is at its maximum size. In that case, we wait for a connection to be
+        handed back, for at most DB_POOL_MAX_WAIT seconds.
+
+        The connection needs to be handed back with release().
+
+        @return:                The connection.
+        @rtype:                 PooledConnection
+
+        @raise RestxException:  If no connection became available in time.
+
+        """
+        deadline = time.time() + settings.DB_POOL_MAX_WAIT
+        while True:
+            pc     = None
+            create = False
+            self.__cond.acquire()
+            try:
+                waited = False
+                while True:
+                    now     = time.time()
+                    expired = self.__evict(now)
+                    if expired  or  self.__idle  or  self.__size < settings.DB_POOL_MAX_SIZE:
+                        break
+                    if now >= deadline:
+                        self.__stats['timeouts'] += 1
+                        raise RestxException("Timed out waiting for a database connection")
+                    if not waited:
+                        self.__stats['waited'] += 1
+                        waited = True
+                    self.__cond.wait(deadline - now)
+                if self.__idle:
+                    # The most recently used connection is most likely to be valid
+                    pc = self.__idle.pop()
+                    self.__stats['borrowed'] += 1
+                elif self.__size < settings.DB_POOL_MAX_SIZE:
+                    self.__size += 1
+                    create       = True
+                    self.__stats['borrowed'] += 1
+            finally:
+                self.__cond.release()
+
+            for old in expired:
+                old.close()
+
+            if create:
+                try:
+                    pc = self.__connect()
+                except:
+                    self.__discard()
+                    raise
+                self._count("created")
+                return pc
+            if pc:
+                if pc.is_valid():
+                    return pc
+                self._count("invalid")
+                pc.close()
+                self.__discard()
+
+    def __discard(self):
+        """
+        Give up the place of a connection that was borrowed or being opened.
+
+        """
+        self.__cond.acquire()
+        try:
+            self.__size -= 1
+            self.__cond.notify()
+        finally:
+            self.__cond.release()
+
+    def release(self, pc, broken=False):
+        """
+        Hand a connection back to the pool.
+
+        @param pc:        The connection, as returned by borrow().
+        @type pc:         PooledConnection
+
+        @param broken:    Set this if the connection should not be used again.
+        @type broken:     boolean
+
+        """
+        if broken:
+            pc.close()
+            self.__discard()
+            return
+        pc.last_used = time.time()
+        self.__cond.acquire()
+        try:
+            self.__idle.append(pc)
+            self.__cond.notify()
+        finally:
+            self.__cond.release()
+
+    def getTableColumns(self, pc, table_name):
+        """
+        Return the names of the columns of a table.
+
+        The names are only looked up once per table.
+
+        @param pc:            A connection borrowed from this pool.
+        @type pc:             PooledConnection
+
+        @param table_name:    Name of the table.
+        @type table_name:     string
+
+        @return:              List of column names.
+        @rtype:               list
+
+        """
+        self.__cond.acquire()
+        try:
+            table_columns = self.__table_columns.get(table_name)
+        finally:
+            self.__cond.release()
+        if table_columns is None:
+            res = pc.connection.getMetaData().getColumns(None, None, table_name, None)
+            table_columns = list()
+            try:
+                while res.next():
+                    table_columns.append(res.getString("COLUMN_NAME"))
+            finally:
+                res.close()
+            self.__cond.acquire()
+            try:
+                self.__table_columns[table_name] = table_columns
+            finally:
+                self.__cond.release()
+        return table_columns
+
+    def getStats(self):
+        """
+        Return information about the connections in the pool.
+
+        """
+        self.__cond.acquire()
+        try:
+            stats = dict(self.__stats)
+            stats['size']     = self.__size
+            stats['idle']     = len(self.__idle)
+            stats['in_use']   = self.__size - len(self.__idle)
+            stats['max_size'] = settings.DB_POOL_MAX_SIZE
+            return stats
+        finally:
+            self.__cond.release()
+
+    def close(self):
+        """
+        Close all idle connections.
+
+        Connections that are in use are closed when they are handed back.
+
+        """
+        self.__cond.acquire()
+        try:
+            idle         = self.__idle
+            self.__idle  = list()
+            self.__size -= len(idle)
+            self.__cond.notifyAll()
+        finally:
+            self.__cond.release()
+        for pc in idle:
+            pc.close()
+
+
+_POOLS      = dict()
+_POOLS_LOCK = threading.Lock()
+
+def get_pool(driver_class, connection_string):
+    """
+    Return the connection pool for a database.
+
+    @param driver_class:        Class name of the JDBC driver.
+    @type driver_class:         string
+
+    @param connection_string:   The JDBC connection string.
+    @type connection_string:    string
+
+    @return:                    The pool for this database.
+    @rtype:                     JdbcConnectionPool
+
+    """
+    key = (driver_class, connection_string)
+    _POOLS_LOCK.acquire()
+    try:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = JdbcConnectionPool(driver_class, connection_string)
+            _POOLS[key] = pool
+        return pool
+    finally:
+        _POOLS_LOCK.release()
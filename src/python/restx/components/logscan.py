@@ -0,0 +1,551 @@
+"""
+RESTx: Sane, simple and effective data publishing and integration.
+
+Copyright (C) 2010   MuleSoft Inc.    http://www.mulesoft.com
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+"""
+Scanning of web server log files in large blocks.
+
+Log files are processed a block of complete lines at a time, instead of
+line by line. Lines are only cut out of a block if they pass the filters,
+and the time stamp of a line is only looked at in the block where the
+time range ends. This relies on the lines of a log file being in time
+order.
+
+Where the platform supports it (CPython), the file is memory-mapped.
+Otherwise (Jython), the blocks are read from the file. Gzip-compressed
+log files are decompressed block by block.
+
+"""
+
+# Python imports
+import re
+import sys
+import gzip
+import Queue
+import threading
+
+import restx.settings as settings
+
+try:
+    import mmap
+except ImportError:
+    mmap = None
+
+# Size of the blocks in which log files are read.
+BLOCK_SIZE = 1024 * 1024
+
+MONTH_LOOKUP = {
+    "Jan" : "01",
+    "Feb" : "02",
+    "Mar" : "03",
+    "Apr" : "04",
+    "May" : "05",
+    "Jun" : "06",
+    "Jul" : "07",
+    "Aug" : "08",
+    "Sep" : "09",
+    "Oct" : "10",
+    "Nov" : "11",
+    "Dec" : "12",
+}
+
+
+def makedatestr(date_text):
+    """
+    date_text has to be in format DD/mmm/YYYY/HH:MM[:SS]
+
+    Return string "YYYYMMDD:HH:MM[:SS]
+
+    If it can't be parsed properly then it just returns
+    an empty string.
+
+    """
+    try:
+        _date, _time =  date_text.split(":", 1)
+        day, month, year = _date.split("/")
+        linedate = year + MONTH_LOOKUP[month] + day + ":" + _time
+    except Exception, e:
+        linedate = ''
+
+    return linedate
+
+def linedatestr(line):
+    """
+    Return the date of a log file line in the format produced by makedatestr().
+
+    Returns an empty string for lines without a date.
+
+    """
+    words = line.split(' ')
+    if len(words) >= 6:
+        tword = words[3][1:]
+        return makedatestr(tword)
+    else:
+        return ''
+
+
+class LineMatcher(object):
+    """
+    Selects the lines of a block that pass the filters.
+
+    A line passes if it contains all of the include terms and none of the
+    exclude terms. The longest include term is searched for in the block as
+    a whole, so that only the lines containing it are looked at any
+    further. The exclude terms are combined into a single regular
+    expression.
+
+    """
+    def __init__(self, inc_terms, exl_terms):
+        """
+        @param inc_terms:   Terms a line must contain.
+        @type inc_terms:    list
+
+        @param exl_terms:   Terms a line must not contain.
+        @type exl_terms:    list
+
+        """
+        inc_terms = [ t for t in inc_terms if t ]
+        exl_terms = [ t for t in exl_terms if t ]
+        if inc_terms:
+            inc_terms.sort(key=len)
+            self.__anchor = inc_terms.pop()
+        else:
+            self.__anchor = None
+        self.__others = inc_terms
+        if exl_terms:
+            self.__exclude = re.compile("|".join([ re.escape(t) for t in exl_terms ])).search
+        else:
+            self.__exclude = None
+
+    def is_trivial(self):
+        """
+        Return True if all lines pass.
+
+        """
+        return self.__anchor is None  and  self.__exclude is None
+
+    def lines(self, block):
+        """
+        Return the lines of a block that pass the filters.
+
+        @param block:   Complete lines, each ending with a newline.
+        @type block:    string
+
+        @return:        The lines, without newlines.
+        @rtype:         list
+
+        """
+        anchor = self.__anchor
+        if anchor is None:
+            lines = block[:-1].split("\n")
+        else:
+            lines = []
+            find  = block.find
+            rfind = block.rfind
+            pos   = find(anchor)
+            while pos >= 0:
+                start = rfind("\n", 0, pos) + 1
+                end   = find("\n", pos)
+                lines.append(block[start:end])
+                pos   = find(anchor, end)
+            for term in self.__others:
+                lines = [ l for l in lines if term in l ]
+        if self.__exclude:
+            exclude = self.__exclude
+            lines   = [ l for l in lines if not exclude(l) ]
+        return lines
+
+    def count(self, block):
+        """
+        Return the number of lines in a block that pass the filters.
+
+        """
+        if self.is_trivial():
+            return block.count("\n")
+        return len(self.lines(block))
+
+
+def is_compressed(filename):
+    """
+    Return True if the log file is gzip-compressed.
+
+    """
+    return filename.endswith(".gz")
+
+def open_log(filename):
+    """
+    Open a log file for reading, decompressing it if necessary.
+
+    """
+    if is_compressed(filename):
+        return gzip.open(filename, "rb")
+    return open(filename, "rb")
+
+
+def _range_start(block, searchstart):
+    """
+    Return the offset of the first line in the block at or after the start of the time range.
+
+    Returns None if the whole block is before the range. Lines without a
+    time stamp that come before the range are skipped.
+
+    """
+    last_start = block.rfind("\n", 0, len(block) - 1) + 1
+    last_date  = linedatestr(block[last_start:-1])
+    if last_date  and  last_date < searchstart:
+        return None
+    start = 0
+    while start < len(block):
+        end = block.find("\n", start)
+        if linedatestr(block[start:end]) >= searchstart:
+            return start
+        start = end + 1
+    return None
+
+def _range_end(block, searchend):
+    """
+    Return the offset of the first line in the block after the end of the time range.
+
+    Returns None if the whole block is within the range. Lines without a
+    time stamp are considered to be within the range.
+
+    """
+    last_start = block.rfind("\n", 0, len(block) - 1) + 1
+    last_date  = linedatestr(block[last_start:-1])
+    if last_date  and  last_date <= searchend:
+        return None
+    start = 0
+    while start < len(block):
+        end = block.find("\n", start)
+        if linedatestr(block[start:end]) > searchend:
+            return start
+        start = end + 1
+    return None
+
+
+class _FileBlocks(object):
+    """
+    Reads a file in blocks of BLOCK_SIZE bytes, starting at an offset.
+
+    """
+    def __init__(self, handle, offset):
+        self.__handle = handle
+        self.__offset = offset
+        self.__map    = None
+        if mmap  and  hasattr(handle, "fileno")  and  not isinstance(handle, gzip.GzipFile):
+            try:
+                self.__map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            except Exception, e:
+                # Empty files can't be mapped, for example
+                self.__map = None
+        if self.__map is None  and  offset:
+            handle.seek(offset)
+
+    def read(self):
+        if self.__map is not None:
+            data = self.__map[self.__offset:self.__offset + BLOCK_SIZE]
+            self.__offset += len(data)
+            return data
+        return self.__handle.read(BLOCK_SIZE)
+
+    def close(self):
+        if self.__map is not None:
+            self.__map.close()
+        self.__handle.close()
+
+
+def blocks_in_range(handle, offset, searchstart, searchend):
+    """
+    Produce the lines of a log file within the time range, in blocks.
+
+    Each block consists of complete lines. A last line without newline is
+    still being written and is left out. The handle is closed once the
+    range has been read.
+
+    @param handle:      The open log file.
+    @type handle:       file
+
+    @param offset:      Offset at which to start reading, at the start of a
+                        line before or at the start of the range.
+    @type offset:       int
+
+    @param searchstart: Start of the range, in the format produced by makedatestr().
+    @type searchstart:  string
+
+    @param searchend:   End of the range, in the format produced by makedatestr().
+    @type searchend:    string
+
+    @return:            Iterator over blocks.
+    @rtype:             iterator
+
+    """
+    source = _FileBlocks(handle, offset)
+    try:
+        carry   = ""
+        started = False
+        while True:
+            data = source.read()
+            if not data:
+                break
+            end = data.rfind("\n")
+            if end < 0:
+                carry += data
+                continue
+            block = carry + data[:end + 1]
+            carry = data[end + 1:]
+            if not started:
+                cut = _range_start(block, searchstart)
+                if cut is None:
+                    continue
+                block   = block[cut:]
+                started = True
+            cut = _range_end(block, searchend)
+            if cut is not None:
+                if cut:
+                    yield block[:cut]
+                break
+            yield block
+    finally:
+        source.close()
+
+
+def time_span(filename):
+    """
+    Return the time stamps of the first and last line of a log file.
+
+    For compressed files, this means reading the entire file.
+
+    @return:    Tuple of first and last time stamp, in the format produced
+                by makedatestr(). Empty strings if the file has no lines
+                with time stamps.
+    @rtype:     tuple
+
+    """
+    first = last = ''
+    handle = open_log(filename)
+    try:
+        # The first time stamp
+        while not first:
+            line = handle.readline()
+            if not line:
+                return first, last
+            first = linedatestr(line.rstrip("\n"))
+        # The last time stamp
+        if is_compressed(filename):
+            blocks = _FileBlocks(handle, 0)
+        else:
+            handle.seek(0, 2)
+            size = handle.tell()
+            blocks = _FileBlocks(handle, max(0, size - BLOCK_SIZE))
+        try:
+            data = blocks.read()
+            while data:
+                for line in reversed(data.split("\n")[1:-1]):
+                    linedate = linedatestr(line)
+                    if linedate:
+                        last = linedate
+                        break
+                data = blocks.read()
+        finally:
+            blocks.close()
+    finally:
+        handle.close()
+    return first, last
+
+
+def _ipaddr(line):
+    return line.split(" ", 1)[0]
+
+def ipaddr_set(blocks, matcher):
+    """
+    Return the set of IP addresses of the lines that pass the filters.
+
+    """
+    hitlist = set()
+    for block in blocks:
+        hitlist.update([ _ipaddr(l) for l in matcher.lines(block) ])
+    return hitlist
+
+def count_lines(blocks, matcher, unique_only):
+    """
+    Return the number of lines that pass the filters.
+
+    @param blocks:      Blocks of complete lines.
+    @type blocks:       iterator
+
+    @param matcher:     The filters.
+    @type matcher:      LineMatcher
+
+    @param unique_only: Only count the first line for each IP address.
+    @type unique_only:  boolean
+
+    @return:            The number of lines.
+    @rtype:             int
+
+    """
+    if unique_only:
+        return len(ipaddr_set(blocks, matcher))
+    count = 0
+    for block in blocks:
+        count += matcher.count(block)
+    return count
+
+def iter_lines(blocks, matcher, unique_only):
+    """
+    Produce the lines that pass the filters.
+
+    @param blocks:      Blocks of complete lines.
+    @type blocks:       iterator
+
+    @param matcher:     The filters.
+    @type matcher:      LineMatcher
+
+    @param unique_only: Only produce the first line for each IP address.
+    @type unique_only:  boolean
+
+    @return:            Iterator over the lines, as unicode strings.
+    @rtype:             iterator
+
+    """
+    # If unique_only is set then we maintain a set, which tells us whether
+    # we have an entry for this IP address already and will ignore further
+    # entries.
+    if unique_only:
+        hitlist = set()
+    for block in blocks:
+        for line in matcher.lines(block):
+            if unique_only:
+                ipaddr = _ipaddr(line)
+                if ipaddr in hitlist:
+                    continue
+                hitlist.add(ipaddr)
+            yield line.decode("utf-8", "replace")
+
+def unique_lines(lines, hitlist):
+    """
+    Produce the lines for IP addresses that are not in the hitlist yet.
+
+    The hitlist is updated with the addresses of the produced lines.
+
+    """
+    for line in lines:
+        ipaddr = _ipaddr(line)
+        if ipaddr not in hitlist:
+            hitlist.add(ipaddr)
+            yield line
+
+
+class _ScanJob(object):
+    """
+    A function call that was handed to the scan pool.
+
+    Whoever claims the job first (a worker thread or the thread that wants
+    its result) runs it.
+
+    """
+    def __init__(self, func, args):
+        self.func      = func
+        self.args      = args
+        self.result    = None
+        self.exc_info  = None
+        self.__claimed = False
+        self.__lock    = threading.Lock()
+        self.__done    = threading.Event()
+
+    def claim(self):
+        """
+        Return True if the caller may run this job, False if someone else got to it first.
+
+        """
+        self.__lock.acquire()
+        try:
+            if self.__claimed:
+                return False
+            self.__claimed = True
+            return True
+        finally:
+            self.__lock.release()
+
+    def run(self):
+        try:
+            self.result = self.func(*self.args)
+        except:
+            self.exc_info = sys.exc_info()
+        self.__done.set()
+
+    def get(self):
+        """
+        Return the result of the job, running it in this thread if it hasn't been started yet.
+
+        """
+        if self.claim():
+            self.run()
+        self.__done.wait()
+        if self.exc_info:
+            raise self.exc_info[0], self.exc_info[1], self.exc_info[2]
+        return self.result
+
+
+class _ScanPool(object):
+    """
+    A fixed number of worker threads, which scan log files in parallel.
+
+    The threads are only started when the first job is submitted.
+
+    """
+    def __init__(self, num_threads):
+        self.__num_threads = num_threads
+        self.__queue       = Queue.Queue()
+        self.__started     = False
+        self.__lock        = threading.Lock()
+
+    def __start(self):
+        self.__lock.acquire()
+        try:
+            if not self.__started:
+                for i in range(self.__num_threads):
+                    t = threading.Thread(target=self.__work, name="restx-logscan-%d" % i)
+                    t.setDaemon(True)
+                    t.start()
+                self.__started = True
+        finally:
+            self.__lock.release()
+
+    def __work(self):
+        while True:
+            job = self.__queue.get()
+            if job.claim():
+                job.run()
+
+    def submit(self, func, *args):
+        """
+        Run func(*args) on one of the worker threads.
+
+        @return:    The job. Its get() method returns the result.
+        @rtype:     _ScanJob
+
+        """
+        if not self.__started:
+            self.__start()
+        job = _ScanJob(func, args)
+        self.__queue.put(job)
+        return job
+
+
+SCAN_POOL = _ScanPool(settings.LOGFILE_SCAN_THREADS)
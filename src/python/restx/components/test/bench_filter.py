@@ -0,0 +1,165 @@
+"""
+RESTx: Sane, simple and effective data publishing and integration.
+
+Copyright (C) 2010   MuleSoft Inc.    http://www.mulesoft.com
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+#
+# This is a benchmark rather than a functional test: It filters a large
+# list of flat dictionaries with the Filter component and compares results
+# and times with a straightforward evaluation, one element and one filter
+# expression at a time.
+#
+# Since its name doesn't start with 'test_', bin/testrun doesn't run it
+# with the other test files. Run it on its own with:
+#
+#     bin/testrun restx/components/test/bench_filter.py
+#
+# The functional tests of the Filter component are in test_Filter.py.
+#
+
+import time
+import random
+
+# These imports are necessary for all component tests
+from restx.testtools.utils       import *
+from restx.components.api        import *
+
+# Importing the component we wish to test
+import restx.components.Filter
+from restx.components.Filter     import Filter
+
+
+ROW_COUNT   = 1000000
+
+# Filtering has to be at least this much faster than the
+# straightforward evaluation.
+MIN_SPEEDUP = 1.0
+
+_OPS = {
+    "="  : lambda x,y: x == y,
+    ">"  : lambda x,y: x > y,
+    ">=" : lambda x,y: x >= y,
+    "<"  : lambda x,y: x < y,
+    "<=" : lambda x,y: x <= y,
+    "!=" : lambda x,y: x != y,
+}
+
+
+def _make_rows(num):
+    random.seed(7)
+    cities = [ "Auckland", "Berlin", "Chicago", "Dublin", "Edinburgh" ]
+    rows   = list()
+    for i in xrange(num):
+        row = { "id" : i, "city" : random.choice(cities), "amount" : random.randint(0, 10000), "score" : random.random() }
+        if i % 10 == 0:
+            # Some rows miss an element
+            del row["score"]
+        rows.append(row)
+    return rows
+
+def _reference_filter(c, data, expressions, match_all):
+    """
+    Evaluate one element and simple filter expression at a time.
+
+    """
+    compiled = [ c._filter_compile(e) for e in expressions ]
+    out = list()
+    for row in data:
+        matched_count = 0
+        matched       = False
+        for (search_list, op, value) in compiled:
+            try:
+                elem = c._get_elem(row, search_list)
+                ok   = _OPS[op](elem, value)
+            except:
+                ok   = False
+            if ok:
+                matched_count += 1
+                if not match_all  or  matched_count == len(compiled):
+                    matched = True
+                    break
+        if matched:
+            out.append(row)
+    return out
+
+def _compare(name, data, expressions, match_all):
+    exps = expressions + [ "" ] * (3 - len(expressions))
+    rctp = dict(
+        input_resource_uri   = "/resource/foo",
+        filter_expression_1  = exps[0],
+        filter_expression_2  = exps[1],
+        filter_expression_3  = exps[2],
+        match_all            = match_all,
+    )
+    c = make_component(rctp, Filter)
+    c.accessResource = lambda uri: (200, data)
+
+    start    = time.time()
+    got      = c.filter(None, None, False).getEntity()
+    t_filter = time.time() - start
+
+    start    = time.time()
+    exp      = _reference_filter(c, data, expressions, match_all)
+    t_ref    = time.time() - start
+
+    print "---     %-25s %7d rows: %6.2f sec (reference: %6.2f sec, %5.1fx)" % \
+                (name, len(got), t_filter, t_ref, t_ref / max(t_filter, 0.001))
+    if got != exp:
+        return "Different results from the straightforward evaluation"
+    if t_ref / max(t_filter, 0.001) < MIN_SPEEDUP:
+        return "Slower than the straightforward evaluation"
+    return None
+
+
+# =====================================
+# Benchmarking filtering of large input
+# =====================================
+
+def runtest():
+
+    data = _make_rows(ROW_COUNT)
+    if restx.components.Filter.numpy:
+        print "---     Using NumPy"
+
+    #
+    # Test 1: Numeric comparison
+    #
+    test_evaluator("Test 1", _compare("number", data, [ "amount > 5000" ], True))
+
+    #
+    # Test 2: String comparison
+    #
+    test_evaluator("Test 2", _compare("string", data, [ "city = Berlin" ], True))
+
+    #
+    # Test 3: Element missing in some rows
+    #
+    test_evaluator("Test 3", _compare("missing elements", data, [ "score < 0.5" ], True))
+
+    #
+    # Test 4: Several expressions, all have to match
+    #
+    test_evaluator("Test 4", _compare("match all", data, [ "city = Berlin", "amount <= 100", "score >= 0.2" ], True))
+
+    #
+    # Test 5: Several expressions, one has to match
+    #
+    test_evaluator("Test 5", _compare("match any", data, [ "city = Dublin", "amount < 10" ], False))
+
+    return get_test_result()
+
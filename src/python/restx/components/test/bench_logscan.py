@@ -0,0 +1,198 @@
+"""
+RESTx: Sane, simple and effective data publishing and integration.
+
+Copyright (C) 2010   MuleSoft Inc.    http://www.mulesoft.com
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+#
+# This is a benchmark rather than a functional test: It writes a synthetic
+# log file in the combined log format and searches it with the
+# LogFileComponent, comparing results and times with a simple line by
+# line scan. Writing the log file takes a while and needs LOG_SIZE bytes
+# of space in the temp directory.
+#
+# Since its name doesn't start with 'test_', bin/testrun doesn't run it
+# with the other test files. Run it on its own with:
+#
+#     bin/testrun restx/components/test/bench_logscan.py
+#
+# The functional tests of the LogFileComponent are in test_LogFileComponent.py.
+#
+
+import os
+import time
+import random
+import tempfile
+
+from datetime import datetime, timedelta
+
+# These imports are necessary for all component tests
+from restx.testtools.utils           import *
+from restx.components.api            import *
+
+# Importing the component we wish to test
+from restx.components.LogFileComponent import LogFileComponent
+from restx.components.logscan          import linedatestr, makedatestr
+
+
+LOG_SIZE    = 1024 * 1024 * 1024
+
+# The search on the whole file has to be at least this much faster than
+# the line by line scan.
+MIN_SPEEDUP = 1.0
+
+START_TIME  = "01/Jan/2010:00:00:00"
+END_TIME    = "31/Dec/2030:00:00:00"
+
+_METHODS    = [ "GET", "GET", "GET", "POST", "HEAD" ]
+_PATHS      = [ "/", "/index.html", "/download/restx-0.9.2.zip", "/docs/api", "/images/logo.png", "/resource/Foo/access" ]
+_AGENTS     = [ "Mozilla/5.0 (X11; Linux x86_64) Firefox/3.6", "Mozilla/4.0 (compatible; MSIE 8.0; Windows NT 6.1)",
+                "Googlebot/2.1 (+http://www.google.com/bot.html)", "curl/7.19.7" ]
+
+
+def _write_log(filename, size):
+    random.seed(42)
+    t = datetime(2010, 1, 1)
+    f = open(filename, "w")
+    written = 0
+    try:
+        while written < size:
+            lines = []
+            for i in xrange(1000):
+                t += timedelta(seconds=random.randint(0, 2))
+                lines.append('10.%d.%d.%d - - [%s +0000] "%s %s HTTP/1.1" %d %d "http://restx.org/" "%s"\n' % \
+                                (random.randint(0, 3), random.randint(0, 255), random.randint(0, 255),
+                                 t.strftime("%d/%b/%Y:%H:%M:%S"), random.choice(_METHODS), random.choice(_PATHS),
+                                 random.choice([ 200, 200, 200, 304, 404 ]), random.randint(100, 100000),
+                                 random.choice(_AGENTS)))
+            buf = "".join(lines)
+            f.write(buf)
+            written += len(buf)
+    finally:
+        f.close()
+
+def _reference_scan(filename, searchstart, searchend, inc_filters, exl_filters, count_only, unique_only):
+    """
+    Search the log file one line at a time.
+
+    """
+    hitlist = set()
+    out     = []
+    f = open(filename, "r")
+    try:
+        for line in f:
+            line     = unicode(line.rstrip("\n"))
+            linedate = linedatestr(line)
+            if linedate < searchstart:
+                continue
+            if linedate > searchend:
+                break
+            if unique_only:
+                ipaddr = line.split(" ", 1)[0]
+                if ipaddr in hitlist:
+                    continue
+            filter_out = False
+            for t in inc_filters:
+                if t not in line:
+                    filter_out = True
+            for t in exl_filters:
+                if t in line:
+                    filter_out = True
+            if filter_out:
+                continue
+            if unique_only:
+                hitlist.add(ipaddr)
+            out.append(line)
+    finally:
+        f.close()
+    if count_only:
+        return len(out)
+    return out
+
+def _compare(name, c, filename, filter, count_only, unique_only):
+    inc_filters = [ t for t in filter.split(";") if t and not t.startswith("-") ]
+    exl_filters = [ t[1:] for t in filter.split(";") if t.startswith("-") ]
+
+    start  = time.time()
+    res    = c.subset(HttpMethod.GET, None, filter, START_TIME, END_TIME, count_only, unique_only)
+    got    = res.getEntity()
+    if not count_only:
+        got = list(got)
+    t_scan = time.time() - start
+
+    start  = time.time()
+    exp    = _reference_scan(filename, makedatestr(START_TIME), makedatestr(END_TIME),
+                             inc_filters, exl_filters, count_only, unique_only)
+    t_ref  = time.time() - start
+
+    print "---     %-30s  %6.2f sec (reference: %6.2f sec, %5.1fx)" % (name, t_scan, t_ref, t_ref / max(t_scan, 0.001))
+    if got != exp:
+        return "Different results from the line by line scan"
+    if t_ref / max(t_scan, 0.001) < MIN_SPEEDUP:
+        return "Slower than the line by line scan"
+    return None
+
+
+# ===================================================
+# Benchmarking searches through a large log file
+# ===================================================
+
+def runtest():
+
+    fd, filename = tempfile.mkstemp(suffix=".log")
+    os.close(fd)
+    try:
+        print "---     Writing %d MB log file..." % (LOG_SIZE / (1024 * 1024))
+        _write_log(filename, LOG_SIZE)
+
+        rctp = dict(
+            filename       = filename,
+            mustContain    = "",
+            mustNotContain = "",
+        )
+        c = make_component(rctp, LogFileComponent)
+
+        #
+        # Test 1: Counting all lines
+        #
+        test_evaluator("Test 1", _compare("count", c, filename, "", True, False))
+
+        #
+        # Test 2: Counting lines with include and exclude filters
+        #
+        test_evaluator("Test 2", _compare("count, filtered", c, filename, "download;-bot;-HEAD", True, False))
+
+        #
+        # Test 3: Counting unique IP addresses
+        #
+        test_evaluator("Test 3", _compare("count, unique", c, filename, "", True, True))
+
+        #
+        # Test 4: Getting filtered lines
+        #
+        test_evaluator("Test 4", _compare("lines, filtered", c, filename, "download;-bot;-HEAD", False, False))
+
+        #
+        # Test 5: Getting unique, filtered lines
+        #
+        test_evaluator("Test 5", _compare("lines, unique, filtered", c, filename, "POST", False, True))
+
+    finally:
+        os.remove(filename)
+
+    return get_test_result()
+
@@ -0,0 +1,314 @@
+"""
+RESTx: Sane, simple and effective data publishing and integration.
+
+Copyright (C) 2010   MuleSoft Inc.    http://www.mulesoft.com
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+#
+# To run this and other RESTx test files, use bin/testrun.
+#
+# This test uses an embedded SQLite database. The SQLite JDBC driver
+# (sqlite-jdbc) needs to be in the RESTx lib/ directory, otherwise the
+# tests are skipped.
+#
+
+import operator
+import os
+import tempfile
+
+import restx.settings as settings
+
+# These imports are necessary for all component tests
+from restx.testtools.utils           import *
+from restx.components.api            import *
+
+# Importing the component we wish to test
+from restx.components.DatabaseAccess import DatabaseAccess
+from restx.components.jdbc_pool      import get_pool
+
+from java.sql  import DriverManager
+from java.lang import Class, ClassNotFoundException
+
+
+DRIVER_CLASS = "org.sqlite.JDBC"
+
+PEOPLE = [
+    ( "Alice", "Berlin",  120 ),
+    ( "Bob",   "Dublin",   80 ),
+    ( "Carol", "Berlin",   40 ),
+    ( "Dave",  "Chicago", 300 ),
+]
+
+
+def _make_db(filename):
+    connection = DriverManager.getConnection("jdbc:sqlite:" + filename)
+    stmt = connection.createStatement()
+    stmt.executeUpdate("CREATE TABLE people (id INTEGER PRIMARY KEY AUTOINCREMENT, name VARCHAR, city VARCHAR, amount INTEGER)")
+    stmt.close()
+    stmt = connection.prepareStatement("INSERT INTO people (name, city, amount) VALUES (?, ?, ?)")
+    for name, city, amount in PEOPLE:
+        stmt.setObject(1, name)
+        stmt.setObject(2, city)
+        stmt.setObject(3, amount)
+        stmt.executeUpdate()
+    stmt.close()
+    connection.close()
+
+def _get(c, id=-1, pushdown_where="", pushdown_columns="", pushdown_limit=-1, limit=-1, offset=0, after_id=-1):
+    return c.entries(HttpMethod.GET, None, id, pushdown_where, pushdown_columns, pushdown_limit, limit, offset, after_id)
+
+def _send(c, method, input, id):
+    return c.entries(method, input, id, "", "", -1, -1, 0, -1)
+
+def _names(res):
+    return [ row['name'] for row in res.getEntity() ]
+
+def _link(res):
+    headers = res.getHeaders()
+    if headers  and  "Link" in headers:
+        return headers["Link"]
+    return None
+
+
+# ====================================
+# Testing the DatabaseAccess component
+# ====================================
+
+def runtest():
+
+    # Without the driver none of the tests can run. That shouldn't stop
+    # the other test files from running.
+    try:
+        Class.forName(DRIVER_CLASS)
+    except ClassNotFoundException, e:
+        print "---     Skipped: Can't load the SQLite JDBC driver '%s'. Put sqlite-jdbc into lib/ to run these tests." % DRIVER_CLASS
+        return get_test_result()
+
+    fd, filename = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    os.remove(filename)
+
+    saved = (settings.DB_POOL_MAX_SIZE, settings.DB_POOL_MAX_WAIT, settings.DB_POOL_IDLE_TIMEOUT, settings.DB_BATCH_SIZE)
+    try:
+        _make_db(filename)
+
+        rctp = dict(
+            jdbc_driver_class    = DRIVER_CLASS,
+            db_connection_string = "jdbc:sqlite:" + filename,
+            table_name           = "people",
+            columns              = "*",
+            id_column            = "id",
+            where1               = "",
+            where2               = "",
+            allow_updates        = True,
+            name_value_pairs     = True,
+        )
+        c    = make_component(rctp, DatabaseAccess)
+        pool = get_pool(DRIVER_CLASS, rctp['db_connection_string'])
+
+        #
+        # Test 1: Getting all entries
+        #
+        res = _get(c)
+        test_evaluator("Test 1", compare_list(_names(res), [ "Alice", "Bob", "Carol", "Dave" ]))
+
+        #
+        # Test 2: Getting a single entry
+        #
+        res = _get(c, 2)
+        should_be = { "id" : 2, "name" : "Bob", "city" : "Dublin", "amount" : 80 }
+        test_evaluator("Test 2", compare_elem(res.getEntity(), should_be))
+
+        #
+        # Test 3: Creating an entry
+        #
+        res = _send(c, HttpMethod.POST, { "name" : "Eve", "city" : "Dublin", "amount" : 10 }, -1)
+        test_evaluator("Test 3", compare_elem(res.getStatus(), 201))
+        test_evaluator("Test 3", compare_list(_names(_get(c)), [ "Alice", "Bob", "Carol", "Dave", "Eve" ]))
+
+        #
+        # Test 4: Updating an entry, values are bound and may contain anything
+        #
+        res = _send(c, HttpMethod.PUT, { "name" : "Eve (O'Neil); *" }, 5)
+        test_evaluator("Test 4", compare_elem(res.getStatus(), 200))
+        test_evaluator("Test 4", compare_elem(_get(c, 5).getEntity()['name'], u"Eve (O'Neil); *"))
+
+        #
+        # Test 5: Deleting an entry
+        #
+        res = _send(c, HttpMethod.DELETE, None, 5)
+        test_evaluator("Test 5", compare_elem(res.getStatus(), 200))
+        res = _send(c, HttpMethod.DELETE, None, 5)
+        test_evaluator("Test 5", compare_elem(res.getStatus(), 404))
+
+        #
+        # Test 6: Predicate, columns and limit are pushed down
+        #
+        res = _get(c, pushdown_where='[ "or", [ "=", "city", "Berlin" ], [ ">", "amount", 200 ] ]',
+                   pushdown_columns="name, amount", pushdown_limit=2)
+        should_be = [ { "name" : "Alice", "amount" : 120 }, { "name" : "Carol", "amount" : 40 } ]
+        test_evaluator("Test 6", compare_elem(list(res.getEntity()), should_be))
+
+        #
+        # Test 7: All requests so far used a single connection and re-used statements
+        #
+        stats = pool.getStats()
+        test_evaluator("Test 7", compare_elem(stats['created'], 1))
+        test_evaluator("Test 7", compare_elem(stats['in_use'], 0))
+        if stats['statements_reused'] < 3:
+            test_evaluator("Test 7", "Prepared statements were not re-used")
+        else:
+            test_evaluator("Test 7", None)
+
+        #
+        # Test 8: Waiting for a connection times out when the pool is exhausted
+        #
+        settings.DB_POOL_MAX_SIZE = 1
+        settings.DB_POOL_MAX_WAIT = 0.2
+        pc = pool.borrow()
+        try:
+            _get(c)
+            test_evaluator("Test 8", "Expected a timeout")
+        except RestxException, e:
+            test_evaluator("Test 8", compare_elem(pool.getStats()['timeouts'], 1))
+        pool.release(pc)
+        test_evaluator("Test 8", compare_elem(len(_names(_get(c))), 4))
+
+        #
+        # Test 9: Connections that are no longer valid are replaced
+        #
+        pc = pool.borrow()
+        pc.connection.close()
+        pool.release(pc)
+        test_evaluator("Test 9", compare_elem(len(_names(_get(c))), 4))
+        stats = pool.getStats()
+        test_evaluator("Test 9", compare_elem(stats['invalid'], 1))
+        test_evaluator("Test 9", compare_elem(stats['created'], 2))
+
+        #
+        # Test 10: Idle connections are closed
+        #
+        settings.DB_POOL_IDLE_TIMEOUT = -1
+        pc = pool.borrow()
+        pool.release(pc)
+        stats = pool.getStats()
+        test_evaluator("Test 10", compare_elem(stats['evicted'], 1))
+        test_evaluator("Test 10", compare_elem(stats['created'], 3))
+
+        #
+        # Test 11: The pool service
+        #
+        res = c.pool(HttpMethod.GET, None)
+        test_evaluator("Test 11", compare_elem(res.getEntity()['size'], 1))
+
+        #
+        # Test 12: Many entries are streamed, the connection is in use until they are read
+        #
+        settings.DB_POOL_IDLE_TIMEOUT = saved[2]
+        res = _get(c)
+        test_evaluator("Test 12", compare_elem(type(res.getEntity()) is list, False))
+        test_evaluator("Test 12", compare_elem(pool.getStats()['in_use'], 1))
+        test_evaluator("Test 12", compare_list(_names(res), [ "Alice", "Bob", "Carol", "Dave" ]))
+        test_evaluator("Test 12", compare_elem(pool.getStats()['in_use'], 0))
+
+        #
+        # Test 13: Paging through the entries
+        #
+        res = _get(c, pushdown_columns="name", limit=3)
+        test_evaluator("Test 13", compare_elem(isinstance(res.getEntity(), Table), True))
+        test_evaluator("Test 13", compare_list(_names(res), [ "Alice", "Bob", "Carol" ]))
+        test_evaluator("Test 13", compare_elem(_link(res), '</resource/None/entries?pushdown_columns=name&after_id=3&limit=3>; rel="next"'))
+        res = _get(c, pushdown_columns="name", limit=3, after_id=3)
+        test_evaluator("Test 13", compare_list(_names(res), [ "Dave" ]))
+        test_evaluator("Test 13", compare_elem(_link(res), None))
+
+        #
+        # Test 14: Skipping entries
+        #
+        res = _get(c, limit=2, offset=1)
+        test_evaluator("Test 14", compare_list(_names(res), [ "Bob", "Carol" ]))
+        test_evaluator("Test 14", compare_elem(_link(res), '</resource/None/entries?after_id=3&limit=2>; rel="next"'))
+        res = _get(c, offset=3)
+        test_evaluator("Test 14", compare_list(_names(res), [ "Dave" ]))
+        test_evaluator("Test 14", compare_elem(pool.getStats()['in_use'], 0))
+
+        #
+        # Test 15: Creating several entries at once, in more than one batch
+        #
+        settings.DB_BATCH_SIZE = 1
+        res = _send(c, HttpMethod.POST, [ { "name" : "Frank", "city" : "Paris" },
+                                          { "name" : "Grace", "amount" : 5 } ], -1)
+        test_evaluator("Test 15", compare_elem(res.getStatus(), 201))
+        test_evaluator("Test 15", compare_list(res.getEntity(), [ "/resource/None/6", "/resource/None/7" ]))
+        settings.DB_BATCH_SIZE = saved[3]
+        res = _send(c, HttpMethod.POST, [ { "name" : "Heidi" }, { "name" : "Ivan" } ], -1)
+        test_evaluator("Test 15", compare_elem(res.getStatus(), 201))
+        test_evaluator("Test 15", compare_elem(len(res.getEntity()), 2))
+        test_evaluator("Test 15", compare_list(_names(_get(c, offset=4)), [ "Frank", "Grace", "Heidi", "Ivan" ]))
+
+        #
+        # Test 16: Updating several entries at once
+        #
+        res = _send(c, HttpMethod.PUT, [ { "id" : 6, "amount" : 60 }, { "id" : 7, "amount" : 70 } ], -1)
+        test_evaluator("Test 16", compare_elem(res.getStatus(), 200))
+        test_evaluator("Test 16", compare_elem(_get(c, 6).getEntity()['amount'], 60))
+        test_evaluator("Test 16", compare_elem(_get(c, 7).getEntity()['amount'], 70))
+
+        #
+        # Test 17: Nothing is changed if one of the entries cannot be updated
+        #
+        res = _send(c, HttpMethod.PUT, [ { "id" : 6, "amount" : 1 }, { "id" : 100, "amount" : 1 } ], -1)
+        test_evaluator("Test 17", compare_elem(res.getStatus(), 404))
+        test_evaluator("Test 17", compare_elem(_get(c, 6).getEntity()['amount'], 60))
+        res = _send(c, HttpMethod.PUT, [ { "amount" : 1 } ], -1)
+        test_evaluator("Test 17", compare_elem(res.getStatus(), 400))
+        test_evaluator("Test 17", compare_elem(pool.getStats()['in_use'], 0))
+
+        #
+        # Test 18: Pushed down comparisons treat NULL like the Filter treats None
+        #
+        everyone = list(_get(c).getEntity())
+        for where, should_be in [ ([ "!=", "city",   "Berlin" ], [ "Bob", "Dave", "Frank", "Grace", "Heidi", "Ivan" ]),
+                                  ([ "<",  "amount", 70 ],       [ "Carol", "Frank", "Heidi", "Ivan" ]),
+                                  ([ "<=", "amount", 70 ],       [ "Carol", "Frank", "Grace", "Heidi", "Ivan" ]),
+                                  ([ ">",  "amount", 100 ],      [ "Alice", "Dave" ]) ]:
+            op_func = { "!=" : operator.ne, "<" : operator.lt, "<=" : operator.le, ">" : operator.gt }[where[0]]
+            res     = _get(c, pushdown_where=c.toJson(where))
+            test_evaluator("Test 18", compare_list(_names(res), should_be))
+            test_evaluator("Test 18", compare_list([ row['name'] for row in everyone if op_func(row[where[1]], where[2]) ], should_be))
+
+        #
+        # Test 19: The pushdown limit is a limit for all pages together
+        #
+        res = _get(c, pushdown_limit=3, limit=2)
+        test_evaluator("Test 19", compare_list(_names(res), [ "Alice", "Bob" ]))
+        test_evaluator("Test 19", compare_elem(_link(res), '</resource/None/entries?pushdown_limit=1&after_id=2&limit=2>; rel="next"'))
+        res = _get(c, pushdown_limit=1, limit=2, after_id=2)
+        test_evaluator("Test 19", compare_list(_names(res), [ "Carol" ]))
+        test_evaluator("Test 19", compare_elem(_link(res), None))
+        res = _get(c, pushdown_limit=2, limit=2)
+        test_evaluator("Test 19", compare_list(_names(res), [ "Alice", "Bob" ]))
+        test_evaluator("Test 19", compare_elem(_link(res), None))
+
+    finally:
+        settings.DB_POOL_MAX_SIZE, settings.DB_POOL_MAX_WAIT, settings.DB_POOL_IDLE_TIMEOUT, settings.DB_BATCH_SIZE = saved
+        get_pool(DRIVER_CLASS, "jdbc:sqlite:" + filename).close()
+        if os.path.exists(filename):
+            os.remove(filename)
+
+    return get_test_result()
+
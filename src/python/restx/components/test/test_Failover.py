@@ -25,10 +25,13 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 # These imports are necessary for all component tests
 from restx.testtools.utils       import *
 from restx.components.api        import *
+from restx.languages             import serviceMethodProxy
 
 # Importing the component we wish to test
 from restx.components.Failover   import Failover
 
+import time
+
 
 # ==============================
 # Testing the Failover component
@@ -67,6 +70,16 @@ def runtest():
         else:
             ret_str = "Hello!"
 
+        # Slow servers can be simulated with URLs like "..../delay/0.5"
+        DELAY_ELEM = "/delay/"
+        if DELAY_ELEM in url:
+            i = url.find(DELAY_ELEM) + len(DELAY_ELEM)
+            try:
+                delay = float(url[i:url.index("/", i+1)])
+            except:
+                delay = float(url[i:])
+            time.sleep(delay)
+
         return code, ret_str
 
     def new_httpPost(url, data=None, headers=None, timeout=None):
@@ -99,6 +112,7 @@ def runtest():
         account_name     = "",
         account_password = "",
         expected_status  = 200,
+        strategy         = "sequential",
     )
     c   = make_component(rctp, Failover)
     mockit(c)
@@ -174,6 +188,59 @@ def runtest():
     res = c.access(HttpMethod.PUT, None)
     test_evaluator("Test 8", compare_out_str(res, HTTP.METHOD_NOT_ALLOWED, "Only supporting GET or POST for this resource"))
 
+    #
+    # Test 9: Racing, the second URI answers first
+    #
+    rctp['site_1_uri'] = "http://localhost:8091/status/200/return/foo/delay/1.0"
+    rctp['site_2_uri'] = "http://localhost:8091/status/200/return/bar"
+    rctp['strategy']   = "race"
+    c   = make_component(rctp, Failover)
+    mockit(c)
+    res = c.access(HttpMethod.GET, None)
+    test_evaluator("Test 9", compare_out_str(res, 200, "bar"))
+
+    #
+    # Test 10: Racing, and none of the URIs gives the expected status
+    #
+    rctp['site_1_uri'] = "http://localhost:8091/status/201/return/foo"
+    rctp['site_2_uri'] = "http://localhost:8091/status/201/return/bar/delay/0.2"
+    c   = make_component(rctp, Failover)
+    mockit(c)
+    res = c.access(HttpMethod.GET, None)
+    test_evaluator("Test 10", compare_out_str(res, HTTP.REQUEST_TIMEOUT, "bar"))
+
+    #
+    # Test 11: Hedging, the first URI is too slow, so the second one is tried as well
+    #
+    rctp['site_1_uri'] = "http://localhost:8091/status/200/return/foo/delay/3.0"
+    rctp['site_2_uri'] = "http://localhost:8091/status/200/return/bar"
+    rctp['strategy']   = "hedge"
+    c   = make_component(rctp, Failover)
+    mockit(c)
+    res = c.access(HttpMethod.GET, None)
+    test_evaluator("Test 11", compare_out_str(res, 200, "bar"))
+
+    #
+    # Test 12: Hedging, the first URI answers in time
+    #
+    rctp['site_1_uri'] = "http://localhost:8091/status/200/return/foo"
+    c   = make_component(rctp, Failover)
+    mockit(c)
+    res = c.access(HttpMethod.GET, None)
+    test_evaluator("Test 12", compare_out_str(res, 200, "foo"))
+
+    #
+    # Test 13: A resource that was created before there was a strategy
+    #
+    params = dict(rctp)
+    del params['strategy']
+    c   = Failover()
+    c.setBaseCapabilities(BaseCapabilities(c))
+    mockit(c)
+    res = serviceMethodProxy(c, c.access, "access", None, None, params, HttpMethod.GET)
+    test_evaluator("Test 13", compare_out_str(res, 200, "foo"))
+    test_evaluator("Test 13", compare_elem(c.strategy, "sequential"))
+
     return get_test_result()
 
 
@@ -45,8 +45,18 @@ def runtest():
 
     class MyBaseCapabilities(BaseCapabilities):
         def accessResource(self, resource_uri, input=None, params=None, method=HTTP.GET):
+            ACCESS_PARAMS.append(params)
+            if params  and  resource_uri in PUSHDOWN_DICT:
+                return PUSHDOWN_DICT[resource_uri]
             return RESOURCE_DICT[resource_uri]
 
+        def getServiceDefinition(self, resource_uri):
+            return SERVICE_DICT.get(resource_uri)
+
+    ACCESS_PARAMS = []
+    PUSHDOWN_DICT = {}
+    SERVICE_DICT  = {}
+
 
     #
     # -------------------------------------------------------------------
@@ -198,5 +208,197 @@ def runtest():
     ]
     test_evaluator("Test 19", compare_out_lists(res, 200, should_be))
 
+    #
+    # Test 20: AND and OR within a filter expression
+    #
+    rctp['filter_expression_1']  = "b = 3 AND c = 4 OR b = 1"
+    rctp['filter_expression_2']  = ""
+    rctp['match_all']            = True
+    c = make_component(rctp, Filter, MyBaseCapabilities)
+
+    res = c.filter(None, None, False)
+    should_be = [
+        { "a" : 1, "b" : 1, "c" : 1 },
+        { "a" : 1, "b" : 3, "c" : 4 },
+    ]
+    test_evaluator("Test 20", compare_out_lists(res, 200, should_be))
+
+    #
+    # Test 21: Parentheses and NOT
+    #
+    rctp['filter_expression_1']  = "NOT ( b = 2 OR c = 4 )"
+    c = make_component(rctp, Filter, MyBaseCapabilities)
+
+    res = c.filter(None, None, False)
+    should_be = [
+        { "a" : 1, "b" : 1, "c" : 1 },
+        { "a" : 1, "b" : 3, "c" : 1 },
+    ]
+    test_evaluator("Test 21", compare_out_lists(res, 200, should_be))
+
+    #
+    # Test 22: Complex expression combined with a second filter expression
+    #
+    rctp['filter_expression_1']  = "(b = 2 OR b = 3)"
+    rctp['filter_expression_2']  = "NOT c = 1"
+    c = make_component(rctp, Filter, MyBaseCapabilities)
+
+    res = c.filter(None, None, False)
+    should_be = [
+        { "a" : 1, "b" : 3, "c" : 4 },
+    ]
+    test_evaluator("Test 22", compare_out_lists(res, 200, should_be))
+
+    #
+    # Test 23: Keywords and parentheses in quotes are part of the expression
+    #
+    rctp['filter_expression_1']  = 'foo = "x AND (y)" OR foo = "NOT"'
+    rctp['filter_expression_2']  = ""
+    c = make_component(rctp, Filter, MyBaseCapabilities)
+
+    data = [
+        { "foo" : "x AND (y)" },
+        { "foo" : "x" },
+        { "foo" : "NOT" },
+    ]
+    RESOURCE_DICT = { c.input_resource_uri : (200, data) }
+
+    res = c.filter(None, None, False)
+    should_be = [
+        { "foo" : "x AND (y)" },
+        { "foo" : "NOT" },
+    ]
+    test_evaluator("Test 23", compare_out_lists(res, 200, should_be))
+
+    #
+    # Test 24: Malformed expression
+    #
+    rctp['filter_expression_1']  = "( foo = x"
+    c = make_component(rctp, Filter, MyBaseCapabilities)
+    try:
+        c.filter(None, None, False)
+        test_evaluator("Test 24", "Expected an exception for a malformed expression")
+    except RestxException, e:
+        test_evaluator("Test 24", None)
+
+    #
+    # Test 25: Comparisons are handed to an input service that supports pushdown
+    #
+    rctp['input_resource_uri']   = "/resource/db/entries"
+    rctp['filter_expression_1']  = "city = Berlin AND NOT amount > 100"
+    rctp['filter_expression_2']  = "x/y = 1"
+    rctp['filter_expression_3']  = ""
+    c = make_component(rctp, Filter, MyBaseCapabilities)
+
+    data = [
+        { "city" : "Berlin", "amount" : 50,  "x" : { "y" : 1 } },
+        { "city" : "Berlin", "amount" : 500, "x" : { "y" : 1 } },
+        { "city" : "Berlin", "amount" : 20,  "x" : { "y" : 2 } },
+        { "city" : "Dublin", "amount" : 10,  "x" : { "y" : 1 } },
+    ]
+    SERVICE_DICT  = { c.input_resource_uri : { "pushdown" : [ "where", "columns", "limit" ] } }
+    PUSHDOWN_DICT = { c.input_resource_uri : (200, data[:3]) }
+    RESOURCE_DICT = { c.input_resource_uri : (200, data) }
+    ACCESS_PARAMS = []
+
+    res = c.filter(None, None, False)
+    should_be = [
+        { "city" : "Berlin", "amount" : 50,  "x" : { "y" : 1 } },
+    ]
+    test_evaluator("Test 25", compare_out_lists(res, 200, should_be))
+    test_evaluator("Test 25", compare_list(c.fromJson(ACCESS_PARAMS[0]['pushdown_where']), [ "=", "city", "Berlin" ]))
+
+    #
+    # Test 26: Nothing is handed to the input service for a negated filter
+    #
+    ACCESS_PARAMS = []
+    res = c.filter(None, None, True)
+    should_be = [
+        { "city" : "Berlin", "amount" : 500, "x" : { "y" : 1 } },
+        { "city" : "Berlin", "amount" : 20,  "x" : { "y" : 2 } },
+        { "city" : "Dublin", "amount" : 10,  "x" : { "y" : 1 } },
+    ]
+    test_evaluator("Test 26", compare_out_lists(res, 200, should_be))
+    test_evaluator("Test 26", compare_list(ACCESS_PARAMS, [ None ]))
+
+    #
+    # Test 27: Input service refuses the pushdown
+    #
+    rctp['filter_expression_1']  = "city = Berlin OR amount < 15"
+    rctp['filter_expression_2']  = ""
+    c = make_component(rctp, Filter, MyBaseCapabilities)
+
+    PUSHDOWN_DICT = { c.input_resource_uri : (400, "Unknown column 'amount' in pushdown predicate") }
+    ACCESS_PARAMS = []
+
+    res = c.filter(None, None, False)
+    should_be = data
+    test_evaluator("Test 27", compare_out_lists(res, 200, should_be))
+    test_evaluator("Test 27", compare_list(c.fromJson(ACCESS_PARAMS[0]['pushdown_where']),
+                                           [ "or", [ "=", "city", "Berlin" ], [ "<", "amount", 15 ] ]))
+
+    #
+    # Test 28: A table is filtered by its columns and results in a table
+    #
+    rctp['input_resource_uri']   = "/resource/A"
+    rctp['filter_expression_1']  = "amount > 15"
+    c = make_component(rctp, Filter, MyBaseCapabilities)
+    RESOURCE_DICT = { c.input_resource_uri : (200, Table.fromRecords(data)) }
+
+    res = c.filter(None, None, False)
+    test_evaluator("Test 28", compare_elem(isinstance(res.getEntity(), Table), True))
+    test_evaluator("Test 28", compare_elem(list(res.getEntity()), data[:3]))
+
+    #
+    # Flat dictionaries, in which some elements are missing
+    #
+    cities = [ "Auckland", "Berlin", "Chicago", "Dublin", "Edinburgh" ]
+    data   = list()
+    for i in range(50):
+        row = { "id" : i, "city" : cities[i % 5], "amount" : (i * 37) % 100, "score" : i * 0.02 }
+        if i % 10 == 0:
+            del row["score"]
+        data.append(row)
+    rctp['input_resource_uri']   = "/resource/rows"
+    rctp['filter_expression_2']  = ""
+    rctp['filter_expression_3']  = ""
+    RESOURCE_DICT = { rctp['input_resource_uri'] : (200, data) }
+
+    #
+    # Test 29: Element missing in some rows
+    #
+    rctp['filter_expression_1']  = "score < 0.5"
+    c = make_component(rctp, Filter, MyBaseCapabilities)
+
+    res = c.filter(None, None, False)
+    should_be = [ r for r in data if "score" in r  and  r["score"] < 0.5 ]
+    test_evaluator("Test 29", compare_out_lists(res, 200, should_be))
+
+    #
+    # Test 30: Several expressions, all have to match
+    #
+    rctp['filter_expression_1']  = "city = Berlin"
+    rctp['filter_expression_2']  = "amount <= 40"
+    rctp['filter_expression_3']  = "score >= 0.2"
+    rctp['match_all']            = True
+    c = make_component(rctp, Filter, MyBaseCapabilities)
+
+    res = c.filter(None, None, False)
+    should_be = [ r for r in data if r["city"] == "Berlin"  and  r["amount"] <= 40  and  r.get("score", -1) >= 0.2 ]
+    test_evaluator("Test 30", compare_out_lists(res, 200, should_be))
+
+    #
+    # Test 31: Several expressions, one has to match
+    #
+    rctp['filter_expression_1']  = "city = Dublin"
+    rctp['filter_expression_2']  = "amount < 10"
+    rctp['filter_expression_3']  = ""
+    rctp['match_all']            = False
+    c = make_component(rctp, Filter, MyBaseCapabilities)
+
+    res = c.filter(None, None, False)
+    should_be = [ r for r in data if r["city"] == "Dublin"  or  r["amount"] < 10 ]
+    test_evaluator("Test 31", compare_out_lists(res, 200, should_be))
+
     return get_test_result()
 
@@ -30,6 +30,20 @@ from restx.components.api        import *
 from restx.components.Join       import Join
 
 
+def _join(c, join_type="inner", sorted_inputs=False):
+    # The joined records are streamed, we collect them for comparison
+    res = c.join(None, None, join_type, sorted_inputs)
+    res.setEntity(list(res.getEntity()))
+    return res
+
+def _sorted(res):
+    rows = [ r.items() for r in res.getEntity() ]
+    for r in rows:
+        r.sort()
+    rows.sort()
+    return rows
+
+
 # ==========================
 # Testing the Join component
 # ==========================
@@ -80,9 +94,9 @@ def runtest():
     ]
     RESOURCE_DICT = { c.resource_A_uri : (200, data_A), c.resource_B_uri : (200, data_B) }
 
-    res = c.join(None, None)
-    should_be = [ {'A.foo': 'A foo C', 'B.bar': 'bar C', 'B.foo': 'B foo c', 'BlahBlah': 'c@b.c'},
-                  {'A.foo': 'A foo B', 'B.bar': 'bar B', 'B.foo': 'B foo b', 'BlahBlah': 'b@b.c'} ]
+    res = _join(c)
+    should_be = [ {'A.foo': 'A foo B', 'B.bar': 'bar B', 'B.foo': 'B foo b', 'BlahBlah': 'b@b.c'},
+                  {'A.foo': 'A foo C', 'B.bar': 'bar C', 'B.foo': 'B foo c', 'BlahBlah': 'c@b.c'} ]
 
     test_evaluator("Test 1", compare_out_lists(res, 200, should_be))
 
@@ -91,9 +105,9 @@ def runtest():
     #
     rctp['always_use_prefix'] = False
     c = make_component(rctp, Join, MyBaseCapabilities)
-    res = c.join(None, None)
-    should_be = [ {'A.foo': 'A foo C', 'B.foo': 'B foo c', 'BlahBlah': 'c@b.c', 'bar': 'bar C'},
-                  {'A.foo': 'A foo B', 'B.foo': 'B foo b', 'BlahBlah': 'b@b.c', 'bar': 'bar B'} ]
+    res = _join(c)
+    should_be = [ {'A.foo': 'A foo B', 'B.foo': 'B foo b', 'BlahBlah': 'b@b.c', 'bar': 'bar B'},
+                  {'A.foo': 'A foo C', 'B.foo': 'B foo c', 'BlahBlah': 'c@b.c', 'bar': 'bar C'} ]
 
     test_evaluator("Test 2", compare_out_lists(res, 200, should_be))
 
@@ -102,9 +116,9 @@ def runtest():
     #
     rctp['new_keyfield_name'] = None
     c = make_component(rctp, Join, MyBaseCapabilities)
-    res = c.join(None, None)
-    should_be = [ {'A.foo': 'A foo C', 'B.foo': 'B foo c', 'email': 'c@b.c', 'bar': 'bar C'},
-                  {'A.foo': 'A foo B', 'B.foo': 'B foo b', 'email': 'b@b.c', 'bar': 'bar B'} ]
+    res = _join(c)
+    should_be = [ {'A.foo': 'A foo B', 'B.foo': 'B foo b', 'email': 'b@b.c', 'bar': 'bar B'},
+                  {'A.foo': 'A foo C', 'B.foo': 'B foo c', 'email': 'c@b.c', 'bar': 'bar C'} ]
 
     test_evaluator("Test 3", compare_out_lists(res, 200, should_be))
 
@@ -113,7 +127,7 @@ def runtest():
     #
     data_B[1]['Email'] = "bb@b.c"
     data_B[2]['Email'] = "cc@c.c"
-    res = c.join(None, None)
+    res = _join(c)
     should_be = []
     test_evaluator("Test 4", compare_out_lists(res, 200, should_be))
 
@@ -121,7 +135,7 @@ def runtest():
     # Testing with one input empty
     #
     data_B = dict()
-    res = c.join(None, None)
+    res = _join(c)
     should_be = []
     test_evaluator("Test 5", compare_out_lists(res, 200, should_be))
 
@@ -130,9 +144,78 @@ def runtest():
     #
     data_A = dict()
     data_B = dict()
-    res = c.join(None, None)
+    res = _join(c)
     should_be = []
     test_evaluator("Test 6", compare_out_lists(res, 200, should_be))
 
+    #
+    # Testing with several records for the same key
+    #
+    rctp['always_use_prefix'] = True
+    c = make_component(rctp, Join, MyBaseCapabilities)
+    data_A = [
+        { "email" : "a@b.c", "foo" : "A foo 1" },
+        { "email" : "b@b.c", "foo" : "A foo 2" },
+        { "email" : "a@b.c", "foo" : "A foo 3" },
+    ]
+    data_B = [
+        { "Email" : "a@b.c", "foo" : "B foo 1" },
+        { "Email" : "c@b.c", "foo" : "B foo 2" },
+        { "Email" : "a@b.c", "foo" : "B foo 3" },
+        { "Email" : "d@b.c", "foo" : "B foo 4" },
+    ]
+    RESOURCE_DICT = { c.resource_A_uri : (200, data_A), c.resource_B_uri : (200, data_B) }
+    res = _join(c)
+    should_be = [ {'A.email': 'a@b.c', 'A.foo': 'A foo 1', 'B.foo': 'B foo 1'},
+                  {'A.email': 'a@b.c', 'A.foo': 'A foo 3', 'B.foo': 'B foo 1'},
+                  {'A.email': 'a@b.c', 'A.foo': 'A foo 1', 'B.foo': 'B foo 3'},
+                  {'A.email': 'a@b.c', 'A.foo': 'A foo 3', 'B.foo': 'B foo 3'} ]
+    test_evaluator("Test 7", compare_out_lists(res, 200, should_be))
+
+    #
+    # Testing the outer joins
+    #
+    res = _join(c, "left")
+    should_be = should_be + [ {'A.email': 'b@b.c', 'A.foo': 'A foo 2', 'B.foo': None} ]
+    test_evaluator("Test 8", compare_elem(_sorted(res), _sorted(Result.ok(should_be))))
+    res = _join(c, "right")
+    should_be_right = should_be[:4] + [ {'A.email': 'c@b.c', 'A.foo': None, 'B.foo': 'B foo 2'},
+                                        {'A.email': 'd@b.c', 'A.foo': None, 'B.foo': 'B foo 4'} ]
+    test_evaluator("Test 8", compare_elem(_sorted(res), _sorted(Result.ok(should_be_right))))
+    res = _join(c, "outer")
+    should_be_outer = should_be_right + should_be[4:]
+    test_evaluator("Test 8", compare_elem(_sorted(res), _sorted(Result.ok(should_be_outer))))
+
+    #
+    # Testing the merge of sorted inputs
+    #
+    data_A.sort(lambda x, y: cmp(x['email'], y['email']))
+    data_B.sort(lambda x, y: cmp(x['Email'], y['Email']))
+    res = _join(c, "outer", True)
+    test_evaluator("Test 9", compare_elem(_sorted(res), _sorted(Result.ok(should_be_outer))))
+    test_evaluator("Test 9", compare_list([ r['A.email'] for r in res.getEntity() ],
+                                          [ "a@b.c", "a@b.c", "a@b.c", "a@b.c", "b@b.c", "c@b.c", "d@b.c" ]))
+    # The records are produced after the component was handed back, which
+    # removes the resource parameters from the instance.
+    res = c.join(None, None, "outer", True)
+    c.__dict__.clear()
+    test_evaluator("Test 9", compare_elem(_sorted(Result.ok(list(res.getEntity()))), _sorted(Result.ok(should_be_outer))))
+    c = make_component(rctp, Join, MyBaseCapabilities)
+    data_B.reverse()
+    try:
+        _join(c, "inner", True)
+        test_evaluator("Test 9", "Expected an exception for unsorted input")
+    except RestxException, e:
+        test_evaluator("Test 9", None)
+    data_B.reverse()
+
+    #
+    # Testing the compact output
+    #
+    res = c.join(None, None, "left", False, True)
+    rows = list(res.getEntity())
+    test_evaluator("Test 10", compare_list(rows[0], [ 'A.email', 'A.foo', 'B.foo' ]))
+    test_evaluator("Test 10", compare_elem(sorted(rows[1:]), sorted([ tuple([ r[k] for k in rows[0] ]) for r in should_be ])))
+
     return get_test_result()
 
@@ -0,0 +1,287 @@
+"""
+RESTx: Sane, simple and effective data publishing and integration.
+
+Copyright (C) 2010   MuleSoft Inc.    http://www.mulesoft.com
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+#
+# To run this and other RESTx test files, use bin/testrun.
+#
+# The log files used here are only a few KB in size. Block size and
+# index step are made small, so that lines cross block boundaries and
+# the index has several entries and is stored.
+#
+
+import os
+import sys
+import gzip
+import shutil
+import tempfile
+
+from datetime import datetime, timedelta
+
+# These imports are necessary for all component tests
+from restx.testtools.utils             import *
+from restx.components.api              import *
+
+from restx.storageabstraction.file_storage import FileStorage
+
+# Importing the component we wish to test
+import restx.components.logscan as logscan
+from restx.components.LogFileComponent import LogFileComponent
+
+logfile = sys.modules[LogFileComponent.__module__]
+
+
+_FIRST   = datetime(2010, 1, 1)
+_METHODS = [ "GET", "POST", "HEAD" ]
+_PATHS   = [ "/", "/index.html", "/download/restx-0.9.2.zip", "/docs/api" ]
+_AGENTS  = [ "Mozilla/5.0 (X11; Linux x86_64) Firefox/3.6", "Googlebot/2.1 (+http://www.google.com/bot.html)" ]
+
+
+class _TempStorage(FileStorage):
+    def _get_storage_location(self):
+        return self.storage_location
+
+def _stamp(i):
+    """
+    Time stamp of the i-th line, one line per minute.
+
+    """
+    return (_FIRST + timedelta(minutes=i)).strftime("%d/%b/%Y:%H:%M:%S")
+
+def _line(i):
+    return '10.0.0.%d - - [%s +0000] "%s %s HTTP/1.1" 200 %d "-" "%s"' % \
+                (i % 7, _stamp(i), _METHODS[i % 3], _PATHS[i % 4], 100 + i, _AGENTS[i % 2])
+
+def _write_log(filename, numbers, trailer=""):
+    if filename.endswith(".gz"):
+        f = gzip.open(filename, "wb")
+    else:
+        f = open(filename, "wb")
+    try:
+        f.write("".join([ _line(i) + "\n" for i in numbers ]) + trailer)
+    finally:
+        f.close()
+
+def _append_log(filename, data):
+    f = open(filename, "ab")
+    try:
+        f.write(data)
+    finally:
+        f.close()
+
+def _expected(numbers, first, last, filter, unique_only):
+    """
+    The lines a search should find, worked out one line at a time.
+
+    """
+    inc_filters = [ t for t in filter.split(";") if t and not t.startswith("-") ]
+    exl_filters = [ t[1:] for t in filter.split(";") if t.startswith("-") ]
+    hitlist = set()
+    out     = []
+    for i in numbers:
+        if i < first  or  i > last:
+            continue
+        line = _line(i)
+        if [ t for t in inc_filters if t not in line ]  or  [ t for t in exl_filters if t in line ]:
+            continue
+        if unique_only:
+            ipaddr = line.split(" ", 1)[0]
+            if ipaddr in hitlist:
+                continue
+            hitlist.add(ipaddr)
+        out.append(unicode(line))
+    return out
+
+def _search(c, filter, first, last, count_only=False, unique_only=False):
+    res = c.subset(HttpMethod.GET, None, filter, _stamp(first), _stamp(last), count_only, unique_only)
+    if count_only:
+        return res.getEntity()
+    return list(res.getEntity())
+
+def _check(c, numbers, filter, first, last, unique_only=False):
+    """
+    Compare the lines and the count found by the component with the expected ones.
+
+    """
+    should = _expected(numbers, first, last, filter, unique_only)
+    if not should:
+        return "Test doesn't find any lines"
+    m = compare_elem(_search(c, filter, first, last, False, unique_only), should)
+    if m:
+        return m
+    return compare_elem(_search(c, filter, first, last, True, unique_only), len(should))
+
+def _stored_index(storage):
+    names = [ n for n in storage.listFiles() if n.startswith("logindex_") ]
+    if len(names) != 1:
+        return None
+    return logfile._LogIndex.parse(storage.loadFile(names[0]))
+
+def _check_index(index, buf):
+    """
+    Check that the index entries point at the start of lines with the indexed dates.
+
+    """
+    for linedate, offset in zip(index.dates, index.offsets):
+        if offset  and  buf[offset - 1] != "\n":
+            return "Index entry at %d is not at the start of a line" % offset
+        m = compare_elem(logscan.linedatestr(buf[offset:buf.find("\n", offset)]), linedate)
+        if m:
+            return m
+    return None
+
+
+# ============================
+# Testing the LogFileComponent
+# ============================
+
+def runtest():
+
+    #
+    # -------------------------------------------------------------------
+    # Mocking setup: Provide overrides for some of the component methods
+    # -------------------------------------------------------------------
+    #
+
+    class MyBaseCapabilities(BaseCapabilities):
+        def getFileStorage(self, namespace=""):
+            return STORAGE
+
+    tmpdir  = tempfile.mkdtemp()
+    STORAGE = _TempStorage(os.path.join(tmpdir, "storage"))
+    os.mkdir(STORAGE.storage_location)
+    saved   = (logscan.BLOCK_SIZE, logfile.INDEX_STEP, logfile.INDEX_STORE_ENTRIES)
+    try:
+        logscan.BLOCK_SIZE          = 256
+        logfile.INDEX_STEP          = 512
+        logfile.INDEX_STORE_ENTRIES = 8
+
+        #
+        # -------------------------------------------------------------------
+        # The actual tests
+        # -------------------------------------------------------------------
+        #
+
+        #
+        # Searching a single log file, with lines crossing block boundaries
+        #
+        name    = os.path.join(tmpdir, "access.log")
+        numbers = range(60)
+        _write_log(name, numbers)
+        c = make_component(dict(filename=name, mustContain="", mustNotContain=""), LogFileComponent, MyBaseCapabilities)
+
+        test_evaluator("Test 1", _check(c, numbers, "", 0, 59))
+        test_evaluator("Test 2", _check(c, numbers, "download;-HEAD", 10, 40))
+        test_evaluator("Test 3", _check(c, numbers, "", 5, 50, True))
+        test_evaluator("Test 4", _check(c, numbers, "-bot", 50, 100))
+
+        # Blocks that are smaller than a line
+        logscan.BLOCK_SIZE = 40
+        test_evaluator("Test 5", _check(c, numbers, "GET", 20, 45))
+        logscan.BLOCK_SIZE = 256
+
+        # Filters given when the resource was created
+        c2 = make_component(dict(filename=name, mustContain="Firefox", mustNotContain="POST"), LogFileComponent, MyBaseCapabilities)
+        test_evaluator("Test 6", compare_elem(_search(c2, "", 0, 59), _expected(numbers, 0, 59, "Firefox;-POST", False)))
+
+        #
+        # The index
+        #
+        index = logfile._INDICES[os.path.abspath(name)]
+        test_evaluator("Test 7", compare_elem(len(index.offsets) > 5, True))
+        f = open(name, "rb")
+        try:
+            buf = f.read()
+        finally:
+            f.close()
+        test_evaluator("Test 7", _check_index(index, buf))
+        start = index.start_offset(logscan.makedatestr(_stamp(40)))
+        test_evaluator("Test 7", compare_elem(0 < start <= buf.find(_line(40)), True))
+
+        # The index is kept in the storage and loaded from there
+        stored = _stored_index(STORAGE)
+        test_evaluator("Test 8", compare_elem(stored.offsets, index.offsets))
+        del logfile._INDICES[os.path.abspath(name)]
+        test_evaluator("Test 8", _check(c, numbers, "", 30, 59))
+        test_evaluator("Test 8", compare_elem(logfile._INDICES[os.path.abspath(name)].offsets, index.offsets))
+
+        #
+        # A last line that is still being written is left out until it is complete
+        #
+        partial = _line(60)
+        _append_log(name, partial[:30])
+        test_evaluator("Test 9", _check(c, numbers, "", 40, 70))
+        _append_log(name, partial[30:] + "\n")
+        numbers = range(61)
+        test_evaluator("Test 9", _check(c, numbers, "", 40, 70))
+
+        # Lines appended to the file extend the index. It is only stored
+        # again once it has grown by INDEX_STORE_ENTRIES entries.
+        _append_log(name, "".join([ _line(i) + "\n" for i in range(61, 80) ]))
+        numbers = range(80)
+        test_evaluator("Test 10", _check(c, numbers, "", 70, 79))
+        index = logfile._INDICES[os.path.abspath(name)]
+        test_evaluator("Test 10", compare_elem(len(index.offsets) > len(stored.offsets), True))
+        test_evaluator("Test 10", compare_elem(len(_stored_index(STORAGE).offsets), len(stored.offsets)))
+        _append_log(name, "".join([ _line(i) + "\n" for i in range(80, 150) ]))
+        numbers = range(150)
+        test_evaluator("Test 10", _check(c, numbers, "", 70, 149))
+        index = logfile._INDICES[os.path.abspath(name)]
+        test_evaluator("Test 10", compare_elem(_stored_index(STORAGE).offsets, index.offsets))
+
+        # A replaced file gets a new index
+        _write_log(name + ".new", range(500, 530))
+        os.remove(name)
+        os.rename(name + ".new", name)
+        test_evaluator("Test 11", _check(c, range(500, 530), "", 0, 600))
+
+        #
+        # Compressed log files
+        #
+        name = os.path.join(tmpdir, "access.log.gz")
+        _write_log(name, range(60), _line(60)[:30])
+        c = make_component(dict(filename=name, mustContain="", mustNotContain=""), LogFileComponent, MyBaseCapabilities)
+        test_evaluator("Test 12", _check(c, range(60), "", 0, 100))
+        test_evaluator("Test 12", _check(c, range(60), "-POST", 25, 35, True))
+
+        #
+        # Sets of rotated log files
+        #
+        os.mkdir(os.path.join(tmpdir, "set"))
+        name = os.path.join(tmpdir, "set", "access.log")
+        _write_log(name,           range(200, 260))
+        _write_log(name + ".1",    range(100, 160))
+        _write_log(name + ".2.gz", range(0, 60))
+        numbers = range(0, 60) + range(100, 160) + range(200, 260)
+        c = make_component(dict(filename=name + "*", mustContain="", mustNotContain=""), LogFileComponent, MyBaseCapabilities)
+        test_evaluator("Test 13", _check(c, numbers, "", 0, 300))
+        test_evaluator("Test 14", _check(c, numbers, "download", 50, 210))
+        test_evaluator("Test 15", _check(c, numbers, "-HEAD", 0, 300, True))
+        test_evaluator("Test 16", _check(c, numbers, "", 120, 140))
+
+        # The rotated files are only picked up with the wildcard
+        c = make_component(dict(filename=name, mustContain="", mustNotContain=""), LogFileComponent, MyBaseCapabilities)
+        test_evaluator("Test 17", _check(c, range(200, 260), "", 0, 300))
+        test_evaluator("Test 17", compare_elem(_search(c, "", 0, 199), []))
+
+    finally:
+        logscan.BLOCK_SIZE, logfile.INDEX_STEP, logfile.INDEX_STORE_ENTRIES = saved
+        shutil.rmtree(tmpdir)
+
+    return get_test_result()
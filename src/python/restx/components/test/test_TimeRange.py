@@ -0,0 +1,266 @@
+"""
+RESTx: Sane, simple and effective data publishing and integration.
+
+Copyright (C) 2010   MuleSoft Inc.    http://www.mulesoft.com
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+#
+# To run this and other RESTx test files, use bin/testrun.
+#
+
+import os
+import sys
+import shutil
+import tempfile
+
+from datetime import datetime, timedelta
+
+# These imports are necessary for all component tests
+from restx.testtools.utils       import *
+from restx.components.api        import *
+
+from restx.storageabstraction.file_storage import FileStorage
+
+# Importing the component we wish to test
+from restx.components.TimeRange  import TimeRange
+
+timerange = sys.modules[TimeRange.__module__]
+
+
+# The component's idea of the current time
+NOW = datetime(2010, 3, 10, 15, 20, 0)
+
+class _FixedDatetime(datetime):
+    @classmethod
+    def now(cls):
+        return NOW
+
+class _TempStorage(FileStorage):
+    def _get_storage_location(self):
+        return self.storage_location
+
+def _make_log():
+    """
+    A log of the last 100 days, with a line every 20 minutes.
+
+    There are 97 IP addresses, so that each day has only some of them.
+    Every third line contains a non-ASCII character.
+
+    """
+    lines = list()
+    t     = NOW - timedelta(100)
+    i     = 0
+    while t <= NOW:
+        if i % 3:
+            path = u"/index.html"
+        else:
+            path = u"/caf\xe9"
+        lines.append((t, u'10.0.0.%d - - [%s +0000] "GET %s HTTP/1.1" 200 100' % (i % 97, t.strftime("%d/%b/%Y:%H:%M:%S"), path)))
+        t += timedelta(minutes=20)
+        i += 1
+    return lines
+
+def _parse_time(s):
+    return datetime.strptime(s, "%d/%b/%Y:%H:%M:%S")
+
+def _query(log, start, end, count_only, filter, unique_only):
+    """
+    What the base resource returns for a time range.
+
+    """
+    hitlist = set()
+    out     = list()
+    for t, line in log:
+        if t < start  or  t > end  or  filter not in line:
+            continue
+        if unique_only:
+            ipaddr = line.split(" ", 1)[0]
+            if ipaddr in hitlist:
+                continue
+            hitlist.add(ipaddr)
+        out.append(line)
+    if count_only:
+        return len(out)
+    return out
+
+def _day_files(storage):
+    return sorted([ name for name in storage.listFiles() if name.startswith("day_") ])
+
+def _check_split(requests, start, end):
+    """
+    Check that the requests cover the window in calendar days, without gaps.
+
+    """
+    b_start = start
+    for i, r in enumerate(requests):
+        day_end = b_start.replace(hour=23, minute=59, second=59)
+        should  = (b_start.strftime("%d/%b/%Y:%H:%M:%S"), min(end, day_end).strftime("%d/%b/%Y:%H:%M:%S"))
+        m = compare_elem((r['start_time'], r['end_time']), should)
+        if m:
+            return "Request %d: %s" % (i, m)
+        b_start = day_end + timedelta(seconds=1)
+    if b_start <= end:
+        return "Requests end before the window does"
+    return None
+
+
+# ===============================
+# Testing the TimeRange component
+# ===============================
+
+def runtest():
+
+    #
+    # -------------------------------------------------------------------
+    # Mocking setup: Provide overrides for some of the component methods
+    # -------------------------------------------------------------------
+    #
+
+    class MyBaseCapabilities(BaseCapabilities):
+        def accessResources(self, resource_requests, timeout=None):
+            REQUESTS.append([ r['params'] for r in resource_requests ])
+            out = list()
+            for r in resource_requests:
+                p = r['params']
+                out.append((HTTP.OK, _query(LOG, _parse_time(p['start_time']), _parse_time(p['end_time']),
+                                            p['count_only'], p['filter'], p['unique_only'])))
+            return out
+
+        def getResourceFingerprint(self, resource_uri):
+            return FINGERPRINT
+
+        def getFileStorage(self, namespace=""):
+            return STORAGE
+
+    LOG         = _make_log()
+    REQUESTS    = list()
+    FINGERPRINT = "abc"
+
+    tmpdir  = tempfile.mkdtemp()
+    STORAGE = _TempStorage(tmpdir)
+    saved   = timerange.datetime
+    try:
+        timerange.datetime = _FixedDatetime
+
+        #
+        # -------------------------------------------------------------------
+        # The actual tests
+        # -------------------------------------------------------------------
+        #
+
+        rctp = dict(
+            base_resource    = "/resource/log/subset",
+            start_time_name  = "start_time",
+            end_time_name    = "end_time",
+            count_flag_name  = "count_only",
+            filter_name      = "filter",
+            unique_only_name = "unique_only",
+        )
+        c     = make_component(rctp, TimeRange, MyBaseCapabilities)
+        start = NOW - timedelta(7)
+
+        #
+        # Test 1: The window is split into days, which are requested in parallel
+        #
+        res = c.last7days(None, None, True, "", False)
+        test_evaluator("Test 1", compare_elem(res.getEntity(), _query(LOG, start, NOW, True, "", False)))
+        test_evaluator("Test 1", compare_elem(len(REQUESTS), 1))
+        test_evaluator("Test 1", compare_elem(len(REQUESTS[0]), 8))
+        test_evaluator("Test 1", _check_split(REQUESTS[0], start, NOW))
+        test_evaluator("Test 1", compare_elem([ p['count_only'] for p in REQUESTS[0] ], [ True ] * 8))
+
+        #
+        # Test 2: The complete days before today are stored
+        #
+        test_evaluator("Test 2", compare_elem(len(_day_files(STORAGE)), 6))
+
+        #
+        # Test 3: Stored days are not requested again
+        #
+        REQUESTS = list()
+        res = c.last7days(None, None, True, "", False)
+        test_evaluator("Test 3", compare_elem(res.getEntity(), _query(LOG, start, NOW, True, "", False)))
+        test_evaluator("Test 3", compare_elem([ (p['start_time'], p['end_time']) for p in REQUESTS[0] ],
+                                              [ (start.strftime("%d/%b/%Y:%H:%M:%S"), "03/Mar/2010:23:59:59"),
+                                                ("10/Mar/2010:00:00:00", NOW.strftime("%d/%b/%Y:%H:%M:%S")) ]))
+
+        REQUESTS = list()
+        res = c.yesterday(None, None, True, "", False)
+        test_evaluator("Test 3", compare_elem(res.getEntity(), _query(LOG, datetime(2010, 3, 9), datetime(2010, 3, 9, 23, 59, 59), True, "", False)))
+        test_evaluator("Test 3", compare_elem(REQUESTS, [ [] ]))
+
+        #
+        # Test 4: Missing days are requested along with the partial ones
+        #
+        STORAGE.deleteFile(_day_files(STORAGE)[2])
+        REQUESTS = list()
+        res = c.last7days(None, None, True, "", False)
+        test_evaluator("Test 4", compare_elem(res.getEntity(), _query(LOG, start, NOW, True, "", False)))
+        test_evaluator("Test 4", compare_elem([ p['start_time'] for p in REQUESTS[0] ],
+                                              [ start.strftime("%d/%b/%Y:%H:%M:%S"), "06/Mar/2010:00:00:00", "10/Mar/2010:00:00:00" ]))
+        test_evaluator("Test 4", compare_elem(len(_day_files(STORAGE)), 6))
+
+        #
+        # Test 5: Unique entries are counted by merging the IP addresses of all days
+        #
+        should = len(_query(LOG, start, NOW, False, "", True))
+        REQUESTS = list()
+        res = c.last7days(None, None, True, "", True)
+        test_evaluator("Test 5", compare_elem(res.getEntity(), should))
+        test_evaluator("Test 5", compare_elem([ p['count_only'] for p in REQUESTS[0] ], [ False ] * 8))
+        test_evaluator("Test 5", compare_elem(len(_day_files(STORAGE)), 12))
+        REQUESTS = list()
+        res = c.last7days(None, None, True, "", True)
+        test_evaluator("Test 5", compare_elem(res.getEntity(), should))
+        test_evaluator("Test 5", compare_elem(len(REQUESTS[0]), 2))
+
+        #
+        # Test 6: Filters with non-ASCII characters
+        #
+        REQUESTS = list()
+        res = c.last7days(None, None, True, u"caf\xe9", False)
+        test_evaluator("Test 6", compare_elem(res.getEntity(), _query(LOG, start, NOW, True, u"caf\xe9", False)))
+        test_evaluator("Test 6", compare_elem(len(REQUESTS[0]), 8))
+        test_evaluator("Test 6", compare_elem(len(_day_files(STORAGE)), 18))
+        REQUESTS = list()
+        res = c.last7days(None, None, True, u"caf\xe9", False)
+        test_evaluator("Test 6", compare_elem(res.getEntity(), _query(LOG, start, NOW, True, u"caf\xe9", False)))
+        test_evaluator("Test 6", compare_elem(len(REQUESTS[0]), 2))
+
+        #
+        # Test 7: Stored days are not used once the base resource is re-defined
+        #
+        FINGERPRINT = "def"
+        REQUESTS = list()
+        res = c.last7days(None, None, True, "", False)
+        test_evaluator("Test 7", compare_elem(res.getEntity(), _query(LOG, start, NOW, True, "", False)))
+        test_evaluator("Test 7", compare_elem(len(REQUESTS[0]), 8))
+
+        #
+        # Test 8: Days that no window covers anymore are removed
+        #
+        STORAGE.storeFile("day_0123456789abcdef_20091101", "5")
+        REQUESTS = list()
+        res = c.last30days(None, None, True, "", False)
+        test_evaluator("Test 8", compare_elem(res.getEntity(), _query(LOG, NOW - timedelta(30), NOW, True, "", False)))
+        test_evaluator("Test 8", compare_elem("day_0123456789abcdef_20091101" in STORAGE.listFiles(), False))
+
+    finally:
+        timerange.datetime = saved
+        shutil.rmtree(tmpdir)
+
+    return get_test_result()
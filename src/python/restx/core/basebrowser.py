@@ -25,10 +25,72 @@ Base class for all content browser classes.
 # RESTx imports
 import restx.settings as settings
 
+from restx.httpabstraction.base_server import is_streamed_entity, close_streamed_entity
+
 from org.mulesoft.restx.exception     import RestxNotAcceptableException
 from org.mulesoft.restx.component.api import HTTP, Result
 
 
+class _RenderedStream(object):
+    """
+    Iterates over the rendered chunks of a streamed entity.
+
+    Closing the stream closes the entity as well, so that it can hand
+    back what it holds on to (a database connection, for example) even
+    if not all of the output was sent.
+
+    """
+    def __init__(self, chunks, entity):
+        self.__chunks = chunks
+        self.__entity = entity
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        return self.__chunks.next()
+
+    def close(self):
+        try:
+            close_streamed_entity(self.__chunks)
+        finally:
+            close_streamed_entity(self.__entity)
+
+
+def accept_params(hdr_list, media_type):
+    """
+    Return the parameters given for a media type in the accept header.
+
+    For example, for 'Accept: application/json; compact=true' the parameters
+    for 'application/json' are { "compact" : "true" }. The q parameter is not
+    included.
+
+    @param hdr_list:        List of values from accept header lines.
+    @type hdr_list:         list
+
+    @param media_type:      The media type, without any parameters.
+    @type media_type:       string
+
+    @return:                Dictionary of parameter names and values.
+    @rtype:                 dict
+
+    """
+    params = dict()
+    if hdr_list:
+        for hdr in hdr_list:
+            for type_str in hdr.split(","):
+                parts = type_str.split(";")
+                if parts[0].strip() != media_type:
+                    continue
+                for p in parts[1:]:
+                    if "=" in p:
+                        name, value = p.split("=", 1)
+                        name = name.strip()
+                        if name != "q":
+                            params[name] = value.strip()
+    return params
+
+
 class BaseBrowser(object):
     """
     A browser is a class that handles specific requests after they
@@ -130,11 +192,25 @@ class BaseBrowser(object):
         @type renderer_class:   BaseRenderer
         
         @return:      Tuple with content type and rendered data, ready to be sent to the client.
+                      The rendered data is an iterator over chunks of output if 'data' was
+                      an iterator.
         @rtype:       tuple of (string, string)
 
         """
         self.renderer_args.update(dict(breadcrumbs=self.breadcrumbs, context_header=self.context_header))
+        # Clients can ask for compact output with a parameter in the accept
+        # header, for example 'application/json; compact=true'.
+        media_params = accept_params(self.headers.get("Accept"), renderer_class.CONTENT_TYPE.split(";")[0])
+        if "compact" in media_params:
+            self.renderer_args['compact'] = media_params['compact'].lower() in [ "true", "yes", "1" ]
         renderer = renderer_class(self.renderer_args)
+        if is_streamed_entity(data):
+            # Large results may be returned as iterators. If the renderer can
+            # produce its output incrementally then the output is an iterator
+            # as well and is sent to the client in chunks.
+            if renderer.canStream():
+                return renderer.CONTENT_TYPE, _RenderedStream(renderer.base_render_iter(data, top_level=True), data)
+            data = list(data)
         return renderer.CONTENT_TYPE, renderer.base_renderer(data, top_level=True)
     
     def process(self):
@@ -31,7 +31,7 @@ import restx.settings as settings
 from org.mulesoft.restx.exception       import RestxException
 from org.mulesoft.restx.component.api   import Result
 
-from restx.components                   import get_component_names, make_component
+from restx.components                   import get_component_names, make_component, acquire_component
 
 from restx.resources                    import makeResourceFromComponentObject, listResources, retrieveResourceFromStorage, getResourceUri,   \
                                                specializedOverwrite, deleteResourceFromStorage
@@ -44,7 +44,7 @@ from org.mulesoft.restx.component.api   import HTTP;
 EXCLUDE_PREFIXES = [ "_" ]
 
 
-def getComponentObjectFromPath(uri, resource_name = None):
+def getComponentObjectFromPath(uri, resource_name = None, pooled = False):
     """
     Return the specified component class, based on a given URI.
     
@@ -53,6 +53,11 @@ def getComponentObjectFromPath(uri, resource_name = None):
 
     @param resource_name:   Name of the resource for which the component was instantiated.
     @type resource_name:    string
+
+    @param pooled:          If set, the component instance may be taken from the pool
+                            of idle instances for this resource. In that case, it needs
+                            to be handed back with release_component() when done.
+    @type pooled:           boolean
     
     @return                 Class of the specified component
                             or None if no matching component class was found.
@@ -63,7 +68,9 @@ def getComponentObjectFromPath(uri, resource_name = None):
     component_name = path_elems[0]   # This should be the name of the code element
     
     # Instantiate the component
-    
+    if pooled  and  resource_name:
+        return acquire_component(component_name, resource_name)
+
     component = make_component(component_name)
     if component:
         # If this component needs to be instantiated for a resource
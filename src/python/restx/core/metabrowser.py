@@ -24,7 +24,11 @@ Allows users and clients to browse the server's meta information.
 """
 import restx.settings as settings
 
-from restx.core.basebrowser import BaseBrowser
+from restx.core.basebrowser       import BaseBrowser
+from restx.platform_specifics     import STORAGE_OBJECT
+from restx.components             import get_pool_stats
+from restx.components.http_client import CONNECTION_POOL
+from restx.core.response_cache    import RESPONSE_CACHE
 
 from org.mulesoft.restx.util          import Url
 from org.mulesoft.restx.component.api import HTTP, Result
@@ -77,13 +81,24 @@ class MetaBrowser(BaseBrowser):
                     "static"           : Url(settings.PREFIX_STATIC),
                     "name"             : "MuleSoft RESTx server",
                     "version"          : settings.get_version(),
-                    "doc"              : Url(settings.PREFIX_META + "/doc")
+                    "doc"              : Url(settings.PREFIX_META + "/doc"),
+                    "cache"            : Url(settings.PREFIX_META + "/cache")
             }
             result = Result.ok(data)
             
         elif path == settings.PREFIX_META + "/doc":
             self.breadcrumbs.append(("Doc", settings.PREFIX_META + "/doc"))
             result = Result.ok(settings.get_docs())
+
+        elif path == settings.PREFIX_META + "/cache":
+            self.breadcrumbs.append(("Cache", settings.PREFIX_META + "/cache"))
+            data = dict()
+            if hasattr(STORAGE_OBJECT, "getCacheStats"):
+                data["resource definitions"] = STORAGE_OBJECT.getCacheStats()
+            data["component pool"] = get_pool_stats()
+            data["responses"]      = RESPONSE_CACHE.getStats()
+            data["http client"]    = CONNECTION_POOL.getStats()
+            result = Result.ok(data)
         else:
             result = Result.notFound("Don't know this meta page")
         
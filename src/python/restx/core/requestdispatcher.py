@@ -56,6 +56,7 @@ ALLOWED_EXCEPTIONS = [
     RestxBadRequestException,
     RestxNotAcceptableException,
     RestxUnsupportedMediaTypeException,
+    RestxRequestEntityTooLargeException,
 ]
  
 class RequestDispatcher(object):
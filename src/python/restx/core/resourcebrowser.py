@@ -34,11 +34,14 @@ from org.mulesoft.restx.exception       import *
 from org.mulesoft.restx.component.api   import HTTP, HttpMethod, Result
 
 from restx.logger                       import *
-from restx.render                       import DEFAULT_OUTPUT_TYPES, RENDERER_ID_SHORTCUTS
-from restx.core.basebrowser             import BaseBrowser
+from restx.render                       import DEFAULT_OUTPUT_TYPES, RENDERER_ID_SHORTCUTS, KNOWN_OUTPUT_RENDERERS
+from restx.core.basebrowser             import BaseBrowser, accept_params
+from restx.httpabstraction.base_server  import is_streamed_entity
 from restx.resources                    import paramSanityCheck, fillDefaults, listResources, \
                                                retrieveResourceFromStorage, getResourceUri, deleteResourceFromStorage
-from restx.resources.resource_runner    import _accessComponentService, _getResourceDetails
+from restx.resources.resource_runner    import _accessComponentService, _getResourceDetails, getDefinitionDigest
+from restx.core.response_cache          import RESPONSE_CACHE
+from restx.components                   import release_component, release_component_after
 
 import java.lang.String
 import java.lang.Exception
@@ -183,6 +186,7 @@ class ResourceBrowser(BaseBrowser):
             if method == HTTP.DELETE_METHOD  and  len(path_elems) == 1:
                 try:
                     deleteResourceFromStorage(self.request.getRequestPath())
+                    RESPONSE_CACHE.invalidate(resource_name)
                     return Result.ok("Resource deleted")
                 except RestxException, e:
                     return Result(e.code, e.msg)
@@ -191,105 +195,232 @@ class ResourceBrowser(BaseBrowser):
             rinfo = _getResourceDetails(resource_name)
             if not rinfo:
                 return Result.notFound("Unknown component")
-            complete_resource_def = rinfo['complete_resource_def']
-            resource_home_uri     = rinfo['resource_home_uri']
-            public_resource_def   = rinfo['public_resource_def']
-            code_uri              = rinfo['code_uri']
-            component             = rinfo['component']
-            services              = public_resource_def['services']
-            public_resource_def['uri'] = Url(public_resource_def['uri'])
+            try:
+                result = self.__process_resource(method, resource_name, path_elems, rinfo)
+            except:
+                release_component(rinfo['component'])
+                raise
+            # A streamed result may still need the component while it is rendered.
+            release_component_after(result, rinfo['component'])
+            return result
+
+    def __response_cache_key(self, resource_name, service_name, runtime_param_dict, positional_params, matched_type):
+        """
+        Return the key under which the response to this request is cached.
 
-            if method == HTTP.GET_METHOD:
-                self.breadcrumbs.append((resource_name, resource_home_uri))
+        The key consists of the resource and service name, the runtime and
+        positional parameters and the negotiated content type, including any
+        parameters the client gave for that type in the accept header (for
+        example, to ask for compact JSON).
 
-            # Was there more to access?
-            if len(path_elems) > 1:
-                #
-                # Some sub-service of the component was requested. This means
-                # we actually need to pass the parameters to the component
-                # and call this service function.
-                #
-                
-                service_name = path_elems[1]
-
-                # If the service name contains a "." then we might deal with
-                # a content type ID in the URI (used by clients who don't know how
-                # to deal with the 'Accept' or 'Content-type' headers properly).
-                # In that case, we remove that ID from the service name.
-                content_type_from_id = None
-                if "." in service_name:
-                    service_name, content_id = service_name.split(".")
-                    content_type_from_id = RENDERER_ID_SHORTCUTS.get(content_id)
-                    self.request.setContentType(content_type_from_id)
-
-                if not content_type_from_id:
-                    # Get the supported output content types for this service method
-                    requested_content_types = self.request.preferredContentTypes()
-                else:
-                    # We have a content type specified in the URI
-                    requested_content_types = [ content_type_from_id ]
+        @return:              The cache key.
+        @rtype:               tuple
 
-                try:
-                    service_def = complete_resource_def['public']['services'][service_name]
-                except KeyError, e:
-                    raise RestxResourceNotFoundException("Cannot find '%s'." % service_name)
-
-                # This service has some possible runtime parameters defined.
-                # We pass this service definition's parameter list in, since that
-                # means we are filtering out all those parameters that we are
-                # not expecting.
-                service_params = service_def.get('params')
-                if service_params:
-                    # Only_params is the list of defined service parameters. Passing this to
-                    # get_request_query_dict() means that all other runtime parameters are
-                    # filtered out.
-                    only_params = service_params.keys()
-                    runtime_param_dict = get_request_query_dict(self.request, only_params)
-                else:
-                    only_params = None
-                    runtime_param_dict = dict()   # No service parameters defined? All runtime parameters are removed (ignored).
-
-                possible_output_types   = service_def.get('output_types')
-                if not possible_output_types:
-                    # If the service method didn't define any type(s) then we just
-                    # indicate the ability to create any of the default types
-                    possible_output_types = DEFAULT_OUTPUT_TYPES
-
-                if type(possible_output_types) in [ str, unicode, java.lang.String ]:
-                    # Always store the output types in a list, even if the service method just
-                    # defined a single one
-                    possible_output_types = [ possible_output_types ]
-
-                # See that we can match the accepted to possible types
-                matched_type      = content_type_match(possible_output_types, requested_content_types)
-                positional_params = path_elems[2:]
-                input             = self.request.getRequestBody()
-                try:
-                    http_method = __HTTP_METHOD_LOOKUP.get(self.request.getRequestMethod().upper(), HttpMethod.UNKNOWN)
-                    result      = _accessComponentService(component, complete_resource_def,
-                                                          resource_name, service_name, positional_params,
-                                                          runtime_param_dict, input, self.request,
-                                                          http_method)
-                    if result == None  or  type(result) is not Result:
-                        result = Result.noContent()
-                    else:
-                        result.setNegotiatedContentType(matched_type)
-                except RestxException, e:
-                    result = Result(e.code, e.msg)
-                except Exception, e:
-                    # The service code threw an exception. We need to log that and return a
-                    # normal error back to the user.
-                    print traceback.format_exc()
-                    log("Exception in component for service '%s': %s" % (service_name, str(e)), facility=LOGF_COMPONENTS)
-                    result = Result.internalServerError("Internal server error. Details have been logged...")
-
-                if result.getStatus() != HTTP.NOT_FOUND  and  method == HTTP.GET_METHOD  and  service_name in services:
-                    self.breadcrumbs.append((service_name, services[service_name]['uri']))
-                    
+        """
+        params       = runtime_param_dict.items()
+        params.sort()
+        media_params = accept_params(self.headers.get("Accept"), matched_type).items()
+        media_params.sort()
+        return (resource_name, service_name, tuple(params), tuple([ p for p in positional_params if p ]),
+                matched_type, tuple(media_params))
+
+    def __header_value(self, name):
+        """
+        Return the first value of a request header, or None.
+
+        """
+        values = self.headers.get(name)
+        if values:
+            return values[0]
+        return None
+
+    def __cached_result(self, entry):
+        """
+        Return the result for a request that can be answered from the response cache.
+
+        If the client already has the current version of the response then
+        a '304 Not Modified' is returned.
+
+        @param entry:   The cache entry.
+        @type entry:    CacheEntry
+
+        @return:        HTTP result structure.
+        @rtype:         Result
+
+        """
+        not_modified = entry.isNotModified(self.__header_value("If-none-match"),
+                                           self.__header_value("If-modified-since"))
+        return entry.makeResult(not_modified)
+
+    def __cache_result(self, cache_key, def_digest, result, matched_type, ttl):
+        """
+        Render the result of a service and store it in the response cache.
+
+        The result is rendered here, rather than by the request dispatcher,
+        so that the rendered output can be stored. Streamed results are not
+        cached.
+
+        @return:        The result to send to the client, with cache headers.
+        @rtype:         Result
+
+        """
+        entity = result.getEntity()
+        if is_streamed_entity(entity):
+            return result
+        headers        = dict()
+        result_headers = result.getHeaders()
+        if result_headers:
+            for name in result_headers.keySet():
+                headers[name] = result_headers[name]
+        content_type = headers.pop("Content-type", None)
+        if content_type is None:
+            # Not rendered by the component itself
+            renderer_class = KNOWN_OUTPUT_RENDERERS.get(matched_type)
+            if not renderer_class:
                 return result
+            content_type, entity = self.renderOutput(entity, renderer_class)
+        entry = RESPONSE_CACHE.put(cache_key, def_digest, entity, content_type, headers, int(ttl))
+        return entry.makeResult(entry.isNotModified(self.__header_value("If-none-match"), None))
+
+    def __process_resource(self, method, resource_name, path_elems, rinfo):
+        """
+        Process a request for a particular resource or one of its services.
+
+        @param method:        The HTTP method of the request.
+        @type method:         string
+
+        @param resource_name: Name of the requested resource.
+        @type resource_name:  string
+
+        @param path_elems:    The elements of the request path, starting with the resource name.
+        @type path_elems:     list
+
+        @param rinfo:         The resource details, as returned by _getResourceDetails().
+        @type rinfo:          dict
+
+        @return:              HTTP result structure.
+        @rtype:               Result
+
+        """
+        complete_resource_def = rinfo['complete_resource_def']
+        resource_home_uri     = rinfo['resource_home_uri']
+        public_resource_def   = rinfo['public_resource_def']
+        code_uri              = rinfo['code_uri']
+        component             = rinfo['component']
+        services              = public_resource_def['services']
+        public_resource_def['uri'] = Url(public_resource_def['uri'])
 
+        if method == HTTP.GET_METHOD:
+            self.breadcrumbs.append((resource_name, resource_home_uri))
+
+        # Was there more to access?
+        if len(path_elems) > 1:
+            #
+            # Some sub-service of the component was requested. This means
+            # we actually need to pass the parameters to the component
+            # and call this service function.
+            #
+            
+            service_name = path_elems[1]
+
+            # If the service name contains a "." then we might deal with
+            # a content type ID in the URI (used by clients who don't know how
+            # to deal with the 'Accept' or 'Content-type' headers properly).
+            # In that case, we remove that ID from the service name.
+            content_type_from_id = None
+            if "." in service_name:
+                service_name, content_id = service_name.split(".")
+                content_type_from_id = RENDERER_ID_SHORTCUTS.get(content_id)
+                self.request.setContentType(content_type_from_id)
+
+            if not content_type_from_id:
+                # Get the supported output content types for this service method
+                requested_content_types = self.request.preferredContentTypes()
+            else:
+                # We have a content type specified in the URI
+                requested_content_types = [ content_type_from_id ]
+
+            try:
+                service_def = complete_resource_def['public']['services'][service_name]
+            except KeyError, e:
+                raise RestxResourceNotFoundException("Cannot find '%s'." % service_name)
+
+            # This service has some possible runtime parameters defined.
+            # We pass this service definition's parameter list in, since that
+            # means we are filtering out all those parameters that we are
+            # not expecting.
+            service_params = service_def.get('params')
+            if service_params:
+                # Only_params is the list of defined service parameters. Passing this to
+                # get_request_query_dict() means that all other runtime parameters are
+                # filtered out.
+                only_params = service_params.keys()
+                runtime_param_dict = get_request_query_dict(self.request, only_params)
             else:
-                # No, nothing else. Someone just wanted to know more about the resource.
-                if method == HTTP.POST_METHOD:
-                    raise RestxMethodNotAllowedException()
-                return Result.ok(public_resource_def)
+                only_params = None
+                runtime_param_dict = dict()   # No service parameters defined? All runtime parameters are removed (ignored).
+
+            possible_output_types   = service_def.get('output_types')
+            if not possible_output_types:
+                # If the service method didn't define any type(s) then we just
+                # indicate the ability to create any of the default types
+                possible_output_types = DEFAULT_OUTPUT_TYPES
+
+            if type(possible_output_types) in [ str, unicode, java.lang.String ]:
+                # Always store the output types in a list, even if the service method just
+                # defined a single one
+                possible_output_types = [ possible_output_types ]
+
+            # See that we can match the accepted to possible types
+            matched_type      = content_type_match(possible_output_types, requested_content_types)
+            positional_params = path_elems[2:]
+
+            # Services may ask for their responses to be cached. A cached response
+            # is returned without invoking the component.
+            cache_key = None
+            if service_def.get('cache_ttl')  and  method == HTTP.GET_METHOD:
+                cache_key  = self.__response_cache_key(resource_name, service_name, runtime_param_dict,
+                                                       positional_params, matched_type)
+                def_digest = getDefinitionDigest(complete_resource_def['private'])
+                entry      = RESPONSE_CACHE.get(cache_key, def_digest)
+                if entry:
+                    return self.__cached_result(entry)
+
+            if service_def.get('stream_input'):
+                # The service reads the body itself, as it arrives.
+                input         = self.request.getRequestBodyStream()
+            else:
+                input         = self.request.getRequestBody()
+            try:
+                http_method = __HTTP_METHOD_LOOKUP.get(self.request.getRequestMethod().upper(), HttpMethod.UNKNOWN)
+                result      = _accessComponentService(component, complete_resource_def,
+                                                      resource_name, service_name, positional_params,
+                                                      runtime_param_dict, input, self.request,
+                                                      http_method)
+                if result == None  or  type(result) is not Result:
+                    result = Result.noContent()
+                else:
+                    result.setNegotiatedContentType(matched_type)
+            except RestxException, e:
+                result = Result(e.code, e.msg)
+            except Exception, e:
+                # The service code threw an exception. We need to log that and return a
+                # normal error back to the user.
+                print traceback.format_exc()
+                log("Exception in component for service '%s': %s" % (service_name, str(e)), facility=LOGF_COMPONENTS)
+                result = Result.internalServerError("Internal server error. Details have been logged...")
+
+            if result.getStatus() != HTTP.NOT_FOUND  and  method == HTTP.GET_METHOD  and  service_name in services:
+                self.breadcrumbs.append((service_name, services[service_name]['uri']))
+
+            if cache_key  and  result.getStatus() == HTTP.OK:
+                result = self.__cache_result(cache_key, def_digest, result,
+                                             matched_type, service_def['cache_ttl'])
+                
+            return result
+
+        else:
+            # No, nothing else. Someone just wanted to know more about the resource.
+            if method == HTTP.POST_METHOD:
+                raise RestxMethodNotAllowedException()
+            return Result.ok(public_resource_def)
@@ -0,0 +1,245 @@
+"""
+RESTx: Sane, simple and effective data publishing and integration.
+
+Copyright (C) 2010   MuleSoft Inc.    http://www.mulesoft.com
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+"""
+Cache for the rendered responses of services.
+
+A service can opt in to caching by declaring a 'cache_ttl' (in seconds)
+in its service definition. The rendered output of successful GET requests
+to such a service is then kept for that long, keyed on the resource, the
+service, the runtime parameters and the negotiated content type. Requests
+that can be answered from the cache don't invoke the component at all.
+
+Cached responses carry ETag and Last-Modified headers, so that clients
+can revalidate with If-None-Match or If-Modified-Since and receive a
+'304 Not Modified' instead of the full response.
+
+"""
+
+import time
+import threading
+import email.utils
+
+try:
+    from hashlib import md5
+except ImportError:
+    from md5 import md5
+
+import restx.settings as settings
+
+from org.mulesoft.restx.component.api import HTTP, Result
+
+
+class CacheEntry(object):
+    """
+    A rendered response, together with its validators.
+
+    """
+    def __init__(self, def_digest, body, content_type, headers, ttl):
+        """
+        Create a new cache entry.
+
+        @param def_digest:    Digest of the 'private' section of the resource
+                              definition the response was produced for. The
+                              entry is only valid as long as the definition
+                              doesn't change.
+        @type def_digest:     string
+
+        @param body:          The rendered response body.
+        @type body:           string
+
+        @param content_type:  The content type of the response body.
+        @type content_type:   string
+
+        @param headers:       Any additional response headers set by the component.
+        @type headers:        dict
+
+        @param ttl:           Number of seconds for which the entry is valid.
+        @type ttl:            int
+
+        """
+        self.def_digest    = def_digest
+        self.body          = body
+        self.content_type  = content_type
+        self.headers       = headers
+        self.created       = int(time.time())
+        self.expires       = self.created + ttl
+        if type(body) is unicode:
+            digest_body = body.encode("UTF-8")
+        else:
+            digest_body = str(body)
+        self.etag          = '"%s"' % md5(digest_body).hexdigest()
+        self.last_modified = email.utils.formatdate(self.created, usegmt=True)
+
+    def isNotModified(self, if_none_match, if_modified_since):
+        """
+        Return True if the client's copy of the response is still current.
+
+        If-None-Match takes precedence over If-Modified-Since.
+
+        @param if_none_match:      Value of the If-None-Match request header, or None.
+        @type if_none_match:       string
+
+        @param if_modified_since:  Value of the If-Modified-Since request header, or None.
+        @type if_modified_since:   string
+
+        @return:                   True if a '304 Not Modified' can be sent.
+        @rtype:                    boolean
+
+        """
+        if if_none_match:
+            tags = [ t.strip() for t in if_none_match.split(",") ]
+            return "*" in tags  or  self.etag in tags
+        if if_modified_since:
+            since = email.utils.parsedate_tz(if_modified_since)
+            if since:
+                return self.created <= email.utils.mktime_tz(since)
+        return False
+
+    def makeResult(self, not_modified=False):
+        """
+        Return a Result for this entry.
+
+        @param not_modified:  Flag indicating whether a '304 Not Modified' result,
+                              without a body, should be returned.
+        @type not_modified:   boolean
+
+        @return:              The result, with all the response headers set.
+        @rtype:               Result
+
+        """
+        if not_modified:
+            result = Result(HTTP.NOT_MODIFIED, "")
+        else:
+            result = Result.ok(self.body)
+            for name, value in self.headers.items():
+                result.addHeader(name, value)
+            result.addHeader("Content-type", self.content_type)
+        result.addHeader("ETag", self.etag)
+        result.addHeader("Last-Modified", self.last_modified)
+        result.addHeader("Cache-Control", "max-age=%d" % max(0, self.expires - int(time.time())))
+        return result
+
+
+class ResponseCache(object):
+    """
+    A size limited store of cache entries with expiry.
+
+    """
+    def __init__(self, max_entries):
+        """
+        Create the cache.
+
+        @param max_entries:  The maximum number of entries that are kept.
+        @type max_entries:   int
+
+        """
+        self.__max_entries = max_entries
+        self.__entries     = dict()
+        self.__lock        = threading.Lock()
+        self.__hits        = 0
+        self.__misses      = 0
+
+    def get(self, key, def_digest):
+        """
+        Return the current entry for a key, or None.
+
+        @param key:          The cache key.
+        @type key:           tuple
+
+        @param def_digest:   Digest of the 'private' section of the current
+                             resource definition.
+        @type def_digest:    string
+
+        @return:             The cache entry, if there is a valid one.
+        @rtype:              CacheEntry
+
+        """
+        self.__lock.acquire()
+        try:
+            entry = self.__entries.get(key)
+            if entry:
+                if entry.expires > time.time()  and  entry.def_digest == def_digest:
+                    self.__hits += 1
+                    return entry
+                del self.__entries[key]
+            self.__misses += 1
+            return None
+        finally:
+            self.__lock.release()
+
+    def put(self, key, def_digest, body, content_type, headers, ttl):
+        """
+        Store a rendered response.
+
+        If the cache is full then expired entries are removed first. If that
+        doesn't make room, the entry that would expire next is dropped.
+
+        @return:             The new cache entry.
+        @rtype:              CacheEntry
+
+        """
+        entry = CacheEntry(def_digest, body, content_type, headers, ttl)
+        self.__lock.acquire()
+        try:
+            if key not in self.__entries  and  len(self.__entries) >= self.__max_entries:
+                now = time.time()
+                for k, e in self.__entries.items():
+                    if e.expires <= now:
+                        del self.__entries[k]
+                if len(self.__entries) >= self.__max_entries:
+                    oldest = min(self.__entries.items(), key=lambda item: item[1].expires)[0]
+                    del self.__entries[oldest]
+            self.__entries[key] = entry
+        finally:
+            self.__lock.release()
+        return entry
+
+    def invalidate(self, resource_name):
+        """
+        Remove all entries for a resource.
+
+        @param resource_name:  Name of the resource.
+        @type resource_name:   string
+
+        """
+        self.__lock.acquire()
+        try:
+            for key in self.__entries.keys():
+                if key[0] == resource_name:
+                    del self.__entries[key]
+        finally:
+            self.__lock.release()
+
+    def getStats(self):
+        """
+        Return information about the current state of the cache.
+
+        """
+        self.__lock.acquire()
+        try:
+            return dict(entries=len(self.__entries), max_entries=self.__max_entries,
+                        hits=self.__hits, misses=self.__misses)
+        finally:
+            self.__lock.release()
+
+
+RESPONSE_CACHE = ResponseCache(settings.RESPONSE_CACHE_MAX_ENTRIES)
+
@@ -0,0 +1,240 @@
+"""
+RESTx: Sane, simple and effective data publishing and integration.
+
+Copyright (C) 2010   MuleSoft Inc.    http://www.mulesoft.com
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+"""
+A table of data, stored by column.
+
+Many components produce a list of dictionaries, which all have the
+same keys. A Table holds the same data as one sequence of values per
+column plus the column names, so that the names are not repeated in
+every row, and whole columns can be worked on at once.
+
+Components that access a resource in-process get the Table itself.
+The JSON, CSV and XML renderers render it directly. Iterating over a
+Table produces one dictionary per row, so code that expects a list
+of dictionaries can still use it.
+
+"""
+
+# Python imports
+import itertools
+
+try:
+    import numpy
+except ImportError:
+    # Not available under Jython. The columns are plain lists then.
+    numpy = None
+
+from org.mulesoft.restx.exception import RestxException
+
+
+def _as_list(column):
+    """
+    Return a column as Python list.
+
+    NumPy arrays are converted, since their elements are NumPy types,
+    which the renderers don't know.
+
+    """
+    if type(column) is list:
+        return column
+    if hasattr(column, "tolist"):
+        return column.tolist()
+    return list(column)
+
+
+class Table(object):
+    """
+    Tabular data, with a list of column names and a sequence of values for each column.
+
+    The columns may be lists, tuples or NumPy arrays. A Table should not be
+    modified after it was created.
+
+    """
+    def __init__(self, column_names, columns):
+        """
+        Create a table out of its columns.
+
+        @param column_names:    The names of the columns.
+        @type column_names:     list
+
+        @param columns:         The values of each column, in the order of the names.
+                                All columns need to have the same length.
+        @type columns:          list
+
+        @raise RestxException:  If the columns don't match the names or each other.
+
+        """
+        if len(column_names) != len(columns):
+            raise RestxException("A table needs one column for each column name")
+        lengths = set([ len(c) for c in columns ])
+        if len(lengths) > 1:
+            raise RestxException("All columns of a table need to have the same length")
+        self.__names    = list(column_names)
+        self.__columns  = list(columns)
+        self.__num_rows = lengths and lengths.pop() or 0
+        self.__records  = None
+
+    @staticmethod
+    def fromRecords(records, column_names=None):
+        """
+        Create a table out of a list of dictionaries.
+
+        @param records:         The rows of the table. Missing values are None.
+        @type records:          list
+
+        @param column_names:    The names of the columns. If not specified, the
+                                sorted keys of the first record are used.
+        @type column_names:     list
+
+        @return:                The new table.
+        @rtype:                 Table
+
+        """
+        if column_names is None:
+            if records:
+                column_names = records[0].keys()
+                column_names.sort()
+            else:
+                column_names = list()
+        columns = [ [ rec.get(name) for rec in records ] for name in column_names ]
+        return Table(column_names, columns)
+
+    @staticmethod
+    def fromRows(column_names, rows):
+        """
+        Create a table out of a list of rows.
+
+        @param column_names:    The names of the columns.
+        @type column_names:     list
+
+        @param rows:            Lists or tuples of values, in the order of the names.
+        @type rows:             list
+
+        @return:                The new table.
+        @rtype:                 Table
+
+        """
+        if rows:
+            columns = map(list, zip(*rows))
+        else:
+            columns = [ list() for name in column_names ]
+        return Table(column_names, columns)
+
+    def getColumnNames(self):
+        """
+        Return the names of the columns.
+
+        """
+        return list(self.__names)
+
+    def getColumn(self, name):
+        """
+        Return the values of a column, as they are stored (a list or NumPy array).
+
+        @raise RestxException:  If there is no column of that name.
+
+        """
+        try:
+            return self.__columns[self.__names.index(name)]
+        except ValueError:
+            raise RestxException("Unknown column '%s'" % name)
+
+    def getColumnList(self, name):
+        """
+        Return the values of a column as list.
+
+        """
+        return _as_list(self.getColumn(name))
+
+    def numRows(self):
+        """
+        Return the number of rows.
+
+        """
+        return self.__num_rows
+
+    def __len__(self):
+        return self.__num_rows
+
+    def getRows(self):
+        """
+        Return an iterator over the rows, each as a tuple of values in the order of the columns.
+
+        """
+        if not self.__columns:
+            return itertools.repeat((), self.__num_rows)
+        return itertools.izip(*[ _as_list(c) for c in self.__columns ])
+
+    def getRecords(self):
+        """
+        Return an iterator over the rows, each as a dictionary.
+
+        """
+        names = self.__names
+        return itertools.imap(lambda row : dict(zip(names, row)), self.getRows())
+
+    def __iter__(self):
+        return self.getRecords()
+
+    def asList(self):
+        """
+        Return the rows as a list of dictionaries.
+
+        The list is only created once, when it is first needed.
+
+        """
+        if self.__records is None:
+            self.__records = list(self.getRecords())
+        return self.__records
+
+    def __getitem__(self, index):
+        return self.asList()[index]
+
+    def select(self, flags):
+        """
+        Return a new table with the rows for which the flag is set.
+
+        @param flags:           One flag per row.
+        @type flags:            list
+
+        @return:                The new table.
+        @rtype:                 Table
+
+        """
+        columns = list()
+        for column in self.__columns:
+            if numpy  and  isinstance(column, numpy.ndarray):
+                columns.append(column[numpy.array(flags, dtype=bool)])
+            else:
+                columns.append([ value for value, flag in itertools.izip(column, flags) if flag ])
+        return Table(self.__names, columns)
+
+    def toNumpy(self):
+        """
+        Return a new table, with each column stored in a NumPy array.
+
+        @raise RestxException:  If NumPy is not available.
+
+        """
+        if numpy is None:
+            raise RestxException("NumPy is not available")
+        return Table(self.__names, [ numpy.array(_as_list(c)) for c in self.__columns ])
+
@@ -37,6 +37,45 @@ concrete HttpServer implementation later on.
 #
 from org.mulesoft.restx import RestxHttpRequest
 
+import restx.settings as settings
+
+from org.mulesoft.restx.exception import RestxRequestEntityTooLargeException
+
+
+def is_streamed_entity(data):
+    """
+    Return True if a response entity should be streamed to the client.
+
+    Components and renderers may return an iterator (for example a
+    generator) instead of a complete object or string. Such an entity is
+    sent in chunks as the iterator produces them.
+
+    @param data:   A response entity.
+    @type data:    object
+
+    @return:       True if the entity is an iterator.
+    @rtype:        boolean
+
+    """
+    return hasattr(data, "next")  and  hasattr(data, "__iter__")  and \
+           type(data) not in [ str, unicode, list, tuple, dict ]
+
+def close_streamed_entity(data):
+    """
+    Close a streamed response entity, if it can be closed.
+
+    Streamed entities may hold on to resources, such as a database
+    connection, until they have been read completely. The servers call
+    this once a response has been sent, or when sending it failed, for
+    example because the client went away.
+
+    @param data:   A response entity.
+    @type data:    object
+
+    """
+    if is_streamed_entity(data)  and  hasattr(data, "close"):
+        data.close()
+
 
 class BaseHttpServer(object):
     """
@@ -44,3 +83,161 @@ class BaseHttpServer(object):
     
     """    
     def __init__(self, port, request_handler): pass
+
+
+class RequestBody(object):
+    """
+    Incremental, size limited access to the body of a request.
+
+    The body is read from the native request in chunks, as the consumer asks
+    for it. If the content length is known then we never read past it, and a
+    body that is announced or turns out to be larger than the limit causes a
+    RestxRequestEntityTooLargeException. A body that is read into memory in
+    its entirety, with readAll(), has a lower limit than one that is read
+    chunk by chunk.
+
+    Instances can be used like a (read-only) file object, or iterated over
+    to get the body chunk by chunk. A RequestBody is false if the request
+    does not have a body.
+
+    """
+    def __init__(self, read_func, content_length=None, max_size=None, chunk_size=None):
+        """
+        Set up access to a request body.
+
+        @param read_func:        Function that takes a number of bytes and returns up to that
+                                 many bytes of the body as string, or an empty string at the end.
+        @type read_func:         callable
+
+        @param content_length:   Length of the body, if known from the request headers.
+        @type content_length:    int
+
+        @param max_size:         Maximum allowed body size. Defaults to MAX_STREAMED_REQUEST_BODY_SIZE.
+        @type max_size:          int
+
+        @param chunk_size:       Size of the chunks in which the body is read. Defaults to
+                                 REQUEST_BODY_CHUNK_SIZE.
+        @type chunk_size:        int
+
+        @raise RestxRequestEntityTooLargeException: If the content length exceeds the limit.
+
+        """
+        if max_size is None:
+            max_size = settings.MAX_STREAMED_REQUEST_BODY_SIZE
+        self.__check_length(content_length, max_size)
+        self.content_length = content_length
+        self.__read_func    = read_func
+        self.__max_size     = max_size
+        self.__chunk_size   = chunk_size or settings.REQUEST_BODY_CHUNK_SIZE
+        self.__remaining    = content_length
+        self.__bytes_read   = 0
+        self.__pending      = ""
+        self.__eof          = content_length == 0
+
+    def __check_length(self, content_length, max_size):
+        """
+        Raise an exception if the announced content length exceeds the limit.
+
+        """
+        if max_size  and  content_length  and  content_length > max_size:
+            raise RestxRequestEntityTooLargeException("Request body of %d bytes exceeds limit of %d bytes" % \
+                                                                (content_length, max_size))
+
+    def __read_native(self, size):
+        """
+        Read up to 'size' bytes from the native request, enforcing length and limit.
+
+        """
+        if self.__eof:
+            return ""
+        if self.__remaining is not None:
+            size = min(size, self.__remaining)
+        data = self.__read_func(size)
+        if not data:
+            self.__eof = True
+            return ""
+        self.__bytes_read += len(data)
+        if self.__max_size  and  self.__bytes_read > self.__max_size:
+            self.__eof = True
+            raise RestxRequestEntityTooLargeException("Request body exceeds limit of %d bytes" % self.__max_size)
+        if self.__remaining is not None:
+            self.__remaining -= len(data)
+            if self.__remaining <= 0:
+                self.__eof = True
+        return data
+
+    def read(self, size=-1):
+        """
+        Read from the body.
+
+        @param size:     Maximum number of bytes to return. If negative, the
+                         entire remaining body is returned.
+        @type size:      int
+
+        @return:         The data, or an empty string at the end of the body.
+        @rtype:          string
+
+        """
+        if size < 0:
+            chunks = []
+            while True:
+                chunk = self.read(self.__chunk_size)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+            return "".join(chunks)
+        if self.__pending:
+            data           = self.__pending[:size]
+            self.__pending = self.__pending[size:]
+            return data
+        return self.__read_native(size)
+
+    def readAll(self, max_size=None):
+        """
+        Return the entire (remaining) body as a single string.
+
+        @param max_size:     Maximum allowed size of the body, since it is held in
+                             memory. Defaults to MAX_REQUEST_BODY_SIZE.
+        @type max_size:      int
+
+        @raise RestxRequestEntityTooLargeException: If the body exceeds the limit.
+
+        """
+        if max_size is None:
+            max_size = settings.MAX_REQUEST_BODY_SIZE
+        self.__check_length(self.content_length, max_size)
+        chunks = []
+        length = 0
+        while True:
+            chunk = self.read(self.__chunk_size)
+            if not chunk:
+                break
+            length += len(chunk)
+            if max_size  and  length > max_size:
+                raise RestxRequestEntityTooLargeException("Request body exceeds limit of %d bytes" % max_size)
+            chunks.append(chunk)
+        return "".join(chunks)
+
+    def __iter__(self):
+        """
+        Iterate over the body in chunks of REQUEST_BODY_CHUNK_SIZE bytes.
+
+        """
+        while True:
+            chunk = self.read(self.__chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    def __nonzero__(self):
+        """
+        Return True if there is (more) data in the body.
+
+        If the content length is not known, the first chunk is read ahead
+        to find out.
+
+        """
+        if self.__pending:
+            return True
+        self.__pending = self.__read_native(self.__chunk_size)
+        return bool(self.__pending)
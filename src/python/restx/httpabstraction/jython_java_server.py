@@ -38,14 +38,17 @@ from java.lang              import Exception as JavaException
 from java.util.concurrent   import Executors;
 
 # Python imports
+import jarray
 import traceback
 
 # RESTx imports
-import restx.settings as settings
+import restx.settings      as settings
+import restx.request_scope as request_scope
 
 from restx.logger import *
 
-from restx.httpabstraction.base_server import BaseHttpServer, RestxHttpRequest
+from restx.httpabstraction.base_server import BaseHttpServer, RestxHttpRequest, RequestBody, \
+                                              is_streamed_entity, close_streamed_entity
 
 class JythonJavaHttpRequest(RestxHttpRequest):
     """
@@ -65,7 +68,9 @@ class JythonJavaHttpRequest(RestxHttpRequest):
     __native_req               = None
     __request_uri_str          = None
     __request_headers          = None
+    __request_body             = None
     __response_headers         = None
+    __response_body            = None
     __response_encoded         = False
     __preferred_content_types  = None
     __content_type             = None
@@ -107,12 +112,21 @@ class JythonJavaHttpRequest(RestxHttpRequest):
             # then the default is q=1. However, to make sure that those who have
             # no q defined appear first (that's usually the intend) we give them a
             # q=2 for sorting purposes.
-            type_q_tuples = [ e.split(";") for e in elems ]
-
-            # Below, the sorted() returns a list of iterable list elements, each with
-            # either one or two elements. We then only take the first element since
-            # we are not interested in returning the q=* value.
-            self.__preferred_content_types = [ e[0] for e in sorted(type_q_tuples, key=lambda x: x[1] if len(x) > 1 else "q=2", reverse=True) ]
+            # Other media type parameters (such as 'compact=true' for JSON) are
+            # not relevant for the sort order.
+            type_q_tuples = list()
+            for e in elems:
+                parts = [ p.strip() for p in e.split(";") ]
+                q     = "q=2"
+                for p in parts[1:]:
+                    if p.startswith("q="):
+                        q = p
+                type_q_tuples.append((parts[0], q))
+
+            # Below, the sorted() returns a list of (type, q) tuples. We then only
+            # take the first element since we are not interested in returning the
+            # q=* value.
+            self.__preferred_content_types = [ e[0] for e in sorted(type_q_tuples, key=lambda x: x[1], reverse=True) ]
 
         return self.__preferred_content_types
 
@@ -120,6 +134,8 @@ class JythonJavaHttpRequest(RestxHttpRequest):
     def __init__(self, *args, **kwargs):
         super(JythonJavaHttpRequest, self).__init__(*args, **kwargs)
         self.__response_headers = dict()
+        self.__headers_sent     = False
+        self.streamed_length    = -1
 
     def setContentType(self, content_type):
         """
@@ -187,6 +203,9 @@ class JythonJavaHttpRequest(RestxHttpRequest):
         @type body:     string
         
         """
+        if self.__response_body is not body:
+            # A streamed body that is replaced before it was sent
+            close_streamed_entity(self.__response_body)
         self.__response_body = body if body else ""
         
     def setResponseHeader(self, name, value):
@@ -317,28 +336,53 @@ class JythonJavaHttpRequest(RestxHttpRequest):
         else:
             return None
     
+    def __readNativeBody(self, size):
+        """
+        Read up to 'size' bytes from the body of the native request.
+
+        The bytes are returned unchanged, so that binary bodies survive.
+
+        """
+        buf   = jarray.zeros(size, 'b')
+        count = self.__native_req.getRequestBody().read(buf, 0, size)
+        if count <= 0:
+            return ""
+        return buf[:count].tostring()
+
+    def getRequestBodyStream(self):
+        """
+        Return the body of the request message as a RequestBody object.
+
+        This allows the body to be read incrementally, which is useful for
+        large message bodies.
+
+        @return:    Body of the request.
+        @rtype:     RequestBody
+
+        """
+        if self.__native_req  and  self.__request_body is None:
+            content_length = self.__native_req.getRequestHeaders().getFirst("Content-length")
+            if content_length is not None:
+                try:
+                    content_length = int(content_length)
+                except ValueError:
+                    content_length = None
+            self.__request_body = RequestBody(self.__readNativeBody, content_length)
+        return self.__request_body
+
     def getRequestBody(self):
         """
         Return the body of the request message.
         
-        Note that this is not very suitable for streaming or large message bodies
-        at this point, since the entire message is read into a single string
-        before it is returned to the client.
+        The entire message is read into a single string before it is
+        returned. Use getRequestBodyStream() for large message bodies.
         
         @return:    Body of the request.
         @rtype:     string
         
         """
         if self.__native_req:
-            buffered_reader = BufferedReader(InputStreamReader(self.__native_req.getRequestBody()));
-            lines = []
-            while True:
-                line = buffered_reader.readLine()
-                if not line:
-                    break
-                lines.append(line)
-            
-            return '\n'.join(lines)
+            return self.getRequestBodyStream().readAll()
         else:
             return None
     
@@ -346,8 +390,12 @@ class JythonJavaHttpRequest(RestxHttpRequest):
         """
         Send the previously specified response headers and code.
         
+        If the response body is an iterator then its length is not known
+        up front and the body is sent with chunked transfer encoding.
+        
         """
-        if not self.__response_encoded:
+        streamed = is_streamed_entity(self.__response_body)
+        if not self.__response_encoded  and  not streamed:
             # Need to do this before setting response headers, since the
             # encoding might change the length of the response, thus modifying
             # what should be written in the 'Content-length' header.
@@ -357,35 +405,73 @@ class JythonJavaHttpRequest(RestxHttpRequest):
             response_headers = self.__native_req.getResponseHeaders()
             for name, value in self.__response_headers.items():
                 response_headers[name] = [ value ]
-            self.__native_req.sendResponseHeaders(self.__response_code, len(self.__response_body))
+            self.__headers_sent = True
+            if streamed:
+                # A length of zero tells the server to use chunked encoding.
+                self.__native_req.sendResponseHeaders(self.__response_code, 0)
+            else:
+                self.__native_req.sendResponseHeaders(self.__response_code, len(self.__response_body))
+
+    def headersSent(self):
+        """
+        Return True if the response headers have been sent already.
+
+        """
+        return self.__headers_sent
     
     def sendResponseBody(self):
         """
         Send the previously specified request body.
         
+        A body that is an iterator is sent chunk by chunk, as the
+        iterator produces the data. It is closed afterwards, even if
+        sending failed, so that it hands back what it holds on to.
+        
         """
         if self.__native_req:
             os = self.__native_req.getResponseBody()
-            os.write(self.__response_body, 0, len(self.__response_body))
-            os.flush()
+            if is_streamed_entity(self.__response_body):
+                enc = self.__getResponseEncoding()
+                self.streamed_length = 0
+                try:
+                    for chunk in self.__response_body:
+                        if type(chunk) is unicode:
+                            chunk = chunk.encode(enc)
+                        if not chunk:
+                            continue
+                        self.streamed_length += len(chunk)
+                        os.write(chunk, 0, len(chunk))
+                        os.flush()
+                finally:
+                    close_streamed_entity(self.__response_body)
+            else:
+                os.write(self.__response_body, 0, len(self.__response_body))
+                os.flush()
             os.close()
 
+    def __getResponseEncoding(self):
+        """
+        Return the character set specified in the Content-type header.
+
+        """
+        enc = None
+        if self.__response_headers.has_key('Content-type'):
+            elems = self.__response_headers['Content-type'].split("charset=")
+            # Check if an encoding was specified in the content type
+            if len(elems) == 2:
+                (ct, enc) = elems
+        if not enc:
+            # We still don't have an encoding, so we use default
+            enc = "US-ASCII"
+        return enc
+
     def encodeResponseBody(self):
         """
         Encode the response body based on content type headers.
 
         """
         if type(self.__response_body) is str or type(self.__response_body) is unicode:
-            enc = None
-            if self.__response_headers.has_key('Content-type'):
-                elems = self.__response_headers['Content-type'].split("charset=")
-                # Check if an encoding was specified in the content type
-                if len(elems) == 2:
-                    (ct, enc) = elems
-            if not enc:
-                # We still don't have an encoding, so we use default
-                enc = "US-ASCII"
-            self.__response_body = self.__response_body.encode(enc)
+            self.__response_body = self.__response_body.encode(self.__getResponseEncoding())
         self.__response_encoded = True
         
     def sendResponse(self):
@@ -403,7 +489,10 @@ class JythonJavaHttpRequest(RestxHttpRequest):
         """
         Close this connection.
         
+        A streamed body that was never sent is closed as well.
+
         """
+        close_streamed_entity(self.__response_body)
         if self.__native_req:
             self.__native_req.close()  
 
@@ -458,6 +547,7 @@ class __HttpHandler(HttpHandler):
         ret_status = 500
         try:
             start_time = datetime.datetime.now()
+            scope = request_scope.begin()
             req = JythonJavaHttpRequest()
             req.setNativeRequest(native_request)            
             msg = "%s : %s : %s" % (req.getRequestProtocol(),
@@ -471,12 +561,15 @@ class __HttpHandler(HttpHandler):
                     req.setResponseHeader(name, headers[name])
             req.setResponse(result.getStatus(), result.getEntity())
             req.sendResponse()
-            native_request.close()
+            req.close()
             # This is something to improve: Sometimes we may get binary
             # data, which can't be converted to a string. In that case,
             # we should find other means to determine the size of the data.
             try:
-                l = len(str(result.getEntity()))
+                if is_streamed_entity(result.getEntity()):
+                    l = req.streamed_length
+                else:
+                    l = len(str(result.getEntity()))
             except:
                 pass
             ret_status = result.getStatus()
@@ -489,14 +582,16 @@ class __HttpHandler(HttpHandler):
             log("%s : Uncaught Java exception: %s" % (msg, e.msg))
 
         if not all_ok:
-            req.setResponse(500, "Internal Server Error")
-            req.sendResponse()
-            native_request.close()
+            if not req.headersSent():
+                req.setResponse(500, "Internal Server Error")
+                req.sendResponse()
+            req.close()
+        request_scope.end()
 
         end_time   = datetime.datetime.now()
         td         = end_time-start_time
         request_ms = td.seconds*1000 + td.microseconds//1000
-        log("%s : %sms : %s : %s" % (msg, request_ms, ret_status, l),
+        log("%s : %sms : %s : %s : memo %d/%d" % (msg, request_ms, ret_status, l, scope.hits, scope.hits + scope.misses),
                                      start_time = start_time, facility=LOGF_ACCESS_LOG)
 
 class JythonJavaHttpServer(BaseHttpServer):
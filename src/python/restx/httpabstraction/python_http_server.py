@@ -28,17 +28,23 @@ concrete HttpServer implementation later on.
 """
 
 # Python imports
+import os
 import sys
+import time
+import signal
+import socket
 import httplib
 import StringIO
 import traceback
 
 # RESTx imports
-import restx.settings as settings
+import restx.settings      as settings
+import restx.request_scope as request_scope
 
 from restx.logger import *
 
-from restx.httpabstraction.base_server import BaseHttpServer, RestxHttpRequest
+from restx.httpabstraction.base_server import BaseHttpServer, RestxHttpRequest, RequestBody, \
+                                              is_streamed_entity, close_streamed_entity
 
 from org.mulesoft.restx.component.api import HTTP
 
@@ -46,6 +52,63 @@ from restx.platform_specifics import *
 if PLATFORM == PLATFORM_PYTHON:
     from paste import httpserver
 
+    class _RestxWSGIHandler(httpserver.WSGIHandler):
+        """
+        Speaks HTTP/1.1, which is needed for chunked responses.
+
+        """
+        protocol_version = "HTTP/1.1"
+
+    class _RestxThreadPoolServer(httpserver.ThreadPoolMixIn, httpserver.WSGIServerBase):
+        """
+        A WSGI server with a pool of worker threads and a limited request queue.
+
+        The listening socket is created right away, but the worker threads
+        are only started by start_workers(). This allows the server to fork
+        worker processes that share the socket before any threads exist.
+
+        Requests that arrive while HTTP_QUEUE_LIMIT requests are already
+        waiting for a worker are answered with a 503 right away, instead of
+        piling up behind a saturated pool.
+
+        """
+        def __init__(self, wsgi_application, server_address, nworkers, queue_limit, backlog):
+            httpserver.WSGIServerBase.__init__(self, wsgi_application, server_address,
+                                               _RestxWSGIHandler, request_queue_size=backlog)
+            self.nworkers    = nworkers
+            self.queue_limit = queue_limit
+            self.running     = False
+
+        def start_workers(self):
+            """
+            Create the pool of worker threads for this process.
+
+            """
+            httpserver.ThreadPoolMixIn.__init__(self, self.nworkers, spawn_if_under=min(5, self.nworkers))
+
+        def process_request(self, request, client_address):
+            """
+            Hand the request to the worker pool, unless too many requests are waiting already.
+
+            """
+            if self.queue_limit  and  self.thread_pool.queue.qsize() >= self.queue_limit:
+                try:
+                    request.sendall(_SERVICE_UNAVAILABLE_RESPONSE)
+                except socket.error:
+                    pass
+                self.close_request(request)
+                log("Request from %s rejected: %d requests waiting for a worker" % \
+                                        (client_address[0], self.queue_limit))
+                return
+            httpserver.ThreadPoolMixIn.process_request(self, request, client_address)
+
+_SERVICE_UNAVAILABLE_RESPONSE = "HTTP/1.0 503 Service Unavailable\r\n" \
+                                "Content-Type: text/plain\r\n" \
+                                "Content-Length: 19\r\n" \
+                                "Retry-After: 1\r\n" \
+                                "Connection: close\r\n\r\n" \
+                                "Service Unavailable"
+
 class PythonHttpRequest(RestxHttpRequest):
     """
     Wrapper class around a concrete HTTP request representation.
@@ -61,16 +124,23 @@ class PythonHttpRequest(RestxHttpRequest):
     
     """
     __response_code    = None
+    __response_body    = None
     __request_headers  = None
-    __response_headers = dict()
+    __request_body     = None
+    __response_headers = None
     
     def __init__(self, environ, start_response):
         """
         Initialize request wrapper with the native request class.
         
         """
-        self.environ        = environ
-        self.start_response = start_response
+        self.environ            = environ
+        self.start_response     = start_response
+        self.write_callable     = None
+        self.streamed_length    = -1
+        self.__chunked          = False
+        # Requests are handled concurrently, so each one needs its own headers.
+        self.__response_headers = dict()
     
     def setResponseCode(self, code):
         """
@@ -98,6 +168,9 @@ class PythonHttpRequest(RestxHttpRequest):
         @type body:     string
         
         """
+        if self.__response_body is not body:
+            # A streamed body that is replaced before it was sent
+            close_streamed_entity(self.__response_body)
         self.__response_body = body
 
     def setResponseHeader(self, name, value):
@@ -187,8 +260,12 @@ class PythonHttpRequest(RestxHttpRequest):
         """
         if not self.__request_headers:
             self.__request_headers = dict()
-            if 'HTTP_ACCEPT' in self.environ:
-                self.__request_headers['Accept'] = self.environ['HTTP_ACCEPT'].split(";")
+            # Header names are normalized the same way as by the Java server
+            # ('If-none-match', 'Accept', ...), so that the code that looks
+            # them up works for both.
+            for key, value in self.environ.items():
+                if key.startswith("HTTP_"):
+                    self.__request_headers[key[5:].replace("_", "-").capitalize()] = [ value ]
             if 'CONTENT_TYPE' in self.environ:
                 self.__request_headers['Content-type'] = self.environ['CONTENT_TYPE'].split(";")
         return self.__request_headers
@@ -204,45 +281,104 @@ class PythonHttpRequest(RestxHttpRequest):
         query = self.environ['QUERY_STRING']
         return query
     
+    def getRequestBodyStream(self):
+        """
+        Return the body of the request message as a RequestBody object.
+
+        This allows the body to be read incrementally, which is useful for
+        large message bodies. Only POST and PUT requests have a body.
+
+        @return:    Body of the request.
+        @rtype:     RequestBody
+
+        """
+        if self.__request_body is None:
+            content_length = 0
+            if self.getRequestMethod() in [ HTTP.POST_METHOD, HTTP.PUT_METHOD ]:
+                # Without a content length we cannot safely read from
+                # the WSGI input, so there is no body as far as we know.
+                try:
+                    content_length = int(self.environ.get('CONTENT_LENGTH') or 0)
+                except ValueError:
+                    content_length = 0
+            self.__request_body = RequestBody(self.environ['wsgi.input'].read, content_length)
+        return self.__request_body
+
     def getRequestBody(self):
         """
         Return the body of the request message.
         
-        Note that this is not very suitable for streaming or large message bodies
-        at this point, since the entire message is read into a single string
-        before it is returned to the client.
+        The entire message is read into a single string before it is
+        returned. Use getRequestBodyStream() for large message bodies.
         
         @return:    Body of the request.
         @rtype:     string
         
         """
-        #buffered_reader = BufferedReader(InputStreamReader(self.__native_req.getRequestBody()));
-        if self.getRequestMethod() in [ HTTP.POST_METHOD, HTTP.PUT_METHOD ]:
-            fp = self.environ['wsgi.input']
-            lines = []
-            while True:
-                line = fp.readline()
-                if not line:
-                    break
-                lines.append(line)
-            return '\n'.join(lines)
-        else:
-            return ""
+        return self.getRequestBodyStream().readAll()
     
     def sendResponseHeaders(self):
         """
         Send the previously specified response headers and code.
         
-        """
+        If the response body is an iterator then its length is not known
+        up front. HTTP/1.1 clients get such a body with chunked transfer
+        encoding, older clients get it until the connection is closed.
         
+        """
+        headers = self.__response_headers.items()
+        if is_streamed_entity(self.__response_body):
+            self.__chunked = self.getRequestProtocol() == "HTTP/1.1"
+            if self.__chunked:
+                headers.append(("Transfer-Encoding", "chunked"))
         self.write_callable = self.start_response('%d %s' % (self.__response_code, httplib.responses[self.__response_code]),
-                                                   self.__response_headers.items())
+                                                   headers)
+    
+    def headersSent(self):
+        """
+        Return True if the response headers have been sent already.
+        
+        """
+        return self.write_callable is not None
+    
+    def __getResponseEncoding(self):
+        """
+        Return the character set from the Content-type header, or UTF-8.
+        
+        """
+        elems = self.__response_headers.get('Content-type', "").split("charset=")
+        if len(elems) == 2:
+            return elems[1]
+        return "UTF-8"
     
     def sendResponseBody(self):
         """
         Send the previously specified request body.
         
-        """
+        A body that is an iterator is sent chunk by chunk, as the
+        iterator produces the data. It is closed afterwards, even if
+        sending failed, so that it hands back what it holds on to.
+        
+        """
+        if is_streamed_entity(self.__response_body):
+            enc = self.__getResponseEncoding()
+            self.streamed_length = 0
+            try:
+                for chunk in self.__response_body:
+                    if type(chunk) is unicode:
+                        chunk = chunk.encode(enc)
+                    if not chunk:
+                        continue
+                    self.streamed_length += len(chunk)
+                    if self.__chunked:
+                        self.write_callable("%x\r\n%s\r\n" % (len(chunk), chunk))
+                    else:
+                        self.write_callable(chunk)
+                if self.__chunked:
+                    self.write_callable("0\r\n\r\n")
+            finally:
+                close_streamed_entity(self.__response_body)
+            return
         if not self.__response_body:
             self.__response_body = ""
         self.write_callable(self.__response_body)
@@ -262,8 +398,10 @@ class PythonHttpRequest(RestxHttpRequest):
         """
         Close this connection.
         
+        A streamed body that was never sent is closed as well.
+
         """
-        pass
+        close_streamed_entity(self.__response_body)
 
 
 class _HttpHandler(object):
@@ -276,27 +414,68 @@ class _HttpHandler(object):
         self.request_handler = request_handler
         
     def handle(self, environ, start_response):
+        """
+        Handle a single request.
+
+        Any exception that escapes the request handler is logged and answered
+        with a 500, so that one bad request does not affect any other request
+        or the server itself.
+
+        @param environ:          The WSGI environment of the request.
+        @type environ:           dict
+
+        @param start_response:   The WSGI start_response callable.
+        @type start_response:    callable
+
+        """
+        msg        = "-"
+        all_ok     = False
+        l          = -1
+        ret_status = 500
+        start_time = datetime.datetime.now()
+        req        = PythonHttpRequest(environ, start_response)
+        scope      = request_scope.begin()
         try:
-            start_time = datetime.datetime.now()
-            req = PythonHttpRequest(environ, start_response)            
             msg = "%s : %s : %s" % (req.getRequestProtocol(),
                                     req.getRequestMethod(),
                                     req.getRequestURI())
-            #log(msg, facility=LOGF_ACCESS_LOG)
-            code, response_body, headers = self.request_handler.handle(req)
-            for name, value in headers.items():
-                req.setResponseHeader(name, value)
-            req.setResponse(code, response_body)
+            result  = self.request_handler.handle(req)
+            headers = result.getHeaders()
+            if headers:
+                for name in headers.keySet():
+                    req.setResponseHeader(name, headers[name])
+            req.setResponse(result.getStatus(), result.getEntity())
             req.sendResponse()
             req.close()
-            end_time   = datetime.datetime.now()
-            td         = end_time-start_time
-            request_ms = td.seconds*1000 + td.microseconds//1000
-            log("%s : %sms : %s : %s" % (msg, request_ms, code, len(response_body)),
-                start_time = start_time, facility=LOGF_ACCESS_LOG)
+            try:
+                if is_streamed_entity(result.getEntity()):
+                    l = req.streamed_length
+                else:
+                    l = len(str(result.getEntity()))
+            except:
+                pass
+            ret_status = result.getStatus()
+            all_ok = True
         except Exception, e:
             print traceback.format_exc()
-            sys.exit(1)        
+            log("%s : Uncaught Python exception: %s" % (msg, str(e)))
+
+        if not all_ok:
+            if not req.headersSent():
+                # Nothing has been sent yet, so we can still tell the client.
+                try:
+                    req.setResponse(500, "Internal Server Error")
+                    req.sendResponse()
+                except Exception, e:
+                    log("%s : Could not send error response: %s" % (msg, str(e)))
+            req.close()
+        request_scope.end()
+
+        end_time   = datetime.datetime.now()
+        td         = end_time-start_time
+        request_ms = td.seconds*1000 + td.microseconds//1000
+        log("%s : %sms : %s : %s : memo %d/%d" % (msg, request_ms, ret_status, l, scope.hits, scope.hits + scope.misses),
+            start_time = start_time, facility=LOGF_ACCESS_LOG)
 
 
 # ----------------------------------------------------
@@ -317,13 +496,15 @@ class PythonHttpServer(BaseHttpServer):
     """
             
     __native_server = None
+    __children      = None
     
     def __init__(self, port, req_handler):
         """
         Initialize and start an HTTP server.
         
-        Uses the built-in simple HTTP server implementation that
-        comes with Python.
+        Uses the threaded WSGI server that comes with Paste. The number
+        of worker threads and processes and the request queue limit are
+        taken from the settings.
         
         @param port:            The port on which the server should listen.
         @type port:             int
@@ -336,6 +517,82 @@ class PythonHttpServer(BaseHttpServer):
         """
         global request_handler
         request_handler = req_handler
-        log("Listening for HTTP requests on port %d..." % port)
-        httpserver.serve(_app_method, host="0.0.0.0", port=port)
+        self.__native_server = _RestxThreadPoolServer(_app_method, ("0.0.0.0", port),
+                                                      settings.HTTP_WORKER_THREADS,
+                                                      settings.HTTP_QUEUE_LIMIT,
+                                                      settings.HTTP_LISTEN_BACKLOG)
+        processes = settings.HTTP_PROCESSES
+        if processes > 1  and  not hasattr(os, "fork"):
+            log("Cannot fork worker processes on this platform, using a single process")
+            processes = 1
+        log("Listening for HTTP requests on port %d (%d process(es) with %d worker threads each)..." % \
+                                        (port, processes, settings.HTTP_WORKER_THREADS))
+        if processes > 1:
+            self.__supervise(processes)
+        else:
+            self.__serve()
+
+    def __serve(self):
+        """
+        Start the worker threads and handle requests until interrupted.
+
+        """
+        self.__native_server.start_workers()
+        try:
+            self.__native_server.serve_forever()
+        except KeyboardInterrupt:
+            pass
 
+    def __fork_worker(self):
+        """
+        Fork a worker process, which serves requests on the shared socket.
+
+        @return:   Process ID of the new worker.
+        @rtype:    int
+
+        """
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            exit_code = 0
+            try:
+                self.__serve()
+            except:
+                print traceback.format_exc()
+                exit_code = 1
+            os._exit(exit_code)
+        return pid
+
+    def __supervise(self, processes):
+        """
+        Fork the worker processes and restart any that die unexpectedly.
+
+        The parent process does not handle requests itself. When it is
+        interrupted or terminated, all worker processes are terminated
+        as well.
+
+        @param processes:   Number of worker processes.
+        @type processes:    int
+
+        """
+        self.__children = [ self.__fork_worker() for i in range(processes) ]
+        def terminate(signum, frame):
+            raise KeyboardInterrupt()
+        signal.signal(signal.SIGTERM, terminate)
+        try:
+            try:
+                while True:
+                    pid, status = os.wait()
+                    if pid in self.__children:
+                        log("Worker process %d exited with status %d, starting a new one" % (pid, status))
+                        self.__children.remove(pid)
+                        time.sleep(1)     # Don't spin if workers die right away
+                        self.__children.append(self.__fork_worker())
+            except KeyboardInterrupt:
+                pass
+        finally:
+            for pid in self.__children:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except OSError:
+                    pass
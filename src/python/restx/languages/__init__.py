@@ -36,6 +36,7 @@ conversion function whenever we use the components.
 """
 
 from restx.platform_specifics         import PLATFORM, PLATFORM_JYTHON
+from restx.core.table                 import Table
 
 from org.mulesoft.restx.exception     import *
 from org.mulesoft.restx.component.api import HTTP, HttpMethod, Result
@@ -95,7 +96,8 @@ def __pythonStructToJava(obj):
         elem = HashMap()
         for key, value in obj.items():
             elem.put(key, __pythonStructToJava(value))
-    elif type(obj) is list:
+    elif type(obj) is list  or  isinstance(obj, Table):
+        # A table becomes a list of maps, one per row
         elem = ArrayList()
         for e in obj:
             elem.add(__pythonStructToJava(e))
@@ -224,12 +226,21 @@ def __pythonServiceMethodProxy(component, request, method, method_name, input, p
     # assign them directly to the component as new attributes. After that,
     # the pruned parameter map can be passed as keyword arg dict to the
     # service method.
-    for name in component.PARAM_DEFINITION.keys():
+    #
+    # Resources that were created before an optional parameter was added
+    # to the component don't have it in their stored definition. Those get
+    # the default value.
+    for name, pdef in component.PARAM_DEFINITION.items():
         if name in params:
             if hasattr(component, name):
                 raise RestxException("Name '%s' cannot be assigned to component, because an attribute with that name exists already" % name)
             setattr(component, name, params[name])
             del params[name]
+        elif not pdef.required  and  pdef.default is not None  and  not hasattr(component, name):
+            if pdef.is_list:
+                setattr(component, name, [ pdef.default ])
+            else:
+                setattr(component, name, pdef.default)
     return method(http_method, input, **params)
 
 #
@@ -18,6 +18,10 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 """
 
+import restx.settings as settings
+
+from restx.core.table import Table
+
 
 class BaseRenderer(object):
     """
@@ -31,6 +35,15 @@ class BaseRenderer(object):
     CAN_RENDER = True
     CAN_PARSE  = True
 
+    # A child class that can produce its output incrementally,
+    # without holding all of it in memory, sets this flag and
+    # overrides render_iter().
+    CAN_STREAM = False
+
+    # A child class that renders Table objects itself sets this flag.
+    # Other renderers get a Table as a list of dictionaries.
+    CAN_RENDER_TABLE = False
+
     def __init__(self, renderer_args=None):
         """
         The calling context can pass in some arguments
@@ -74,8 +87,41 @@ class BaseRenderer(object):
             # No special rendering, just plain output.
             return data
         else:
+            if isinstance(data, Table)  and  not self.CAN_RENDER_TABLE:
+                data = data.asList()
             return self.render(data, top_level)
         
+    def base_render_iter(self, data, top_level=False):
+        """
+        Call the incremental render method of the child renderer.
+
+        Same as base_renderer(), except that an iterator over chunks of
+        the output is returned.
+
+        @param data:        An object or iterator containing the data to be rendered.
+        @param data:        object
+
+        @param top_level:   Flag indicating whether this we are at the top level for output.
+        @param top_level:   boolean
+
+        @return:            Iterator over the chunks of the output.
+        @rtype:             iterator
+
+        """
+        if self.renderer_args.get('raw'):
+            return iter([ data ]) if type(data) in [ str, unicode ] else iter(data)
+        else:
+            if isinstance(data, Table)  and  not self.CAN_RENDER_TABLE:
+                data = data.asList()
+            return self.render_iter(data, top_level)
+
+    def canStream(self):
+        """
+        Return 'True' if this renderer can render output incrementally.
+
+        """
+        return self.CAN_STREAM
+
     def canRender(self):
         """
         Return 'True' if this renderer can render output.
@@ -112,6 +158,54 @@ class BaseRenderer(object):
         pass
 
 
+    def render_iter(self, data, top_level=False):
+        """
+        Take object or iterator and produce output in chunks.
+
+        Renderers that don't set CAN_STREAM just render everything at once
+        and return it as a single chunk. Iterators are turned into lists
+        for that.
+
+        @param data:        An object or iterator containing the data to be rendered.
+        @param data:        object
+
+        @param top_level:   Flag indicating whether this we are at the top level for output.
+        @param top_level:   boolean
+
+        @return:            Iterator over the chunks of the output.
+        @rtype:             iterator
+
+        """
+        if hasattr(data, "next")  and  type(data) not in [ list, tuple, dict ]:
+            data = list(data)
+        yield self.render(data, top_level)
+
+    def _batched(self, pieces):
+        """
+        Combine small pieces of output into chunks of RESPONSE_CHUNK_SIZE.
+
+        Used by render_iter() implementations, so that we don't send a
+        separate chunk for every list element.
+
+        @param pieces:      Iterator over strings.
+        @type pieces:       iterator
+
+        @return:            Iterator over larger strings.
+        @rtype:             iterator
+
+        """
+        buf  = []
+        size = 0
+        for piece in pieces:
+            buf.append(piece)
+            size += len(piece)
+            if size >= settings.RESPONSE_CHUNK_SIZE:
+                yield "".join(buf)
+                buf  = []
+                size = 0
+        if buf:
+            yield "".join(buf)
+
     def parse(self, data):
         """
         Take input in this renderer's format and produce an object.
@@ -18,12 +18,17 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 """
 
+import itertools
+
 from copy import copy
 
 from restx.render.baserenderer import BaseRenderer
+from restx.core.table          import Table
 from org.mulesoft.restx.util   import Url
 from restx.core.util           import bool_view
 
+from org.mulesoft.restx.exception import RestxException
+
 #
 # The CSV renderer will only work if it gets a list of dictionaries
 # or a list of lists.
@@ -35,6 +40,8 @@ from restx.core.util           import bool_view
 # list determines the number of overall columns. The column names will
 # in that case simply be "column_1", "column_2", etc.
 #
+# A Table is rendered with its own column names, in its own order.
+#
 # Any first-level list elements that are not of the required format
 # will be ignored.
 # 
@@ -48,8 +55,10 @@ class CsvRenderer(BaseRenderer):
     
     """
 
-    CONTENT_TYPE = "text/csv"
-    CAN_PARSE    = False
+    CONTENT_TYPE     = "text/csv"
+    CAN_PARSE        = False
+    CAN_STREAM       = True
+    CAN_RENDER_TABLE = True
 
     def render(self, data, top_level=False):
         """
@@ -72,14 +81,45 @@ class CsvRenderer(BaseRenderer):
         @rtype:             string
         
         """
-        if type(data) not in [ list, tuple ]:
+        return "".join(self.render_iter(data, top_level))
+
+    def render_iter(self, data, top_level=False):
+        """
+        Render the provided data for output, in chunks.
+
+        Works on lists as well as iterators, one row at a time.
+
+        @param data:        A list or iterator of rows.
+        @param data:        object
+
+        @param top_level:   Flag indicating whether we are at the top level
+                            for output. Ignored by the CSV renderer.
+        @param top_level:   boolean
+
+        @return:            Iterator over chunks of the output.
+        @rtype:             iterator
+
+        """
+        if isinstance(data, Table):
+            rows = data.getRows()
+            try:
+                first_row = rows.next()
+            except StopIteration:
+                return iter([])
+            return self._batched(self.__row_pieces(data.getColumnNames(), True, first_row, rows))
+
+        if type(data) not in [ list, tuple ]  and  not hasattr(data, "next"):
             raise RestxException("CsvRenderer: Data type '%s' not suitable for CSV renderer." % str(type(data)))
 
         #
         # Determine the type of data we have here, list of lists or list of dicts.
         # Determine the column names accordingly.
         #
-        first_row = data[0]
+        rows = iter(data)
+        try:
+            first_row = rows.next()
+        except StopIteration:
+            return iter([])
         if type(first_row) is dict:
             keys = first_row.keys()
             keys.sort()
@@ -90,17 +130,21 @@ class CsvRenderer(BaseRenderer):
         else:
             raise RestxException("CsvRenderer: First row is neither dict nor list, but '%s'." % str(type(first_row)))
 
-        out = ';'.join(keys) + "\n"
+        return self._batched(self.__row_pieces(keys, list_type, first_row, rows))
+
+    def __row_pieces(self, keys, list_type, first_row, rows):
+        """
+        Produce the header and then one line of CSV output per row.
+
+        """
+        yield ';'.join(keys) + "\n"
 
-        for row in data:
+        for row in itertools.chain([ first_row ], rows):
             try:
                 if list_type:
-                    out += ';'.join([ str(c) for c in row ]) + "\n"
+                    yield ';'.join([ str(c) for c in row ]) + "\n"
                 else:
-                    out += ';'.join([ str(row.get(cname, "")) for cname in keys ]) + "\n"
+                    yield ';'.join([ str(row.get(cname, "")) for cname in keys ]) + "\n"
             except:
                 # Silently ignore any issues
                 pass
-
-        return out
-
@@ -113,7 +113,7 @@ class HtmlRenderer(BaseRenderer):
                     segments.append(name)
             return " > ".join(segments)            
             
-    def __dict_render(self, data):
+    def __dict_render(self, data, out):
         """
         Take Python dictionary and produce HTML output.
         
@@ -121,9 +121,11 @@ class HtmlRenderer(BaseRenderer):
         
         @param data:    A dictionary that needs to be rendered in HTML.
         @type  data:    dict
-        
-        @return:        HTML representation of the dictionary.
-        @rtype:         string        
+
+        @param out:     The output buffer, to which the HTML representation
+                        of the dictionary is appended.
+        @type  out:     list
+
         """
         annotation   = "<i>Object</i><br/>\n" if self.draw_annotations else ""
 
@@ -132,21 +134,20 @@ class HtmlRenderer(BaseRenderer):
         # in specific positions, but for now, we just sort the
         # items alphabetically.
         keys.sort()
-        out = "%s<table border=%d cellspacing=0>\n" % (annotation, self.border_width)
+        out.append("%s<table border=%d cellspacing=0>\n" % (annotation, self.border_width))
         if self.table_headers:
             # For the time being, we won't render table headers, since they look a
             # bit clunky. If we want them to go back in, just uncomment this line.
-            #out += '<tr><td class="dict"><i>Key</i></td><td class="dict"><i>Value</i></td></tr>\n'
+            #out.append('<tr><td class="dict"><i>Key</i></td><td class="dict"><i>Value</i></td></tr>\n')
             pass
         for key in keys:
-            out += '<tr>\n<td id="%s_name" class="key" valign=top>%s</td>\n<td id="%s_value" valign=top>' % \
-                                            (key, key.as_html() if type(key) is Url else key, key)
-            out += self.render(data[key])
-            out += "\n</td>\n</tr>"
-        out += "</table>"
-        return out
+            out.append('<tr>\n<td id="%s_name" class="key" valign=top>%s</td>\n<td id="%s_value" valign=top>' % \
+                                            (key, key.as_html() if type(key) is Url else key, key))
+            self.__write(data[key], out)
+            out.append("\n</td>\n</tr>")
+        out.append("</table>")
     
-    def __list_render(self, data):
+    def __list_render(self, data, out):
         """
         Take Python list and produce HTML output.
         
@@ -154,21 +155,22 @@ class HtmlRenderer(BaseRenderer):
         
         @param data:    A list that needs to be rendered in HTML.
         @type  data:    list
-        
-        @return:        HTML representation of the list.
-        @rtype:         string
-        
+
+        @param out:     The output buffer, to which the HTML representation
+                        of the list is appended.
+        @type  out:     list
+
         """
         annotation   = "<i>List</i><br/>\n" if self.draw_annotations else ""
-        out = "%s<table border=%d cellspacing=0>" % (annotation, self.border_width)
+        out.append("%s<table border=%d cellspacing=0>" % (annotation, self.border_width))
         for i, elem in enumerate(data):
             if self.draw_indices:
-                index_column = "<td valign=top>%d</td>" % i
+                out.append("<tr><td valign=top>%d</td><td valign=top>" % i)
             else:
-                index_column = ""
-            out += "<tr>%s<td valign=top>%s</td></tr>" % (index_column, self.render(elem))
-        out += "</table>"
-        return out
+                out.append("<tr><td valign=top>")
+            self.__write(elem, out)
+            out.append("</td></tr>")
+        out.append("</table>")
     
     def __plain_render(self, data):
         """
@@ -217,6 +219,21 @@ class HtmlRenderer(BaseRenderer):
                 out = '<span class="string">%s</span>' % data_str.replace("\n\n", "<br/>")
         return out
 
+    def __write(self, data, out):
+        """
+        Append the HTML representation of any object to the output buffer.
+
+        The recursion for nested lists and dictionaries shares a single
+        output list, which is joined once in render().
+
+        """
+        if type(data) is dict:
+            self.__dict_render(data, out)
+        elif type(data) in [ list, tuple ]:
+            self.__list_render(data, out)
+        else:
+            out.append(self.__plain_render(data))
+
     def render(self, data, top_level=False):
         """
         Take Python object and produce HTML output.
@@ -238,13 +255,9 @@ class HtmlRenderer(BaseRenderer):
         @rtype:             string
             
         """
-        out = ""
-        if type(data) is dict:
-            out += self.__dict_render(data)
-        elif type(data) in [ list, tuple ]:
-            out += self.__list_render(data)
-        else:
-            out += self.__plain_render(data)
+        out = []
+        self.__write(data, out)
+        out = "".join(out)
         if top_level:
             out = "%s%s%s" % (self.header, unicode(out, encoding="utf_8"), settings.HTML_FOOTER)
         return out
@@ -27,7 +27,11 @@ Outputs JSON representation of data.
 import restxjson as json
 
 # RESTx imports
+import restx.settings as settings
+
 from restx.render.baserenderer import BaseRenderer
+from restx.core.table          import Table
+from restx.logger              import *
 
 from restx.platform_specifics  import *
 
@@ -47,6 +51,9 @@ def _default(obj):
     @return:       String representation suitable for JSON.
     
     """
+    if isinstance(obj, Table):
+        # Rendered like the list of dictionaries it stands for
+        return list(obj.getRecords())
     return str(obj)
 
 def _recursive_type_fixer(obj):
@@ -62,6 +69,8 @@ def _recursive_type_fixer(obj):
     FIX_TYPES = [ Url ]
     if type(obj) in FIX_TYPES:
         return str(obj)
+    if isinstance(obj, Table):
+        obj = list(obj.getRecords())
     if type(obj) is list:
         new_list = []
         for e in obj:
@@ -79,14 +88,120 @@ def _recursive_type_fixer(obj):
             new_dict[k] = v
         return new_dict
     return obj
-        
+
+
+class _BuiltinCompactEncoder(object):
+    """
+    Produces compact JSON with the json module.
+
+    Without indentation and key sorting the json module can use its C
+    encoder, if there is one on this platform. The encoder object holds
+    no per-call state, so one instance is shared by all requests.
+
+    """
+    def __init__(self):
+        if PLATFORM == PLATFORM_GAE:
+            self.__encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+        else:
+            self.__encoder = json.JSONEncoder(ensure_ascii=False, default=_default, separators=(",", ":"))
+
+    def encode(self, data):
+        if PLATFORM == PLATFORM_GAE:
+            data = _recursive_type_fixer(data)
+        return self.__encoder.encode(data)
+
+
+class _JacksonCompactEncoder(object):
+    """
+    Produces compact JSON with Jackson, under Jython.
+
+    Jython's dictionaries and lists are java.util.Map and java.util.List
+    objects, which Jackson serializes directly, and Url objects are written
+    with their toString(). Data containing other types (Python objects
+    that only the 'default' function knows how to render) is handed to the
+    json module instead.
+
+    """
+    __SAFE_TYPES = ( str, unicode, int, long, float, bool, type(None), Url )
+
+    def __init__(self):
+        from com.fasterxml.jackson.databind         import ObjectMapper
+        from com.fasterxml.jackson.databind.module  import SimpleModule
+        from com.fasterxml.jackson.databind.ser.std import ToStringSerializer
+
+        module = SimpleModule("restx")
+        module.addSerializer(Url, ToStringSerializer.instance)
+        self.__mapper = ObjectMapper()
+        self.__mapper.registerModule(module)
+        self.__fallback = _BuiltinCompactEncoder()
+
+    def __is_safe(self, data):
+        """
+        Return True if Jackson can serialize everything in the data.
+
+        """
+        safe_types = self.__SAFE_TYPES
+        todo = [ data ]
+        while todo:
+            obj = todo.pop()
+            if type(obj) is dict:
+                todo.extend(obj.itervalues())
+            elif type(obj) in [ list, tuple ]:
+                todo.extend(obj)
+            elif type(obj) not in safe_types:
+                return False
+        return True
+
+    def encode(self, data):
+        if self.__is_safe(data):
+            return self.__mapper.writeValueAsString(data)
+        return self.__fallback.encode(data)
+
+
+# The available encoders for compact output, selected by the
+# JSON_ENCODER_BACKEND setting.
+COMPACT_ENCODERS = {
+    "builtin" : _BuiltinCompactEncoder,
+    "jackson" : _JacksonCompactEncoder,
+}
+
+_compact_encoder = None
+
+def _get_compact_encoder():
+    """
+    Return the encoder for compact output, creating it on first use.
+
+    With the "auto" backend we try Jackson under Jython and use the json
+    module if Jackson is not on the classpath.
+
+    """
+    global _compact_encoder
+    if _compact_encoder is None:
+        backend = settings.JSON_ENCODER_BACKEND
+        if backend == "auto":
+            encoder = None
+            if PLATFORM == PLATFORM_JYTHON:
+                try:
+                    encoder = _JacksonCompactEncoder()
+                except ImportError:
+                    pass
+            if encoder is None:
+                encoder = _BuiltinCompactEncoder()
+        else:
+            encoder = COMPACT_ENCODERS[backend]()
+        log("Using '%s' for compact JSON output" % encoder.__class__.__name__)
+        _compact_encoder = encoder
+    return _compact_encoder
+
 
 class JsonRenderer(BaseRenderer):
     """
     Class to render data as JSON.
         
     """
-    CONTENT_TYPE = "application/json; charset=UTF-8"
+    CONTENT_TYPE     = "application/json; charset=UTF-8"
+    CAN_STREAM       = True
+    CAN_RENDER_TABLE = True
 
     def render(self, data, top_level=False):
         """
@@ -109,6 +224,13 @@ class JsonRenderer(BaseRenderer):
         @rtype:             string
         
         """
+        if isinstance(data, Table):
+            # Rendered row by row, without building the list of dictionaries
+            return "".join(self.__list_pieces(data.getRecords()))
+
+        if self.__compact():
+            return _get_compact_encoder().encode(data)
+
         # simplejson can only handle some of the base Python datatypes.
         # Since we also have other types in the output dictionaries (URIs
         # for example), we need to provide a 'default' method, which
@@ -128,6 +250,71 @@ class JsonRenderer(BaseRenderer):
 
         return out
 
+    def __compact(self):
+        """
+        Return True if compact output was requested for this response.
+
+        """
+        return self.renderer_args.get('compact', settings.JSON_COMPACT_OUTPUT)
+
+    def render_iter(self, data, top_level=False):
+        """
+        Render the provided data for output, in chunks.
+
+        Lists, tables and iterators are rendered one element at a time, so
+        that the complete output never has to be held in memory. Anything
+        else is rendered in one go.
+
+        @param data:        An object or iterator containing the data to be rendered.
+        @param data:        object
+
+        @param top_level:   Flag indicating whether this we are at the top level
+                            for output. Ignored by the JSON renderer.
+        @param top_level:   boolean
+
+        @return:            Iterator over chunks of the output.
+        @rtype:             iterator
+
+        """
+        if isinstance(data, Table):
+            return self._batched(self.__list_pieces(data.getRecords()))
+        elif type(data) in [ list, tuple ]  or  (hasattr(data, "next")  and  type(data) is not dict):
+            return self._batched(self.__list_pieces(data))
+        else:
+            return iter([ self.render(data, top_level) ])
+
+    def __list_pieces(self, data):
+        """
+        Produce the JSON representation of a list element by element.
+
+        """
+        if self.__compact():
+            yield "["
+            first = True
+            for elem in data:
+                if first:
+                    first = False
+                else:
+                    yield ","
+                yield self.render(elem)
+            yield "]"
+            return
+
+        first = True
+        for elem in data:
+            if first:
+                yield "[\n    "
+                first = False
+            else:
+                yield ", \n    "
+            # JSON strings can't contain literal line breaks, so this
+            # only indents the lines of the element's representation.
+            yield self.render(elem).replace("\n", "\n    ")
+        if first:
+            yield "[]"
+        else:
+            yield "\n]"
+
     def parse(self, data):
         """
         Take input in this renderer's format and produce an object.
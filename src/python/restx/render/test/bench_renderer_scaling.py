@@ -0,0 +1,94 @@
+"""
+RESTx: Sane, simple and effective data publishing and integration. 
+
+Copyright (C) 2010   MuleSoft Inc.    http://www.mulesoft.com
+
+This program is free software: you can redistribute it and/or modify 
+it under the terms of the GNU General Public License as published by 
+the Free Software Foundation, either version 3 of the License, or 
+(at your option) any later version. 
+
+This program is distributed in the hope that it will be useful, 
+but WITHOUT ANY WARRANTY; without even the implied warranty of 
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the 
+GNU General Public License for more details. 
+
+You should have received a copy of the GNU General Public License 
+along with this program.  If not, see <http://www.gnu.org/licenses/>. 
+
+"""
+
+#
+# This is a benchmark rather than a functional test: It renders results
+# of growing size and checks that the time per row stays roughly the
+# same, which it wouldn't if the output was built by repeated string
+# concatenation.
+#
+# Since its name doesn't start with 'test_', bin/testrun doesn't run it
+# with the other test files. Run it on its own with:
+#
+#     bin/testrun restx/render/test/bench_renderer_scaling.py
+#
+
+import time
+
+# This needs to be imported by all tests
+from restx.testtools.utils  import *
+
+# Importing the code we wish to test
+from restx.render           import CsvRenderer, XmlRenderer, HtmlRenderer
+
+
+ROW_COUNTS = [ 1000, 10000, 100000, 1000000 ]
+
+# How much slower per row the largest result may be rendered, compared
+# to the smallest one we measure. The smallest count is only used to
+# warm up, since timings for it are dominated by noise.
+MAX_SLOWDOWN = 3.0
+
+
+def _make_rows(num):
+    return [ { "id" : i, "name" : "name_%d" % i, "value" : i * 1.5 } for i in xrange(num) ]
+
+def _time_render(renderer, data):
+    start = time.time()
+    renderer.render(data, False)
+    return time.time() - start
+
+def _check_scaling(name, make_renderer):
+    per_row = []
+    for num in ROW_COUNTS:
+        data    = _make_rows(num)
+        elapsed = _time_render(make_renderer(), data)
+        per_row.append(elapsed / num)
+        print "---     %-5s %8d rows: %8.3f sec  (%.2f usec per row)" % (name, num, elapsed, elapsed * 1000000 / num)
+        del data
+    slowdown = per_row[-1] / max(per_row[1], 0.0000001)
+    if slowdown > MAX_SLOWDOWN:
+        return "Time per row grew by factor %.1f from %d to %d rows" % (slowdown, ROW_COUNTS[1], ROW_COUNTS[-1])
+    return None
+
+
+# =====================================
+# Benchmarking the renderer output size
+# =====================================
+
+def runtest():
+
+    #
+    # Test 1: CSV output scales linearly
+    #
+    test_evaluator("Test 1", _check_scaling("csv", lambda: CsvRenderer()))
+
+    #
+    # Test 2: XML output scales linearly
+    #
+    test_evaluator("Test 2", _check_scaling("xml", lambda: XmlRenderer()))
+
+    #
+    # Test 3: HTML output scales linearly
+    #
+    test_evaluator("Test 3", _check_scaling("html", lambda: HtmlRenderer({ "breadcrumbs" : [ ("Home", "/") ] })))
+
+    return get_test_result()
+
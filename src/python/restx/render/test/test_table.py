@@ -0,0 +1,95 @@
+"""
+RESTx: Sane, simple and effective data publishing and integration.
+
+Copyright (C) 2010   MuleSoft Inc.    http://www.mulesoft.com
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+#
+# To run this and other RESTx test files, use bin/testrun.
+#
+
+# This needs to be imported by all tests
+from restx.testtools.utils  import *
+
+# Importing the code we wish to test
+from restx.core.table       import Table
+from restx.render           import JsonRenderer, CsvRenderer, XmlRenderer, TextRenderer
+
+from org.mulesoft.restx.exception import RestxException
+
+
+# ===========================================
+# Testing tables and how they are rendered
+# ===========================================
+
+def runtest():
+
+    records = [ { "name" : "Alice", "city" : "Berlin", "amount" : 120 },
+                { "name" : "Bob",   "city" : None,     "amount" : 80 } ]
+    table   = Table([ "name", "city", "amount" ], [ [ "Alice", "Bob" ], [ "Berlin", None ], [ 120, 80 ] ])
+
+    #
+    # Test 1: The table can be used like a list of dictionaries
+    #
+    test_evaluator("Test 1", compare_elem(table.numRows(), 2))
+    test_evaluator("Test 1", compare_elem(table.getColumn("amount"), [ 120, 80 ]))
+    test_evaluator("Test 1", compare_elem(list(table), records))
+    test_evaluator("Test 1", compare_elem(table[1], records[1]))
+    test_evaluator("Test 1", compare_elem(list(table.getRows()), [ ("Alice", "Berlin", 120), ("Bob", None, 80) ]))
+    test_evaluator("Test 1", compare_elem(list(Table.fromRecords(records)), records))
+    test_evaluator("Test 1", compare_elem(list(Table.fromRows([ "name", "city", "amount" ], [ r for r in table.getRows() ])), records))
+
+    #
+    # Test 2: Selecting rows
+    #
+    test_evaluator("Test 2", compare_elem(list(table.select([ False, True ])), [ records[1] ]))
+    test_evaluator("Test 2", compare_elem(table.select([ False, False ]).numRows(), 0))
+
+    #
+    # Test 3: The columns need to have the same length
+    #
+    try:
+        Table([ "a", "b" ], [ [ 1, 2 ], [ 1 ] ])
+        test_evaluator("Test 3", "Expected an exception")
+    except RestxException, e:
+        test_evaluator("Test 3", None)
+
+    #
+    # Test 4: JSON and XML output is the same as for the list of dictionaries
+    #
+    for r in [ JsonRenderer(), JsonRenderer(dict(compact=True)), XmlRenderer() ]:
+        test_evaluator("Test 4", compare_elem(r.render(table, True), r.render(records, True)))
+        test_evaluator("Test 4", compare_elem("".join(r.render_iter(table, True)), r.render(records, True)))
+    r = XmlRenderer()
+    test_evaluator("Test 4", compare_elem(r.render(dict(rows=table), True), r.render(dict(rows=records), True)))
+    r = JsonRenderer()
+    test_evaluator("Test 4", compare_elem(r.render(dict(rows=table), True), r.render(dict(rows=records), True)))
+
+    #
+    # Test 5: CSV output uses the columns of the table
+    #
+    r = CsvRenderer()
+    test_evaluator("Test 5", compare_elem(r.render(table), "name;city;amount\nAlice;Berlin;120\nBob;None;80\n"))
+
+    #
+    # Test 6: Other renderers get a list of dictionaries
+    #
+    r = TextRenderer()
+    test_evaluator("Test 6", compare_elem(r.base_renderer(table, False), r.base_renderer(records, False)))
+
+    return get_test_result()
+
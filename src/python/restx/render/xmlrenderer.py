@@ -21,6 +21,7 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 from copy import copy
 
 from restx.render.baserenderer import BaseRenderer
+from restx.core.table          import Table
 from org.mulesoft.restx.util   import Url
 from restx.core.util           import bool_view
 
@@ -31,16 +32,14 @@ class XmlRenderer(BaseRenderer):
     
     """
 
-    CONTENT_TYPE = "application/xml; charset=UTF-8"
-    CAN_PARSE    = False
+    CONTENT_TYPE     = "application/xml; charset=UTF-8"
+    CAN_PARSE        = False
+    CAN_STREAM       = True
+    CAN_RENDER_TABLE = True
 
     __indent_spaces = "    "
 
-    def __init__(self, renderer_args=None):
-        super(XmlRenderer, self).__init__(renderer_args)
-        self.__indent_level = 0
-
-    def __dict_render(self, data):
+    def __dict_render(self, data, level, out):
         """
         Take Python dictionary and produce XML output.
         
@@ -48,26 +47,29 @@ class XmlRenderer(BaseRenderer):
         
         @param data:    A dictionary that needs to be rendered in XML.
         @type  data:    dict
-        
-        @return:        XML representation of the dictionary.
-        @rtype:         string        
+
+        @param level:   The indentation level of the dictionary.
+        @type  level:   int
+
+        @param out:     The output buffer, to which the XML representation
+                        of the dictionary is appended.
+        @type  out:     list
+
         """
         keys = copy(data.keys())
         # In the future we might want to display particular items
         # in specific positions, but for now, we just sort the
         # items alphabetically.
         keys.sort()
-        out = ""
-        indent = self.__indent_level * self.__indent_spaces
+        indent = level * self.__indent_spaces
         for key in keys:
             key_str = str(key).replace(" ", "_")
-            out += indent + "<%s>\n" % key_str
-            out += self.render(data[key])
-            out += indent + "</%s>\n" % key_str
-        return out
+            out.append(indent + "<%s>\n" % key_str)
+            self.__write(data[key], level+1, out)
+            out.append(indent + "</%s>\n" % key_str)
 
 
-    def __list_render(self, data):
+    def __list_render(self, data, level, out):
         """
         Take Python list and produce XML output.
         
@@ -75,23 +77,60 @@ class XmlRenderer(BaseRenderer):
         
         @param data:    A list that needs to be rendered in HTML.
         @type  data:    list
-        
-        @return:        XML representation of the list.
-        @rtype:         string
-        
+
+        @param level:   The indentation level of the list.
+        @type  level:   int
+
+        @param out:     The output buffer, to which the XML representation
+                        of the list is appended.
+        @type  out:     list
+
+        """
+        indent      = level * self.__indent_spaces
+        indent_plus = indent + self.__indent_spaces
+        out.append(indent + "<rxlist>\n")
+        for elem in data:
+            out.append(indent_plus + "<rxitem>\n")
+            self.__write(elem, level+2, out)
+            out.append(indent_plus + "</rxitem>\n")
+        out.append(indent + "</rxlist>\n")
+
+
+    def __table_items(self, data, level):
+        """
+        Produce the XML of each row of a table, as items of a list.
+
+        The rows look just like dictionaries in a list, but the order and
+        the tags of the columns are only worked out once.
+
+        @param data:    A table that needs to be rendered in XML.
+        @type  data:    Table
+
+        @param level:   The indentation level of the list.
+        @type  level:   int
+
+        @return:        Iterator over the XML of the rows.
+        @rtype:         iterator
+
         """
-        indent = self.__indent_level * self.__indent_spaces
-        out = indent + "<rxlist>\n"
-        self.__indent_level += 1
-        indent_plus = self.__indent_level * self.__indent_spaces
-        for i, elem in enumerate(data):
-            out += "%s<rxitem>\n%s%s</rxitem>\n" % (indent_plus, self.render(elem), indent_plus)
-        out += indent + "</rxlist>\n"
-        self.__indent_level -= 1
-        return out
+        names       = data.getColumnNames()
+        order       = range(len(names))
+        order.sort(lambda x, y: cmp(names[x], names[y]))
+        indent_plus = (level + 1) * self.__indent_spaces
+        indent_key  = (level + 2) * self.__indent_spaces
+        tags        = [ (i, indent_key + "<%s>\n" % str(names[i]).replace(" ", "_"),
+                            indent_key + "</%s>\n" % str(names[i]).replace(" ", "_")) for i in order ]
+        for row in data.getRows():
+            out = [ indent_plus + "<rxitem>\n" ]
+            for i, start_tag, end_tag in tags:
+                out.append(start_tag)
+                self.__write(row[i], level+3, out)
+                out.append(end_tag)
+            out.append(indent_plus + "</rxitem>\n")
+            yield "".join(out)
 
 
-    def __plain_render(self, data):
+    def __plain_render(self, data, level):
         """
         Take a non-list, non-dict Python object and produce XML.
         
@@ -99,6 +138,9 @@ class XmlRenderer(BaseRenderer):
         
         @param data:    A Python object
         @type  data:    object
+
+        @param level:   The indentation level of the object.
+        @type  level:   int
         
         @return:        XML representation of the object.
         @rtype:         string
@@ -121,7 +163,29 @@ class XmlRenderer(BaseRenderer):
             out = data_str
         if not out.endswith("\n"):
             out += "\n"
-        return self.__indent_level * self.__indent_spaces + out
+        return level * self.__indent_spaces + out
+
+
+    def __write(self, data, level, out):
+        """
+        Append the XML representation of any object to the output buffer.
+
+        All of the output is collected in a single list, which is joined
+        only once at the end. Concatenating the strings on the way back up
+        from the recursion would copy the output over and over again.
+
+        """
+        if type(data) is dict:
+            self.__dict_render(data, level, out)
+        elif type(data) in [ list, tuple ]:
+            self.__list_render(data, level, out)
+        elif isinstance(data, Table):
+            indent = level * self.__indent_spaces
+            out.append(indent + "<rxlist>\n")
+            out.extend(self.__table_items(data, level))
+            out.append(indent + "</rxlist>\n")
+        else:
+            out.append(self.__plain_render(data, level))
 
 
     def render(self, data, top_level=False):
@@ -145,20 +209,65 @@ class XmlRenderer(BaseRenderer):
         @rtype:             string
         
         """
-        self.__indent_level += 1
+        out = []
         if top_level:
-            out = '<?xml version="1.0" encoding="UTF-8" ?>\n<rxdoc>\n'
-        else:
-            out = ""
-        if type(data) is dict:
-            out += self.__dict_render(data)
-        elif type(data) in [ list, tuple ]:
-            out += self.__list_render(data)
-        else:
-            out += self.__plain_render(data)
+            out.append('<?xml version="1.0" encoding="UTF-8" ?>\n<rxdoc>\n')
+        self.__write(data, 1, out)
         if top_level:
-            out += "</rxdoc>\n"
+            out.append("</rxdoc>\n")
+        return "".join(out)
+
+    def render_iter(self, data, top_level=False):
+        """
+        Render the provided data for output, in chunks.
+
+        A top level list, table or iterator is rendered one element at a time,
+        so that the complete output never has to be held in memory. Anything
+        else is rendered in one go.
+
+        @param data:        An object or iterator containing the data to be rendered.
+        @param data:        object
+
+        @param top_level:   Flag indicating whether we are at the top level for output.
+        @param top_level:   boolean
+
+        @return:            Iterator over chunks of the output.
+        @rtype:             iterator
+
+        """
+        if top_level  and  isinstance(data, Table):
+            return self._batched(self.__table_pieces(data))
+        elif top_level  and  (type(data) in [ list, tuple ]  or  (hasattr(data, "next")  and  type(data) is not dict)):
+            return self._batched(self.__list_pieces(data))
         else:
-            self.__indent_level -= 1
-        return out
+            return iter([ self.render(data, top_level) ])
+
+    def __list_pieces(self, data):
+        """
+        Produce the same output as render() for a top level list, element by element.
+
+        """
+        yield '<?xml version="1.0" encoding="UTF-8" ?>\n<rxdoc>\n'
+        indent      = self.__indent_spaces
+        indent_plus = indent + self.__indent_spaces
+        yield indent + "<rxlist>\n"
+        for elem in data:
+            out = [ indent_plus + "<rxitem>\n" ]
+            self.__write(elem, 3, out)
+            out.append(indent_plus + "</rxitem>\n")
+            yield "".join(out)
+        yield indent + "</rxlist>\n"
+        yield "</rxdoc>\n"
 
+    def __table_pieces(self, data):
+        """
+        Produce the same output as render() for a top level table, row by row.
+
+        """
+        yield '<?xml version="1.0" encoding="UTF-8" ?>\n<rxdoc>\n'
+        indent = self.__indent_spaces
+        yield indent + "<rxlist>\n"
+        for item in self.__table_items(data, 1):
+            yield item
+        yield indent + "</rxlist>\n"
+        yield "</rxdoc>\n"
@@ -0,0 +1,161 @@
+"""
+RESTx: Sane, simple and effective data publishing and integration.
+
+Copyright (C) 2010   MuleSoft Inc.    http://www.mulesoft.com
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+"""
+State that lives for the duration of a single client request.
+
+The HTTP server opens a scope when a request arrives and closes it once
+the response has been sent. While the scope is open, the results of GET
+requests to other resources (made with accessResource()) are remembered,
+so that a resource used in several places of a composite resource is
+only evaluated once per client request.
+
+The scope is kept per thread. Work that is handed to other threads on
+behalf of the request (see accessResources()) takes the scope along.
+
+"""
+
+import copy
+import threading
+
+_CURRENT = threading.local()
+
+
+class _MemoEntry(object):
+    """
+    The result of one resource access, or the promise of it.
+
+    """
+    def __init__(self):
+        self.result = None
+        self.ok     = False
+        self.done   = threading.Event()
+
+
+class RequestScope(object):
+    """
+    Memoized resource access results for one client request.
+
+    """
+    def __init__(self):
+        self.__entries = dict()
+        self.__lock    = threading.Lock()
+        self.hits      = 0
+        self.misses    = 0
+
+    def memoized(self, key, func):
+        """
+        Return the result for the key, calling func() only if it isn't known yet.
+
+        If another thread of this request is computing the same result at
+        the moment then we wait for it. Callers may modify the result they
+        get: The caller that computed it gets the result itself, while a
+        private copy is remembered, of which every later caller gets its
+        own copy. If func() fails then nothing is remembered and the
+        exception is raised.
+
+        @param key:     The memo key. Needs to be hashable.
+        @type key:      tuple
+
+        @param func:    Function without arguments, which produces the result.
+        @type func:     function
+
+        @return:        The result.
+        @rtype:         object
+
+        """
+        self.__lock.acquire()
+        try:
+            entry = self.__entries.get(key)
+            if entry is None:
+                entry = _MemoEntry()
+                self.__entries[key] = entry
+                self.misses += 1
+                owner = True
+            else:
+                self.hits += 1
+                owner = False
+        finally:
+            self.__lock.release()
+
+        if not owner:
+            entry.done.wait()
+            if entry.ok:
+                return copy.deepcopy(entry.result)
+            # The first attempt failed, so we have a go ourselves.
+            return func()
+
+        try:
+            result       = func()
+            entry.result = copy.deepcopy(result)
+            entry.ok     = True
+        finally:
+            if not entry.ok:
+                self.__lock.acquire()
+                try:
+                    if self.__entries.get(key) is entry:
+                        del self.__entries[key]
+                finally:
+                    self.__lock.release()
+            entry.done.set()
+        return result
+
+
+def current():
+    """
+    Return the scope of the request handled by this thread, or None.
+
+    """
+    return getattr(_CURRENT, "scope", None)
+
+def enter(scope):
+    """
+    Make the given scope the current one for this thread.
+
+    @param scope:   A request scope, or None.
+    @type scope:    RequestScope
+
+    @return:        The scope that was current before.
+    @rtype:         RequestScope
+
+    """
+    previous       = current()
+    _CURRENT.scope = scope
+    return previous
+
+def begin():
+    """
+    Open a new scope for a request that arrived in this thread.
+
+    @return:        The new scope.
+    @rtype:         RequestScope
+
+    """
+    scope = RequestScope()
+    enter(scope)
+    return scope
+
+def end():
+    """
+    Close the scope of this thread's request.
+
+    """
+    enter(None)
+
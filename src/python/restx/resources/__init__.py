@@ -142,7 +142,12 @@ def deleteResourceFromStorage(uri, is_partial=False):
 
     """
     resource_name = uri[len(settings.PREFIX_SPECIALIZED if is_partial else settings.PREFIX_RESOURCE)+1:]
-    STORAGE_OBJECT.deleteResourceFromStorage(resource_name, is_partial)
+    try:
+        STORAGE_OBJECT.deleteResourceFromStorage(resource_name, is_partial)
+    finally:
+        if not is_partial:
+            # Nothing is kept in memory for partial resources
+            restx.components.forget_resource(resource_name, getResourceUri(resource_name))
 
 def listResources(partials=False):
     """
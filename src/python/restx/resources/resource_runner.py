@@ -18,7 +18,18 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 """
 
-import restx.settings as settings
+import sys
+import time
+import Queue
+import threading
+
+try:
+    from hashlib import md5
+except ImportError:
+    from md5 import md5
+
+import restx.settings      as settings
+import restx.request_scope as request_scope
 
 import restx.core.codebrowser  # Wanted to be much more selective here, but a circular
                                # import issue was most easily resolved like this.
@@ -26,12 +37,13 @@ import restx.core.codebrowser  # Wanted to be much more selective here, but a ci
 
 from org.mulesoft.restx.exception       import *
 from org.mulesoft.restx.component.api   import HTTP, Result
-from restx.resources                    import paramSanityCheck, fillDefaults, convertTypes, \
-                                               retrieveResourceFromStorage, getResourceUri
-from restx.render                       import KNOWN_INPUT_RENDERERS
+from restx.resources                    import retrieveResourceFromStorage, getResourceUri
+from restx.resources.service_plan       import getServicePlan
 from restx.languages                    import *
 
+from restx.components                   import release_component
 from restx.components.base_capabilities import BaseCapabilities
+from restx.httpabstraction.base_server  import is_streamed_entity
 
 
 def _accessComponentService(component, complete_resource_def, resource_name, service_name,
@@ -91,7 +103,15 @@ def _accessComponentService(component, complete_resource_def, resource_name, ser
                 found               = True
             if not found:
                 raise RestxException("Service '%s' is not exposed by this resource." % service_name)
-        service_def = services[service_name]
+
+        # Everything about the service that does not depend on the request
+        # itself has been worked out before and is kept in the service plan.
+        if services:
+            service_def = services.get(service_name)
+        else:
+            service_def = None
+        plan = getServicePlan(resource_name, service_name, service_def,
+                              complete_resource_def['private'], component.__class__)
 
         #
         # Some runtime parameters may have been provided as arguments on
@@ -118,44 +138,20 @@ def _accessComponentService(component, complete_resource_def, resource_name, ser
         # method, which could possibly use a complete 
         #
         if positional_params:
-            try:
-                pos_param_def = complete_resource_def['public']['services'][service_name]['positional_params']
-            except Exception, e:
-                pos_param_def = None
-            if pos_param_def:
-                # Iterating over all the positional parameters that are provided in the URI
-                # There might be some empty ones (when the URL has two // in a row or ends
-                # in a /). In that case, we skip that parameter.
-                pos_def_index = 0
-                for value in positional_params:
-                    if value:
-                        pname = pos_param_def[pos_def_index]
-                        pos_def_index += 1
-                        # Put the new value in the runtime_parameter_dict, but only if it
-                        # doesn't exist there already (parameters specified after a '?'
-                        # are in there and they take precedence).
-                        if pname not in runtime_param_dict:
-                            runtime_param_dict[pname] = value
-                    if pos_def_index == len(pos_param_def):
-                        # No more positional parameters defined? We will ignore whatever
-                        # else is in the URL
-                        break
+            plan.applyPositionalParams(positional_params, runtime_param_dict)
             
-        runtime_param_def  = service_def.get('params')
-        input_types_def    = service_def.get('input_types')
-        if not input_types_def  or  (len(input_types_def) == 1  and  input_types_def[0] is None):
+        if plan.no_input:
             # Check if input types were defined as 'None', in which
             # case no input is allowed at all.
             if input:
                 raise RestxUnsupportedMediaTypeException()
 
-        # A request header may tell us about the request body type.
-        if request:
+        # A request header may tell us about the request body type. Services
+        # that stream their input get the body as it is.
+        if request  and  not plan.stream_input:
             if input:
-                ct = request.getContentType()
-                input_renderer_class = KNOWN_INPUT_RENDERERS.get(ct)
-                if input_renderer_class:
-                    parser = input_renderer_class()
+                parser = plan.getInputParser(request.getContentType())
+                if parser:
                     try:
                         input  = parser.parse(input)
                     except Exception, e:
@@ -167,16 +163,16 @@ def _accessComponentService(component, complete_resource_def, resource_name, ser
                     # the input buffer as is. But if we didn't allow "" as
                     # input type then it's an error if we don't get an exact
                     # match of the content type against renderers.
-                    if "" not in input_types_def:
+                    if not plan.accept_any_input:
                         raise RestxUnsupportedMediaTypeException()
                             
-        if runtime_param_def:
+        if plan.has_params:
             # If the 'allow_params_in_body' flag is set for a service then we
             # allow runtime parameters to be passed in the request body PUT or POST.
             # So, if the URL command line parameters are not specified then we
             # should take the runtime parameters out of the body.
             # Sanity checking and filling in of defaults for the runtime parameers
-            if service_def.get('allow_params_in_body')  and  input:
+            if plan.allow_params_in_body  and  not plan.stream_input  and  input:
                 base_params = input
                 if base_params:
                     input = None
@@ -188,9 +184,7 @@ def _accessComponentService(component, complete_resource_def, resource_name, ser
                     if name not in runtime_param_dict:
                         runtime_param_dict[name] = value
 
-            paramSanityCheck(runtime_param_dict, runtime_param_def, "runtime parameter")
-            fillDefaults(runtime_param_def, runtime_param_dict)
-            convertTypes(runtime_param_def, runtime_param_dict)
+            plan.prepareParams(runtime_param_dict)
 
         if not proxy_dispatch_func:
             service_method     = getattr(component, service_name)
@@ -201,8 +195,9 @@ def _accessComponentService(component, complete_resource_def, resource_name, ser
             service_method     = proxy_dispatch_func
             is_proxy_component = True
         
-        # Get the parameters from the resource definition time
-        params = complete_resource_def['private']['params']
+        # Get the parameters from the resource definition time. The stored
+        # resource definition is shared with other requests, so we work on a copy.
+        params = dict(complete_resource_def['private']['params'])
 
         if runtime_param_dict:
             # Merge the runtime parameters with the static parameters
@@ -226,7 +221,9 @@ def _getResourceDetails(resource_name):
     """
     Extract and compute a number of importants facts about a resource.
     
-    The information is returned as a dictionary.
+    The information is returned as a dictionary. The component instance
+    in there is taken from the pool of idle instances for this resource and
+    has to be handed back with release_component() when done.
     
     @param resource_name:    The name of the resource.
     @type resource_name:     string
@@ -239,16 +236,24 @@ def _getResourceDetails(resource_name):
     if not complete_resource_def:
         raise RestxResourceNotFoundException("Unknown resource '%s'" % resource_name)
     resource_home_uri      = getResourceUri(resource_name)
-    public_resource_def    = complete_resource_def['public']
+    # The stored resource definition is shared with other requests, so
+    # we need to work on a copy of those parts that we are modifying.
+    public_resource_def    = dict(complete_resource_def['public'])
+    complete_resource_def  = dict(complete_resource_def)
+    complete_resource_def['public'] = public_resource_def
     
     # Instantiate the component to get the exposed sub-services. Their info
     # is added to the public information about the resource.
     code_uri  = complete_resource_def['private']['code_uri']
-    component = restx.core.codebrowser.getComponentObjectFromPath(code_uri, resource_name)
+    component = restx.core.codebrowser.getComponentObjectFromPath(code_uri, resource_name, pooled=True)
     if not component:
         return None
-    services  = component._getServices(resource_home_uri)
-    services  = languageStructToPython(component, services)
+    try:
+        services  = component._getServices(resource_home_uri)
+        services  = languageStructToPython(component, services)
+    except:
+        release_component(component)
+        raise
     public_resource_def['services'] = services
     
     return dict(complete_resource_def = complete_resource_def,
@@ -279,6 +284,43 @@ def accessResource(resource_uri, input=None, params=None, method=HTTP.GET):
     @param method:           The HTTP method to be used.
     @type method:            HttpMethod
     
+    """
+    # Within a client request, GET requests to the same resource with the
+    # same parameters are only evaluated once.
+    scope = request_scope.current()
+    if scope  and  method == HTTP.GET  and  (input is None  or  type(input) in [ str, unicode ]):
+        key = (resource_uri, _freeze(params or dict()), input)
+        try:
+            hash(key)
+            hashable = True
+        except TypeError:
+            # Parameters we can't build a key from are not memoized.
+            hashable = False
+        if hashable:
+            return scope.memoized(key, lambda: _accessResource(resource_uri, input, params, method))
+    return _accessResource(resource_uri, input, params, method)
+
+def _freeze(value):
+    """
+    Return a hashable representation of a parameter value.
+
+    Dictionaries, lists and tuples are converted recursively, so that
+    nested parameters (for example a list of dictionaries) can be part
+    of a memo key.
+
+    """
+    if type(value) is dict:
+        items = [ (name, _freeze(elem)) for name, elem in value.items() ]
+        items.sort()
+        return tuple(items)
+    if type(value) in [ list, tuple ]:
+        return tuple([ _freeze(elem) for elem in value ])
+    return value
+
+def _accessResource(resource_uri, input, params, method):
+    """
+    Access a resource identified by its URI, without memoization.
+
     """
     if not resource_uri.startswith(settings.PREFIX_RESOURCE + "/"):
         raise Exception("Malformed resource name. Needs to be absolute or start with '%s'" % settings.PREFIX_RESOURCE)
@@ -301,8 +343,265 @@ def accessResource(resource_uri, input=None, params=None, method=HTTP.GET):
     if params is None:
         params = dict()
     
-    result = _accessComponentService(rinfo['component'], rinfo['complete_resource_def'], resource_name,
-                                     service_name, positional_params, params, input, None, method, True)
-    return result.getStatus(), result.getEntity()
- 
+    try:
+        result = _accessComponentService(rinfo['component'], rinfo['complete_resource_def'], resource_name,
+                                         service_name, positional_params, params, input, None, method, True)
+        entity = result.getEntity()
+        if is_streamed_entity(entity):
+            # The caller expects a complete object, not a stream. The stream
+            # may still need the component, so it is read before the component
+            # is handed back.
+            entity = list(entity)
+    finally:
+        release_component(rinfo['component'])
+    return result.getStatus(), entity
+
+def getServiceDefinition(resource_uri):
+    """
+    Return the definition of the service a resource URI refers to.
+
+    This allows a component to find out about the capabilities of a
+    service before accessing it, for example whether it accepts
+    a 'pushdown' of predicates.
+
+    @param resource_uri:     The uri of the resource, starting with "/resource/".
+                             Contains resource name, service name and any positional parameters.
+    @type resource_uri:      string
+
+    @return:                 The public definition of the service or None if the
+                             URI does not refer to a service of a known resource.
+    @rtype:                  dict
+
+    """
+    if not resource_uri.startswith(settings.PREFIX_RESOURCE + "/"):
+        return None
+    path_components = resource_uri[len(settings.PREFIX_RESOURCE)+1:].split("/")
+    if len(path_components) < 2:
+        return None
+    resource_name, service_name = path_components[:2]
+
+    try:
+        rinfo = _getResourceDetails(resource_name)
+    except RestxResourceNotFoundException, e:
+        return None
+    if not rinfo:
+        return None
+    release_component(rinfo['component'])
+    services = rinfo['public_resource_def']['services']
+    if not services:
+        return None
+    return services.get(service_name)
+
+def getResourceFingerprint(resource_uri):
+    """
+    Return a digest of the stored definition of the resource a URI refers to.
+
+    The digest changes whenever the resource is re-defined, for example with
+    different parameters. This allows a component to recognize results it
+    stored for a resource that since has changed.
+
+    @param resource_uri:     The uri of the resource, starting with "/resource/".
+                             May contain service name and positional parameters.
+    @type resource_uri:      string
+
+    @return:                 The digest as hex string, or None if the URI does not
+                             refer to a known resource.
+    @rtype:                  string
+
+    """
+    if not resource_uri.startswith(settings.PREFIX_RESOURCE + "/"):
+        return None
+    resource_name         = resource_uri[len(settings.PREFIX_RESOURCE)+1:].split("/")[0]
+    complete_resource_def = retrieveResourceFromStorage(getResourceUri(resource_name))
+    if not complete_resource_def:
+        return None
+    return getDefinitionDigest(complete_resource_def)
+
+def getDefinitionDigest(resource_def):
+    """
+    Return a digest of a resource definition, or a section of one.
+
+    Definitions with the same content have the same digest, even if they
+    are different objects, for example because they were loaded from
+    storage separately.
+
+    @param resource_def:     The resource definition.
+    @type resource_def:      dict
+
+    @return:                 The digest as hex string.
+    @rtype:                  string
+
+    """
+    return md5(repr(_freeze(resource_def))).hexdigest()
+
  
+
+
+class _PendingAccess(object):
+    """
+    A call to accessResource() that was handed to the executor.
+
+    Whoever claims the call first (a worker thread or the thread that
+    submitted it) runs it.
+
+    """
+    def __init__(self, access_func, kwargs):
+        self.func      = access_func
+        self.kwargs    = kwargs
+        self.scope     = request_scope.current()
+        self.result    = None
+        self.exc_info  = None
+        self.__claimed = False
+        self.__lock    = threading.Lock()
+        self.__done    = threading.Event()
+
+    def claim(self):
+        """
+        Return True if the caller may run this call, False if someone else got to it first.
+
+        """
+        self.__lock.acquire()
+        try:
+            if self.__claimed:
+                return False
+            self.__claimed = True
+            return True
+        finally:
+            self.__lock.release()
+
+    def run(self):
+        # The call is made on behalf of the request that submitted it,
+        # even if it runs in a worker thread.
+        previous_scope = request_scope.enter(self.scope)
+        try:
+            try:
+                self.result = self.func(**self.kwargs)
+            except:
+                self.exc_info = sys.exc_info()
+        finally:
+            request_scope.enter(previous_scope)
+        self.__done.set()
+
+    def wait(self, timeout):
+        """
+        Wait for the call to finish and return True if it did.
+
+        """
+        self.__done.wait(timeout)
+        return self.__done.isSet()
+
+
+class _ResourceAccessExecutor(object):
+    """
+    A fixed number of worker threads, shared by all accessResources() calls.
+
+    The threads are only started when the first call is submitted.
+
+    """
+    def __init__(self, num_threads):
+        self.__num_threads = num_threads
+        self.__queue       = Queue.Queue()
+        self.__started     = False
+        self.__lock        = threading.Lock()
+
+    def __start(self):
+        self.__lock.acquire()
+        try:
+            if not self.__started:
+                for i in range(self.__num_threads):
+                    t = threading.Thread(target=self.__work, name="restx-access-%d" % i)
+                    t.setDaemon(True)
+                    t.start()
+                self.__started = True
+        finally:
+            self.__lock.release()
+
+    def __work(self):
+        while True:
+            pending = self.__queue.get()
+            if pending.claim():
+                pending.run()
+
+    def submit(self, pending):
+        if not self.__started:
+            self.__start()
+        self.__queue.put(pending)
+
+
+_EXECUTOR = _ResourceAccessExecutor(settings.RESOURCE_ACCESS_THREADS)
+
+def accessResources(resource_requests, timeout=None, access_func=None):
+    """
+    Access several resources at the same time.
+
+    The calls to accessResource() are run in parallel on a shared pool of
+    worker threads, so the time this takes is that of the slowest call,
+    rather than the sum of all of them. If all workers are busy (for
+    example, because the resources themselves make parallel calls) then
+    the calling thread runs the calls that have not been picked up yet.
+
+    Each request is either a resource URI, or a dictionary with the
+    arguments to accessResource() ('resource_uri', 'input', 'params' and
+    'method') and optionally a 'timeout', which overrides the timeout for
+    this call.
+
+    Example:
+
+        (status_A, data_A), (status_B, data_B) = \
+                accessResources([ "/resource/A/entries",
+                                  dict(resource_uri="/resource/B/search", params={ "num" : 50 }) ])
+
+    @param resource_requests:   List of requests.
+    @type resource_requests:    list
+
+    @param timeout:             Number of seconds to wait for each call, or None to
+                                wait as long as it takes. Calls that take longer
+                                return (408, "Request timed out"). Calls that the
+                                calling thread ends up running itself are not
+                                interrupted.
+    @type timeout:              float
+
+    @param access_func:         The function that performs each access. By default
+                                this is accessResource().
+    @type access_func:          function
+
+    @return:                    List of (status, data) tuples, in the order of the
+                                requests.
+    @rtype:                     list
+
+    @raise Exception:           The exception raised by the first call (in the order
+                                of the requests) that failed.
+
+    """
+    if access_func is None:
+        access_func = accessResource
+    pending_list = list()
+    for req in resource_requests:
+        if type(req) in [ str, unicode ]:
+            kwargs       = dict(resource_uri=req)
+            call_timeout = timeout
+        else:
+            kwargs       = dict(req)
+            call_timeout = kwargs.pop('timeout', timeout)
+        pending_list.append((_PendingAccess(access_func, kwargs), call_timeout))
+
+    # The first call is run right here, all others go to the workers,
+    # unless they are still waiting when we are done with the first one.
+    start = time.time()
+    for pending, call_timeout in pending_list[1:]:
+        _EXECUTOR.submit(pending)
+    for pending, call_timeout in pending_list:
+        if pending.claim():
+            pending.run()
+
+    results = list()
+    for pending, call_timeout in pending_list:
+        if call_timeout is not None:
+            call_timeout = max(0, start + call_timeout - time.time())
+        if not pending.wait(call_timeout):
+            results.append((HTTP.REQUEST_TIMEOUT, "Request timed out"))
+        elif pending.exc_info:
+            raise pending.exc_info[0], pending.exc_info[1], pending.exc_info[2]
+        else:
+            results.append(pending.result)
+    return results
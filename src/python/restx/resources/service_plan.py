@@ -0,0 +1,307 @@
+"""
+RESTx: Sane, simple and effective data publishing and integration.
+
+Copyright (C) 2010   MuleSoft Inc.    http://www.mulesoft.com
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+"""
+Precompiled dispatch plans for the services of a resource.
+
+Everything that _accessComponentService() needs to know about a service
+and that does not change from one request to the next (the positional
+parameter mapping, the accepted input, the type conversion and choices
+of each runtime parameter and their default values) is worked out once
+and kept in a ServicePlan. Handling a request then only requires a single
+pass over the parameters that were actually provided.
+
+"""
+
+from restx.core.parameter         import TYPE_COMPATIBILITY, PARAM_STRING_LIST, PARAM_NUMBER_LIST
+from restx.render                 import KNOWN_INPUT_RENDERERS
+
+from org.mulesoft.restx.exception import *
+
+#
+# The input renderers don't keep any state, so one instance for each
+# content type can be shared by all plans.
+#
+_INPUT_PARSERS = dict([ (ct, renderer_class()) for ct, renderer_class in KNOWN_INPUT_RENDERERS.items() ])
+
+#
+# Plans are cached per (resource, service). Assignments to a dictionary
+# are atomic, so concurrent requests may at worst build the same plan twice.
+#
+_PLAN_CACHE = dict()
+_PLAN_CACHE_MAX_ENTRIES = 1000
+
+
+class _ParamPlan(object):
+    """
+    The precomputed information for a single runtime parameter.
+
+    """
+    def __init__(self, pname, pdef):
+        """
+        Work out type conversion, choices and default for a parameter.
+
+        @param pname:  Name of the parameter.
+        @type pname:   string
+
+        @param pdef:   Dictionary representation of the parameter definition.
+        @type pdef:    dict
+
+        """
+        self.pname    = pname
+        self.required = pdef['required']
+        self.storage_types, self.runtime_types, self.conversion_func = TYPE_COMPATIBILITY[pdef['type']]
+        choices = pdef.get('val_choices')
+        if choices:
+            self.choices = frozenset([ str(c) for c in choices ])
+        else:
+            self.choices = None
+        self.has_default = not self.required  and  pdef.get('default') is not None
+        if self.has_default:
+            default = pdef['default']
+            if pdef['type'] in [ PARAM_STRING_LIST, PARAM_NUMBER_LIST ]:
+                default = [ default ]
+            self.default = default
+
+    def needsConversion(self, value):
+        """
+        Return True if the value is not already of a usable runtime type.
+
+        Lists always need to be converted, since every element needs to go
+        through the conversion.
+
+        """
+        param_type = type(value)
+        if param_type is list:
+            return True
+        return param_type not in self.runtime_types  and  param_type not in self.storage_types
+
+    def convert(self, value):
+        """
+        Check the value against the choices and convert it to the runtime type.
+
+        @param value:          The value that was provided for this parameter.
+        @type value:           object
+
+        @return:               The (possibly converted) value.
+        @rtype:                object
+
+        @raise RestxBadRequestException: If the value is not one of the choices or
+                                         can not be converted.
+
+        """
+        if self.choices:
+            if type(value) is list:
+                for val in value:
+                    if str(val) not in self.choices:
+                        raise RestxBadRequestException("List value '%s' for parameter '%s' is not one of the permissible choices." % (str(val), self.pname))
+            elif str(value) not in self.choices:
+                raise RestxBadRequestException("Value '%s' for parameter '%s' is not one of the permissible choices." % (str(value), self.pname))
+
+        return self.convertType(value)
+
+    def convertType(self, value):
+        """
+        Convert the value to the runtime type of the parameter, if necessary.
+
+        """
+        if not self.needsConversion(value):
+            return value
+        try:
+            if not self.conversion_func:
+                raise Exception("Cannot convert provided parameter type (%s) to necessary type(s) '%s'" % \
+                                (type(value), self.runtime_types))
+            converted = self.conversion_func(value)
+            if converted is None:
+                raise Exception("Cannot convert one of the provided list elements to the necessary type.")
+        except Exception, e:
+            raise RestxBadRequestException("Incompatible type for parameter '%s' in section 'runtime parameter': %s" % \
+                                           (self.pname, str(e)))
+        return converted
+
+    def defaultValue(self):
+        """
+        Return a fresh copy of the converted default value.
+
+        """
+        value = self.default
+        if type(value) is list:
+            value = list(value)
+        return self.convertType(value)
+
+
+class ServicePlan(object):
+    """
+    Everything about a service that can be computed before the request arrives.
+
+    """
+    def __init__(self, service_name, service_def, private_def, component_class):
+        """
+        Compile the plan for a service.
+
+        @param service_name:     Name of the service.
+        @type service_name:      string
+
+        @param service_def:      The service definition as returned by the component, or None
+                                 if the service is handled by a proxy dispatch method.
+        @type service_def:       dict
+
+        @param private_def:      The 'private' section of the stored resource definition. Used
+                                 to recognize whether the plan is still current.
+        @type private_def:       dict
+
+        @param component_class:  The class of the component. Also used to recognize whether the
+                                 plan is still current.
+        @type component_class:   class
+
+        """
+        self.service_name    = service_name
+        self.private_def     = private_def
+        self.component_class = component_class
+        if service_def is None:
+            service_def = dict()
+
+        self.positional_params    = service_def.get('positional_params') or None
+        input_types_def           = service_def.get('input_types')
+        self.no_input             = not input_types_def  or  (len(input_types_def) == 1  and  input_types_def[0] is None)
+        self.accept_any_input     = bool(input_types_def)  and  "" in input_types_def
+        self.allow_params_in_body = bool(service_def.get('allow_params_in_body'))
+        self.stream_input         = bool(service_def.get('stream_input'))
+
+        runtime_param_def = service_def.get('params')
+        self.has_params   = bool(runtime_param_def)
+        self.param_plans  = dict()
+        self.required     = list()
+        self.defaults     = list()
+        if runtime_param_def:
+            for pname, pdef in runtime_param_def.items():
+                pplan = _ParamPlan(pname, pdef)
+                self.param_plans[pname] = pplan
+                if pplan.required:
+                    self.required.append(pname)
+                elif pplan.has_default:
+                    self.defaults.append(pplan)
+
+    def isCurrent(self, private_def, component_class):
+        """
+        Return True if the plan was compiled for this resource definition and component.
+
+        """
+        return self.private_def is private_def  and  self.component_class is component_class
+
+    def getInputParser(self, content_type):
+        """
+        Return the parser for the given content type of the request body.
+
+        @return:   A renderer instance or None if we don't know the content type.
+        @rtype:    BaseRenderer
+
+        """
+        return _INPUT_PARSERS.get(content_type)
+
+    def applyPositionalParams(self, positional_params, runtime_param_dict):
+        """
+        Assign values from the URI path to the positional parameters.
+
+        Empty values (when the URI has two '/' in a row or ends in a '/') are skipped
+        and whatever is left after the last defined positional parameter is ignored.
+        Parameters already present in the runtime_param_dict take precedence.
+
+        """
+        pos_param_def = self.positional_params
+        if not pos_param_def:
+            return
+        pos_def_index = 0
+        for value in positional_params:
+            if value:
+                pname = pos_param_def[pos_def_index]
+                pos_def_index += 1
+                if pname not in runtime_param_dict:
+                    runtime_param_dict[pname] = value
+            if pos_def_index == len(pos_param_def):
+                break
+
+    def prepareParams(self, runtime_param_dict):
+        """
+        Check, convert and complete the runtime parameters in place.
+
+        This combines what paramSanityCheck(), convertTypes() and fillDefaults()
+        do, with a single pass over the provided parameters. Parameters that
+        are not defined for the service are left alone.
+
+        @param runtime_param_dict:  The runtime parameters provided by the client.
+        @type runtime_param_dict:   dict
+
+        @raise RestxException:      If a parameter is malformed or a mandatory parameter
+                                    is missing.
+
+        """
+        if type(runtime_param_dict) is not dict:
+            raise RestxException("The 'runtime parameter' section has to be a dictionary")
+        param_plans = self.param_plans
+        for pname, value in runtime_param_dict.items():
+            pplan = param_plans.get(pname)
+            if pplan:
+                runtime_param_dict[pname] = pplan.convert(value)
+
+        for pname in self.required:
+            if pname not in runtime_param_dict:
+                raise RestxMandatoryParameterMissingException("Missing mandatory parameter '%s' in section 'runtime parameter'" % pname)
+
+        for pplan in self.defaults:
+            if pplan.pname not in runtime_param_dict:
+                runtime_param_dict[pplan.pname] = pplan.defaultValue()
+
+
+def getServicePlan(resource_name, service_name, service_def, private_def, component_class):
+    """
+    Return the plan for a service of a resource, compiling it if necessary.
+
+    A cached plan is reused as long as the stored resource definition and the
+    component class are the same objects as when the plan was compiled.
+
+    @param resource_name:    Name of the resource.
+    @type resource_name:     string
+
+    @param service_name:     Name of the service.
+    @type service_name:      string
+
+    @param service_def:      The service definition, or None for proxy-dispatched services.
+    @type service_def:       dict
+
+    @param private_def:      The 'private' section of the stored resource definition.
+    @type private_def:       dict
+
+    @param component_class:  The class of the component.
+    @type component_class:   class
+
+    @return:                 The service plan.
+    @rtype:                  ServicePlan
+
+    """
+    key  = (resource_name, service_name)
+    plan = _PLAN_CACHE.get(key)
+    if plan is None  or  not plan.isCurrent(private_def, component_class):
+        plan = ServicePlan(service_name, service_def, private_def, component_class)
+        if len(_PLAN_CACHE) >= _PLAN_CACHE_MAX_ENTRIES:
+            _PLAN_CACHE.clear()
+        _PLAN_CACHE[key] = plan
+    return plan
+
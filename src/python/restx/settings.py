@@ -42,6 +42,125 @@ ROOT_DIR            = ""
 DOC_FILE_NAME       = "DOC"
 VERSION_FILE_NAME   = "VERSION"
 
+#
+# Parsed resource definitions are kept in memory. A cached definition
+# is only re-read from storage if its file was modified on disk, or if
+# the resource was re-written or deleted through the server.
+#
+RESOURCE_CACHE_ENABLED = True
+
+#
+# Instances of Python components are re-used for requests to the same
+# resource. This is the maximum number of idle instances that are kept
+# per resource (0 disables pooling).
+#
+COMPONENT_POOL_SIZE    = 8
+
+#
+# Settings for the stand-alone server on plain Python (Jython uses the
+# Java HTTP server). Requests are handled by a pool of worker threads.
+# If more than HTTP_QUEUE_LIMIT requests are already waiting for a worker,
+# new requests are turned away with '503 Service Unavailable' right away
+# (0 means no limit). With HTTP_PROCESSES > 1 the server forks that many
+# worker processes, which all accept requests on the same socket.
+#
+HTTP_WORKER_THREADS    = 10
+HTTP_QUEUE_LIMIT       = 50
+HTTP_LISTEN_BACKLOG    = 64
+HTTP_PROCESSES         = 1
+
+#
+# Request bodies are read in chunks of REQUEST_BODY_CHUNK_SIZE bytes.
+# Requests with a body larger than MAX_REQUEST_BODY_SIZE bytes are
+# rejected with '413 Request Entity Too Large' (0 means no limit), if
+# the body is read into memory. Services that read the body as it
+# arrives (stream_input) accept bodies of up to
+# MAX_STREAMED_REQUEST_BODY_SIZE bytes instead.
+#
+REQUEST_BODY_CHUNK_SIZE        = 64*1024
+MAX_REQUEST_BODY_SIZE          = 10*1024*1024
+MAX_STREAMED_REQUEST_BODY_SIZE = 0
+
+#
+# Components may return iterators for large results. Those are rendered
+# and sent to the client in chunks of about RESPONSE_CHUNK_SIZE bytes.
+#
+RESPONSE_CHUNK_SIZE     = 16*1024
+
+#
+# JSON output is indented and has its keys sorted, which is nice for
+# humans. Machine clients can ask for compact output (no whitespace, keys
+# in arbitrary order) with 'Accept: application/json; compact=true', or it
+# can be made the default here. Compact output is produced by the fastest
+# available encoder: "auto" picks Jackson when its jar is on the classpath
+# under Jython and the standard json module (C-accelerated where that's
+# available) otherwise. "builtin" always uses the json module.
+#
+JSON_COMPACT_OUTPUT     = False
+JSON_ENCODER_BACKEND    = "auto"
+
+#
+# Services can declare a 'cache_ttl' to have their rendered responses
+# cached. This is the maximum number of responses kept in the cache.
+#
+RESPONSE_CACHE_MAX_ENTRIES = 1000
+
+#
+# Settings for the HTTP client used by components (httpGet(), httpPost()).
+# Connections are kept open for re-use, up to HTTP_CLIENT_MAX_IDLE_PER_HOST
+# per server, for at most HTTP_CLIENT_IDLE_TIMEOUT seconds, or less if the
+# server announces a shorter keep-alive timeout. This needs to be shorter
+# than the keep-alive timeout of the servers (Apache's default is 5 seconds).
+# Requests that are not safe to repeat, such as POST, only re-use connections
+# that have been idle for less than HTTP_CLIENT_UNSAFE_IDLE_TIMEOUT seconds.
+# Resolved host names are remembered for HTTP_CLIENT_DNS_TTL seconds.
+# Establishing a connection times out after HTTP_CLIENT_CONNECT_TIMEOUT seconds.
+#
+HTTP_CLIENT_MAX_IDLE_PER_HOST   = 4
+HTTP_CLIENT_IDLE_TIMEOUT        = 4
+HTTP_CLIENT_UNSAFE_IDLE_TIMEOUT = 1
+HTTP_CLIENT_DNS_TTL             = 300
+HTTP_CLIENT_CONNECT_TIMEOUT     = 10
+
+#
+# accessResources() runs the calls to other resources on a shared pool
+# of this many threads.
+#
+RESOURCE_ACCESS_THREADS       = 8
+
+#
+# The segments of rotated log files are searched by the LogFileComponent
+# on a shared pool of this many threads.
+#
+LOGFILE_SCAN_THREADS          = 4
+
+#
+# DatabaseAccess resources share a pool of JDBC connections per database.
+# A pool opens at most DB_POOL_MAX_SIZE connections. Requests wait at most
+# DB_POOL_MAX_WAIT seconds for a connection to become free. Connections that
+# have been idle for longer than DB_POOL_IDLE_TIMEOUT seconds are closed.
+# A connection is validated before it is used, which may take up to
+# DB_POOL_VALIDATION_TIMEOUT seconds. Each connection keeps up to
+# DB_POOL_MAX_STATEMENTS prepared statements for re-use.
+#
+DB_POOL_MAX_SIZE              = 10
+DB_POOL_MAX_WAIT              = 10
+DB_POOL_IDLE_TIMEOUT          = 300
+DB_POOL_VALIDATION_TIMEOUT    = 2
+DB_POOL_MAX_STATEMENTS        = 50
+
+#
+# The number of rows a JDBC driver should fetch from the database at a
+# time when the results of a query are read. 0 leaves this to the driver.
+#
+DB_FETCH_SIZE                 = 0
+
+#
+# When several entries are created or updated at once, the statements are
+# sent to the database in batches of up to DB_BATCH_SIZE.
+#
+DB_BATCH_SIZE                 = 500
+
 __VERSION = None
 
 def get_version():
@@ -41,6 +41,19 @@ class BaseStorage(object):
         """
         pass
 
+    def getFileStat(self, file_name):
+        """
+        Return modification time and size of the specified file.
+
+        @param file_name:    Name of the selected file.
+        @type file_name:     string
+
+        @return              Tuple of modification time and size.
+        @rtype               tuple
+
+        """
+        pass
+
     def storeFile(self, file_name, data):
         """
         Store the specified file in storage.
@@ -111,6 +124,17 @@ class BaseStorage(object):
         """
         pass
 
+    def getCacheStats(self):
+        """
+        Return statistics about the in-memory resource definition cache.
+
+        @return:                 Dictionary with cache statistics or None
+                                 if the storage does not cache definitions.
+        @rtype:                  dict
+
+        """
+        return None
+
     def writeResourceToStorage(self, resource_name, resource_def):
         """
         Store a resource definition.
@@ -25,6 +25,9 @@ Base class from which all storage abstractions derive.
 
 # Python imports
 import os
+import tempfile
+
+from stat import ST_MTIME, ST_SIZE
 
 # RESTx imports
 import restx.settings as settings
@@ -79,6 +82,23 @@ class FileStorage(FileStore):
             raise RestxFileNotFoundException("File '%s' could not be found'" % (file_name))
         return buf
 
+    def getFileStat(self, file_name):
+        """
+        Return modification time and size of the specified file.
+
+        @param file_name:    Name of the selected file.
+        @type file_name:     string
+
+        @return              Tuple of modification time and size.
+        @rtype               tuple
+
+        """
+        try:
+            st = os.stat(self.__make_filename(file_name))
+        except Exception, e:
+            raise RestxFileNotFoundException("File '%s' could not be found'" % (file_name))
+        return (st[ST_MTIME], st[ST_SIZE])
+
     def storeFile(self, file_name, data):
         """
         Store the specified file in storage.
@@ -94,6 +114,43 @@ class FileStorage(FileStore):
         f.write(data)
         f.close()
 
+    def storeFileStream(self, file_name, stream):
+        """
+        Store the data from a file-like object or iterator in storage.
+
+        The data is written chunk by chunk, so that it never has to be held
+        in memory in its entirety. It goes into a temporary file first, which
+        only replaces the stored file once all the data has been read. If the
+        upload fails, the previously stored file is left untouched.
+
+        @param file_name:    Name of the file.
+        @type file_name:     string
+
+        @param stream:       Anything that can be iterated over to get the file
+                             contents in chunks, such as a RequestBody.
+        @type stream:        iterable
+
+        """
+        target        = self.__make_filename(file_name)
+        fd, temp_name = tempfile.mkstemp(prefix=".upload-", dir=os.path.dirname(target))
+        try:
+            f = os.fdopen(fd, "wb")
+            try:
+                for chunk in stream:
+                    f.write(chunk)
+            finally:
+                f.close()
+            try:
+                os.rename(temp_name, target)
+            except OSError, e:
+                # Some platforms don't rename onto an existing file.
+                os.remove(target)
+                os.rename(temp_name, target)
+        except:
+            if os.path.exists(temp_name):
+                os.remove(temp_name)
+            raise
+
     def deleteFile(self, file_name):
         """
         Delete the specified file from storage.
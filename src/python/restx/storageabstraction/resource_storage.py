@@ -22,43 +22,92 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 Base class from which all storage abstractions derive.
 
 """
+import threading
+
 import restxjson as json
 
 # RESTx imports
+import restx.settings as settings
+
 from restx.storageabstraction.file_storage import FileStorage
 from org.mulesoft.restx.exception        import *
 
 RESOURCE_EXTENSION         = ".rxr"
 PARTIAL_RESOURCE_EXTENSION = ".prxr"
 
+def _make_resource_filename(resource_name, is_partial):
+    return resource_name + (PARTIAL_RESOURCE_EXTENSION if is_partial else RESOURCE_EXTENSION)
+
+
 class ResourceStorage(FileStorage):
     """
     Implementation of resource storage methods.
 
+    Parsed resource definitions are kept in a process-wide cache, keyed
+    by their file name. Each cache entry remembers the modification time
+    and size of all the files it was assembled from (a resource that
+    'extends' a partial resource also depends on the partial resource's
+    file). An entry is only used as long as none of those files changed
+    on disk.
+
+    Definitions returned from the cache are shared between requests.
+    Callers must not modify them.
+
     """
+    def __init__(self, *args, **kwargs):
+        FileStorage.__init__(self, *args, **kwargs)
+        self.__cache      = dict()
+        self.__cache_lock = threading.Lock()
+        self.__hits       = 0
+        self.__misses     = 0
 
-    def loadResourceFromStorage(self, resource_name, is_partial=False):
+    def __is_current(self, dependencies):
         """
-        Load the specified resource from storage.
+        Check whether none of the files of a cache entry have changed.
+
+        @param dependencies:     List of (file name, stat) tuples.
+        @type dependencies:      list
+
+        @return:                 True if the cache entry can still be used.
+        @rtype:                  boolean
+
+        """
+        for file_name, stat in dependencies:
+            try:
+                if self.getFileStat(file_name) != stat:
+                    return False
+            except RestxFileNotFoundException, e:
+                return False
+        return True
+
+    def __load_uncached(self, resource_name, is_partial):
+        """
+        Read and parse a resource definition from storage.
 
         @param resource_name:    Name of the selected resource.
         @type resource_name:     string
 
-        @param is_partial:       Indicates whether we are loading a parrral resource.
+        @param is_partial:       Indicates whether we are loading a partial resource.
         @type is_partial:        boolean
 
-        @return                  A Python dictionary representation or None
-                                 if not found.
-        @rtype                   dict
+        @return:                 Tuple of the resource dictionary (or None if not
+                                 found) and the list of (file name, stat) tuples
+                                 the definition depends on.
+        @rtype:                  tuple
 
         """
+        file_name = _make_resource_filename(resource_name, is_partial)
         try:
-            buf = self.loadFile(resource_name + (PARTIAL_RESOURCE_EXTENSION if is_partial else RESOURCE_EXTENSION))
+            # Taking the stat before reading the file: If the file changes
+            # in between, the next check sees a newer stat and reloads.
+            stat = self.getFileStat(file_name)
+            buf  = self.loadFile(file_name)
         except RestxFileNotFoundException, e:
-            return None
+            return None, None
+        dependencies = [ (file_name, stat) ]
         obj = json.loads(buf)
         if "extends" in obj:
-            base_obj = self.loadResourceFromStorage(obj["extends"], is_partial=True)  # Base resources can only be partial
+            base_obj, base_dependencies = self.__load_uncached(obj["extends"], True)  # Base resources can only be partial
             try:
                 # Merge any parameters that are defined in the base resource into the output dictionary.
                 for key, val in base_obj['private']['params'].items():
@@ -66,7 +115,80 @@ class ResourceStorage(FileStorage):
                         obj['private']['params'][key] = val
                 obj['private']['code_uri'] = base_obj['private']['code_uri']
             except:
-                return None
+                return None, None
+            dependencies.extend(base_dependencies)
+        return obj, dependencies
+
+    def __invalidate(self, resource_name, is_partial):
+        """
+        Remove a resource definition from the cache.
+
+        Other resources may be based on a partial resource, so if a
+        partial resource is modified then the entire cache is cleared.
+
+        """
+        self.__cache_lock.acquire()
+        try:
+            if is_partial:
+                self.__cache.clear()
+            else:
+                self.__cache.pop(_make_resource_filename(resource_name, is_partial), None)
+        finally:
+            self.__cache_lock.release()
+
+    def getCacheStats(self):
+        """
+        Return statistics about the in-memory resource definition cache.
+
+        @return:                 Dictionary with number of entries, hits and misses.
+        @rtype:                  dict
+
+        """
+        return dict(enabled = settings.RESOURCE_CACHE_ENABLED,
+                    entries = len(self.__cache),
+                    hits    = self.__hits,
+                    misses  = self.__misses)
+
+    def loadResourceFromStorage(self, resource_name, is_partial=False):
+        """
+        Load the specified resource from storage.
+
+        The returned dictionary may be shared with other callers and
+        must be treated as read-only.
+
+        @param resource_name:    Name of the selected resource.
+        @type resource_name:     string
+
+        @param is_partial:       Indicates whether we are loading a parrral resource.
+        @type is_partial:        boolean
+
+        @return                  A Python dictionary representation or None
+                                 if not found.
+        @rtype                   dict
+
+        """
+        if not settings.RESOURCE_CACHE_ENABLED:
+            obj, dependencies = self.__load_uncached(resource_name, is_partial)
+            return obj
+
+        file_name = _make_resource_filename(resource_name, is_partial)
+        entry     = self.__cache.get(file_name)
+        if entry:
+            obj, dependencies = entry
+            if self.__is_current(dependencies):
+                self.__hits += 1
+                return obj
+
+        self.__misses += 1
+        obj, dependencies = self.__load_uncached(resource_name, is_partial)
+        self.__cache_lock.acquire()
+        try:
+            if obj:
+                self.__cache[file_name] = (obj, dependencies)
+            else:
+                self.__cache.pop(file_name, None)
+        finally:
+            self.__cache_lock.release()
         return obj
 
     def deleteResourceFromStorage(self, resource_name, is_partial=False):
@@ -80,7 +202,10 @@ class ResourceStorage(FileStorage):
         @type is_partial:        boolean
 
         """
-        self.deleteFile(resource_name + (PARTIAL_RESOURCE_EXTENSION if is_partial else RESOURCE_EXTENSION))
+        try:
+            self.deleteFile(_make_resource_filename(resource_name, is_partial))
+        finally:
+            self.__invalidate(resource_name, is_partial)
 
     def listResourcesInStorage(self, partials=False):
         """
@@ -132,4 +257,6 @@ class ResourceStorage(FileStorage):
             self.storeFile(resource_name + extension, buf)
         except Exception, e:
             raise RestxException("Problems storing new resource: " + str(e))
+        finally:
+            self.__invalidate(resource_name, is_specialized)
 